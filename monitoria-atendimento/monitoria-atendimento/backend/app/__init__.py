@@ -4,9 +4,10 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config import config
+from app.services.routing import RoutingSession, configure_engines
 
 # Inicialização das extensões
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
@@ -15,24 +16,93 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
-    # Inicializar extensões
+    # Inicializar extensões (pool e binds das réplicas antes de criar os engines)
+    configure_engines(app)
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app)
     
+    # Provider JSON rápido (orjson); definido antes da instrumentação das métricas
+    from app.services import serialization
+    serialization.init_app(app)
+    
+    # Manutenção dos rollups diários via eventos de sessão
+    from app.services import rollups  # noqa: F401
+    
+    # Resumo das avaliações nas chamadas, mantido pelos mesmos eventos
+    from app.services import evaluation_summary  # noqa: F401
+    
+    # Índice de busca textual criado junto com a tabela calls
+    from app.services import search  # noqa: F401
+    
+    # Particionamento mensal de calls e evaluations no Postgres (tabelas novas)
+    from app.services import partitioning  # noqa: F401
+    
+    # Unicidade dos protocolos das chamadas (calls particionada não a garante)
+    from app.services import protocols  # noqa: F401
+    
+    # Log de alterações do feed /api/changes, gravado na mesma transação
+    from app.services import changes  # noqa: F401
+    
+    # Cache do dashboard, invalidado por eventos de sessão
+    from app.services.cache import dashboard_cache
+    dashboard_cache.init_app(app)
+    
+    # Autorização pelos claims do JWT, com cache de usuários por worker
+    from app.services import authz
+    authz.init_app(app)
+    
+    # Hash de senhas em pool de processos e limite de falhas de login
+    from app.services import passwords
+    passwords.init_app(app)
+    
+    # Rubricas de avaliação vigentes, em cache por worker
+    from app.services import scoring
+    scoring.init_app(app)
+    
+    # Fila de avaliação por amostragem estratificada das chamadas
+    from app.services import sampling
+    sampling.init_app(app)
+    
+    # Stream ao vivo do dashboard (SSE) alimentado pelo log de alterações
+    from app.services import live
+    live.init_app(app)
+    
+    # Leituras das rotas só de leitura nas réplicas, com fallback para o primário
+    from app.services import replicas
+    replicas.init_app(app)
+    
+    # Log de consultas lentas e profiler de requisições sob demanda (admin)
+    from app.services import profiling
+    profiling.init_app(app)
+    
+    # Latência, consultas SQL, pool e serialização por requisição; /api/metrics
+    from app.services import metrics
+    metrics.init_app(app)
+    
+    # Limite de consultas por requisição (modo de teste)
+    from app.services import query_guard
+    query_guard.init_app(app)
+    
     # Registrar blueprints
     from app.routes.auth import auth_bp
     from app.routes.users import users_bp
     from app.routes.calls import calls_bp
     from app.routes.evaluations import evaluations_bp
     from app.routes.dashboard import dashboard_bp
+    from app.routes.rubrics import rubrics_bp
+    from app.routes.admin import admin_bp
+    from app.routes.changes import changes_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(calls_bp, url_prefix='/api/calls')
     app.register_blueprint(evaluations_bp, url_prefix='/api/evaluations')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(rubrics_bp, url_prefix='/api/rubrics')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(changes_bp, url_prefix='/api/changes')
     
     # Rota de health check
     @app.route('/api/health')
@@ -1,5 +1,17 @@
 from app.models.user import User
-from app.models.call import Call
+from app.models.call import Call, CallProtocol
 from app.models.evaluation import Evaluation
+from app.models.rollup import (
+    CallDailyRollup, EvaluationDailyRollup, CallDurationHistogram, EvaluationScoreHistogram
+)
+from app.models.evaluation_queue import EvaluationSamplingStratum, EvaluationQueueEntry
+from app.models.rubric import Rubric
+from app.models.archive import ArchivedCall
+from app.models.change_log import ChangeLogEntry, ChangeLogCompaction
 
-__all__ = ['User', 'Call', 'Evaluation']
+__all__ = [
+    'User', 'Call', 'CallProtocol', 'Evaluation', 'CallDailyRollup', 'EvaluationDailyRollup',
+    'CallDurationHistogram', 'EvaluationScoreHistogram',
+    'EvaluationSamplingStratum', 'EvaluationQueueEntry', 'Rubric', 'ArchivedCall',
+    'ChangeLogEntry', 'ChangeLogCompaction'
+]
@@ -0,0 +1,33 @@
+import json
+import zlib
+from datetime import datetime
+from app import db
+
+class ArchivedCall(db.Model):
+    """Chamada encerrada movida para o arquivo, com as avaliações em um documento comprimido"""
+    __tablename__ = 'archived_calls'
+    
+    # Mesmo id da chamada original (consultas por /api/calls/<id> continuam funcionando)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    protocol = db.Column(db.String(50), nullable=False, index=True)
+    operator_id = db.Column(db.Integer, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    closed_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # to_dict(include_evaluations=True) da chamada em JSON comprimido com zlib
+    payload = db.Column(db.LargeBinary, nullable=False)
+    
+    @staticmethod
+    def compress(data):
+        return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode())
+    
+    def to_dict(self):
+        """Documento arquivado da chamada, marcado como arquivado"""
+        data = json.loads(zlib.decompress(self.payload))
+        data['archived'] = True
+        data['archived_at'] = self.archived_at.isoformat()
+        return data
+    
+    def __repr__(self):
+        return f'<ArchivedCall {self.protocol}>'
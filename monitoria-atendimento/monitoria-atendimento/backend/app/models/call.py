@@ -1,28 +1,45 @@
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from app import db
+from app.models.evaluation import Evaluation, tracked
 
 class Call(db.Model):
     """Modelo de chamada/atendimento"""
     __tablename__ = 'calls'
+    __table_args__ = (
+        # Suporta a paginação por cursor em (created_at, id)
+        db.Index('ix_calls_created_at_id', 'created_at', 'id'),
+        # Listagens de chamadas não avaliadas / com coaching e ordenação por nota
+        db.Index('ix_calls_evaluation_count_created_at', 'evaluation_count', 'created_at', 'id'),
+        db.Index('ix_calls_requires_coaching_created_at', 'requires_coaching', 'created_at', 'id'),
+        db.Index('ix_calls_avg_overall_score_id', 'avg_overall_score', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     protocol = db.Column(db.String(50), unique=True, nullable=False, index=True)
-    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    operator_id = tracked(db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True))
     customer_name = db.Column(db.String(200), nullable=False)
     customer_phone = db.Column(db.String(20))
     customer_email = db.Column(db.String(120))
     subject = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    category = db.Column(db.String(50))  # suporte, vendas, reclamacao, etc
-    priority = db.Column(db.String(20), default='medium')  # low, medium, high, urgent
-    status = db.Column(db.String(20), default='open')  # open, in_progress, resolved, closed
-    duration_seconds = db.Column(db.Integer)  # duração em segundos
+    category = tracked(db.Column(db.String(50)))  # suporte, vendas, reclamacao, etc
+    priority = tracked(db.Column(db.String(20), default='medium'))  # low, medium, high, urgent
+    status = tracked(db.Column(db.String(20), default='open'))  # open, in_progress, resolved, closed
+    duration_seconds = tracked(db.Column(db.Integer))  # duração em segundos
     recording_url = db.Column(db.String(500))  # URL da gravação (se houver)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = tracked(db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     closed_at = db.Column(db.DateTime)
     
+    # Resumo das avaliações (mantido a cada gravação de avaliação; ver services/evaluation_summary.py).
+    # server_default cobre as cargas em lote por COPY, que não informam estas colunas
+    evaluation_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    avg_overall_score = db.Column(db.Float)
+    last_evaluated_at = db.Column(db.DateTime)
+    requires_coaching = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+    
     # Relacionamentos
     evaluations = db.relationship('Evaluation', backref='call', lazy='dynamic', cascade='all, delete-orphan')
     
@@ -46,13 +63,34 @@ class Call(db.Model):
             'notes': self.notes,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'closed_at': self.closed_at.isoformat() if self.closed_at else None
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None,
+            'evaluation_count': self.evaluation_count,
+            'avg_overall_score': self.avg_overall_score,
+            'last_evaluated_at': self.last_evaluated_at.isoformat() if self.last_evaluated_at else None,
+            'requires_coaching': self.requires_coaching
         }
         
         if include_evaluations:
-            data['evaluations'] = [eval.to_dict() for eval in self.evaluations]
+            # Carrega os avaliadores na mesma consulta das avaliações
+            evaluations = self.evaluations.options(joinedload(Evaluation.evaluator))
+            data['evaluations'] = [eval.to_dict() for eval in evaluations]
         
         return data
     
     def __repr__(self):
         return f'<Call {self.protocol}>'
+
+class CallProtocol(db.Model):
+    """Protocolo já usado por uma chamada (nas tabelas quentes ou no arquivo).
+    
+    Com calls particionada, os índices únicos passam a incluir created_at e
+    não garantem mais um protocolo por chamada. Esta tabela, fora do
+    particionamento, mantém a unicidade: a linha é gravada na transação que
+    insere a chamada e não é removida (protocolos não são reutilizados).
+    """
+    __tablename__ = 'call_protocols'
+    
+    protocol = db.Column(db.String(50), primary_key=True)
+    
+    def __repr__(self):
+        return f'<CallProtocol {self.protocol}>'
@@ -0,0 +1,40 @@
+from datetime import datetime
+from app import db
+
+class ChangeLogEntry(db.Model):
+    """Alteração confirmada em uma chamada, avaliação ou usuário (log append-only de /api/changes)"""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        # Última entrada de cada registro (compactação)
+        db.Index('ix_change_log_entity_id', 'entity', 'entity_id', 'id'),
+        # Ids nunca reaproveitados no SQLite, mesmo depois de remover as últimas entradas
+        {'sqlite_autoincrement': True},
+    )
+    
+    # Ordem de commit: as entradas são gravadas sob lock logo antes do commit (services/changes.py)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # call, evaluation, user
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    
+    # Operador dono da chamada (visibilidade no feed); None para usuários
+    operator_id = db.Column(db.Integer, index=True)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ChangeLogEntry {self.id} {self.operation} {self.entity}:{self.entity_id}>'
+
+class ChangeLogCompaction(db.Model):
+    """Execução da compactação do log; cursores anteriores ao horizonte precisam ressincronizar"""
+    __tablename__ = 'change_log_compactions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    compacted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Maior id de exclusão descartada: entre ele e um cursor mais antigo podem faltar exclusões
+    horizon = db.Column(db.BigInteger, nullable=False, default=0)
+    superseded_removed = db.Column(db.Integer, nullable=False, default=0)
+    tombstones_removed = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ChangeLogCompaction {self.compacted_at} horizon={self.horizon}>'
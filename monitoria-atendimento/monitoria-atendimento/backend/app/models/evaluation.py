@@ -1,24 +1,55 @@
 from datetime import datetime
+from sqlalchemy.orm import column_property
 from app import db
 
+# Critérios com coluna própria; critérios adicionados por rubricas ficam em criteria_scores
+SCORE_FIELDS = [
+    'greeting_score', 'communication_score', 'problem_solving_score',
+    'empathy_score', 'procedure_score', 'closing_score'
+]
+
+# Escala das notas dos critérios
+SCORE_MIN = 1
+SCORE_MAX = 5
+
+# Pesos sem rubrica cadastrada: média simples dos critérios fixos
+DEFAULT_WEIGHTS = dict.fromkeys(SCORE_FIELDS, 1.0)
+
+def tracked(column):
+    """Coluna que entra nos rollups do dashboard.
+    
+    active_history carrega o valor anterior antes de aplicar o novo, mesmo com
+    o objeto expirado (ex.: após um commit), para que o delta subtraia a
+    contribuição antiga.
+    """
+    return column_property(column, active_history=True)
+
 class Evaluation(db.Model):
     """Modelo de avaliação de atendimento"""
     __tablename__ = 'evaluations'
+    __table_args__ = (
+        # Suporta a paginação por cursor em (created_at, id)
+        db.Index('ix_evaluations_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    call_id = db.Column(db.Integer, db.ForeignKey('calls.id'), nullable=False, index=True)
+    call_id = tracked(db.Column(db.Integer, db.ForeignKey('calls.id'), nullable=False, index=True))
     evaluator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Critérios de avaliação (escala de 1 a 5)
-    greeting_score = db.Column(db.Integer)  # Saudação e apresentação
-    communication_score = db.Column(db.Integer)  # Clareza e comunicação
-    problem_solving_score = db.Column(db.Integer)  # Resolução do problema
-    empathy_score = db.Column(db.Integer)  # Empatia e cordialidade
-    procedure_score = db.Column(db.Integer)  # Seguimento de procedimentos
-    closing_score = db.Column(db.Integer)  # Encerramento adequado
+    greeting_score = tracked(db.Column(db.Integer))  # Saudação e apresentação
+    communication_score = tracked(db.Column(db.Integer))  # Clareza e comunicação
+    problem_solving_score = tracked(db.Column(db.Integer))  # Resolução do problema
+    empathy_score = tracked(db.Column(db.Integer))  # Empatia e cordialidade
+    procedure_score = tracked(db.Column(db.Integer))  # Seguimento de procedimentos
+    closing_score = tracked(db.Column(db.Integer))  # Encerramento adequado
+    
+    # Notas dos critérios adicionais das rubricas ({critério: nota})
+    criteria_scores = db.Column(db.JSON)
     
-    # Pontuação geral (calculada automaticamente)
-    overall_score = db.Column(db.Float)
+    # Pontuação geral (calculada automaticamente) e rubrica usada no cálculo
+    overall_score = tracked(db.Column(db.Float))
+    rubric_id = db.Column(db.Integer, db.ForeignKey('rubrics.id'))
     
     # Feedback textual
     positive_points = db.Column(db.Text)
@@ -26,31 +57,32 @@ class Evaluation(db.Model):
     general_comments = db.Column(db.Text)
     
     # Flags
-    requires_coaching = db.Column(db.Boolean, default=False)
-    is_exemplary = db.Column(db.Boolean, default=False)
+    requires_coaching = tracked(db.Column(db.Boolean, default=False))
+    is_exemplary = tracked(db.Column(db.Boolean, default=False))
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = tracked(db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    def calculate_overall_score(self):
-        """Calcula a pontuação geral baseada nos critérios"""
-        scores = [
-            self.greeting_score,
-            self.communication_score,
-            self.problem_solving_score,
-            self.empathy_score,
-            self.procedure_score,
-            self.closing_score
-        ]
-        
-        # Remove None values
-        valid_scores = [s for s in scores if s is not None]
+    def score_for(self, criterion):
+        """Nota de um critério (coluna própria ou criteria_scores)"""
+        if criterion in SCORE_FIELDS:
+            return getattr(self, criterion)
+        return (self.criteria_scores or {}).get(criterion)
+    
+    def calculate_overall_score(self, weights=None):
+        """Calcula a pontuação geral como média ponderada dos critérios avaliados"""
+        weights = weights or DEFAULT_WEIGHTS
         
-        if valid_scores:
-            self.overall_score = sum(valid_scores) / len(valid_scores)
-        else:
-            self.overall_score = 0.0
+        # Critérios sem nota não entram na média (nem no denominador)
+        total = 0.0
+        weight_sum = 0.0
+        for criterion, weight in weights.items():
+            score = self.score_for(criterion)
+            if score is not None:
+                total += weight * score
+                weight_sum += weight
         
+        self.overall_score = total / weight_sum if weight_sum else 0.0
         return self.overall_score
     
     def to_dict(self):
@@ -66,7 +98,9 @@ class Evaluation(db.Model):
             'empathy_score': self.empathy_score,
             'procedure_score': self.procedure_score,
             'closing_score': self.closing_score,
+            'criteria_scores': self.criteria_scores,
             'overall_score': self.overall_score,
+            'rubric_id': self.rubric_id,
             'positive_points': self.positive_points,
             'improvement_points': self.improvement_points,
             'general_comments': self.general_comments,
@@ -0,0 +1,70 @@
+from datetime import datetime
+from app import db
+
+class EvaluationSamplingStratum(db.Model):
+    """Chamadas vistas por estrato (período x operador x categoria x prioridade)"""
+    __tablename__ = 'evaluation_sampling_strata'
+    
+    # Dimensões (string vazia representa valor nulo na chamada)
+    period_start = db.Column(db.Date, primary_key=True)
+    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True, default='')
+    priority = db.Column(db.String(20), primary_key=True, default='')
+    
+    seen_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<EvaluationSamplingStratum {self.period_start} op={self.operator_id}>'
+
+class EvaluationQueueEntry(db.Model):
+    """Chamada sorteada para avaliação (uma vaga do reservatório do estrato)"""
+    __tablename__ = 'evaluation_queue'
+    __table_args__ = (
+        db.UniqueConstraint(
+            'period_start', 'operator_id', 'category', 'priority', 'slot',
+            name='uq_evaluation_queue_stratum_slot'
+        ),
+        # Próximas entradas disponíveis, do período mais recente, sem varrer a fila inteira
+        db.Index('ix_evaluation_queue_status_period_sampled_at',
+                 'status', db.text('period_start DESC'), 'sampled_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    call_id = db.Column(db.Integer, db.ForeignKey('calls.id', ondelete='CASCADE'), nullable=False, unique=True)
+    
+    # Estrato e vaga do reservatório
+    period_start = db.Column(db.Date, nullable=False)
+    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    category = db.Column(db.String(50), nullable=False, default='')
+    priority = db.Column(db.String(20), nullable=False, default='')
+    slot = db.Column(db.Integer, nullable=False)
+    
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, claimed, done
+    claimed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    lease_expires_at = db.Column(db.DateTime)
+    sampled_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    call = db.relationship('Call')
+    
+    def to_dict(self, include_call=False):
+        """Converte a entrada da fila para dicionário"""
+        data = {
+            'id': self.id,
+            'call_id': self.call_id,
+            'operator_id': self.operator_id,
+            'category': self.category or None,
+            'priority': self.priority or None,
+            'period_start': self.period_start.isoformat(),
+            'status': self.status,
+            'claimed_by': self.claimed_by,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'sampled_at': self.sampled_at.isoformat()
+        }
+        
+        if include_call:
+            data['call'] = self.call.to_dict() if self.call else None
+        
+        return data
+    
+    def __repr__(self):
+        return f'<EvaluationQueueEntry {self.id} for Call {self.call_id}>'
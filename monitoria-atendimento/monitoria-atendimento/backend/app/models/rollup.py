@@ -0,0 +1,63 @@
+from app import db
+
+class CallDailyRollup(db.Model):
+    """Agregado diário de chamadas por operador, status, prioridade e categoria"""
+    __tablename__ = 'call_daily_rollups'
+    
+    # Dimensões (string vazia representa valor nulo na chamada)
+    day = db.Column(db.Date, primary_key=True)
+    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True, default='')
+    priority = db.Column(db.String(20), primary_key=True, default='')
+    category = db.Column(db.String(50), primary_key=True, default='')
+    
+    # Métricas aditivas
+    call_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    duration_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CallDailyRollup {self.day} op={self.operator_id}>'
+
+class EvaluationDailyRollup(db.Model):
+    """Agregado diário de avaliações por operador da chamada avaliada"""
+    __tablename__ = 'evaluation_daily_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    
+    evaluation_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+    coaching_count = db.Column(db.Integer, nullable=False, default=0)
+    exemplary_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<EvaluationDailyRollup {self.day} op={self.operator_id}>'
+
+class CallDurationHistogram(db.Model):
+    """Histograma diário da duração das chamadas por operador (buckets de app.services.sketches)"""
+    __tablename__ = 'call_duration_histograms'
+    
+    day = db.Column(db.Date, primary_key=True)
+    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CallDurationHistogram {self.day} op={self.operator_id} bucket={self.bucket}>'
+
+class EvaluationScoreHistogram(db.Model):
+    """Histograma diário das notas por critério e operador da chamada avaliada"""
+    __tablename__ = 'evaluation_score_histograms'
+    
+    day = db.Column(db.Date, primary_key=True)
+    operator_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    criterion = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<EvaluationScoreHistogram {self.day} op={self.operator_id} {self.criterion}={self.bucket}>'
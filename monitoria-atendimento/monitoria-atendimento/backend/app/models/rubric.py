@@ -0,0 +1,31 @@
+from datetime import datetime
+from app import db
+
+class Rubric(db.Model):
+    """Versão de rubrica: pesos dos critérios de avaliação para uma categoria de chamada"""
+    __tablename__ = 'rubrics'
+    __table_args__ = (
+        db.UniqueConstraint('category', 'version', name='uq_rubrics_category_version'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # String vazia: rubrica padrão, usada pelas categorias sem rubrica própria
+    category = db.Column(db.String(50), nullable=False, default='')
+    version = db.Column(db.Integer, nullable=False)
+    weights = db.Column(db.JSON, nullable=False)  # {critério: peso}
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        """Converte a rubrica para dicionário"""
+        return {
+            'id': self.id,
+            'category': self.category or None,
+            'version': self.version,
+            'weights': self.weights,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<Rubric {self.category or "default"} v{self.version}>'
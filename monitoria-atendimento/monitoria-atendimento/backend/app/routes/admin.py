@@ -0,0 +1,48 @@
+from flask import Blueprint, request, jsonify, send_file
+from app.services.authz import require_role
+from app.services.profiling import request_profiler
+from app.services.replicas import replica_router
+from app.services.live import live_broker
+
+admin_bp = Blueprint('admin', __name__)
+
+# Critérios de ordenação aceitos pelo pstats na visualização dos perfis
+PROFILE_SORTS = ['cumulative', 'tottime', 'calls', 'ncalls', 'time']
+
+@admin_bp.route('/profiles', methods=['GET'])
+@require_role('admin', error='Sem permissão para visualizar perfis')
+def get_profiles():
+    """Listar perfis de requisição gravados (apenas admin)"""
+    return jsonify({'profiles': request_profiler.list()}), 200
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@require_role('admin', error='Sem permissão para visualizar perfis')
+def get_profile(profile_id):
+    """Obter perfil em texto (pstats) ou o arquivo .prof com format=raw (apenas admin)"""
+    path = request_profiler.path(profile_id)
+    if not path:
+        return jsonify({'error': 'Perfil não encontrado'}), 404
+    
+    if request.args.get('format') == 'raw':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+    
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in PROFILE_SORTS:
+        return jsonify({'error': f'Ordenação inválida (use {", ".join(PROFILE_SORTS)})'}), 400
+    limit = request.args.get('limit', 50, type=int)
+    
+    text = request_profiler.format_stats(path, sort=sort, limit=limit)
+    return text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@admin_bp.route('/replicas', methods=['GET'])
+@require_role('admin', error='Sem permissão para visualizar as réplicas')
+def get_replicas():
+    """Réplicas de leitura configuradas e as fora do rodízio neste worker (apenas admin)"""
+    return jsonify(replica_router.stats()), 200
+
+@admin_bp.route('/live', methods=['GET'])
+@require_role('admin', error='Sem permissão para visualizar as conexões ao vivo')
+def get_live_stats():
+    """Conexões do stream ao vivo do dashboard neste worker (apenas admin)"""
+    return jsonify(live_broker.stats()), 200
@@ -1,10 +1,16 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, current_user
 from app import db
 from app.models.user import User
+from app.services.authz import require_role, token_claims, user_cache
+from app.services.passwords import PasswordHashBusy, password_hasher, login_throttle
 
 auth_bp = Blueprint('auth', __name__)
 
+def busy_response():
+    """Resposta quando o pool de hash de senhas está saturado"""
+    return jsonify({'error': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': '1'}
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Registrar novo usuário"""
@@ -30,7 +36,12 @@ def register():
         full_name=data['full_name'],
         role=data.get('role', 'operator')
     )
-    user.set_password(data['password'])
+    
+    # Hash calculado no pool de processos
+    try:
+        user.password_hash = password_hasher.hash(data['password'])
+    except PasswordHashBusy:
+        return busy_response()
     
     try:
         db.session.add(user)
@@ -51,17 +62,45 @@ def login():
     if not data.get('username') or not data.get('password'):
         return jsonify({'error': 'Username e password são obrigatórios'}), 400
     
+    # Excesso de falhas: recusa antes de consultar o banco ou calcular hash
+    client_ip = request.remote_addr or ''
+    retry_after = login_throttle.retry_after(data['username'], client_ip)
+    if retry_after:
+        return jsonify({'error': 'Muitas tentativas de login, tente novamente mais tarde'}), 429, \
+               {'Retry-After': str(retry_after)}
+    
+    # Versão lida antes do usuário: uma alteração concorrente invalida estes claims
+    auth_version = user_cache.version()
     user = User.query.filter_by(username=data['username']).first()
     
-    if not user or not user.check_password(data['password']):
+    try:
+        valid = user is not None and password_hasher.verify(user.password_hash, data['password'])
+    except PasswordHashBusy:
+        return busy_response()
+    
+    if not valid:
+        login_throttle.record_failure(data['username'], client_ip)
         return jsonify({'error': 'Credenciais inválidas'}), 401
     
+    login_throttle.reset(data['username'])
+    
     if not user.is_active:
         return jsonify({'error': 'Usuário inativo'}), 403
     
-    # Criar tokens
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
+    # Atualizar hashes gerados com método ou parâmetros antigos
+    try:
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(data['password'])
+            db.session.commit()
+    except PasswordHashBusy:
+        pass  # fica para o próximo login
+    except Exception:
+        db.session.rollback()
+    
+    # Criar tokens com papel e situação como claims
+    claims = token_claims(user, auth_version)
+    access_token = create_access_token(identity=str(user.id), additional_claims=claims)
+    refresh_token = create_refresh_token(identity=str(user.id), additional_claims=claims)
     
     return jsonify({
         'message': 'Login realizado com sucesso',
@@ -71,22 +110,24 @@ def login():
     }), 200
 
 @auth_bp.route('/refresh', methods=['POST'])
-@jwt_required(refresh=True)
+@require_role(refresh=True)
 def refresh():
     """Renovar access token"""
-    current_user_id = get_jwt_identity()
-    access_token = create_access_token(identity=str(current_user_id))
+    # Claims atualizados: papel e situação vêm do cache se o refresh token foi revogado
+    access_token = create_access_token(
+        identity=str(current_user.id),
+        additional_claims=token_claims(current_user, current_user.auth_version)
+    )
     
     return jsonify({
         'access_token': access_token
     }), 200
 
 @auth_bp.route('/me', methods=['GET'])
-@jwt_required()
+@require_role()
 def get_current_user():
     """Obter dados do usuário autenticado"""
-    current_user_id = get_jwt_identity()
-    user = User.query.get(int(current_user_id))
+    user = User.query.get(current_user.id)
     
     if not user:
         return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -1,52 +1,87 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import current_user
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, joinedload
 from datetime import datetime
 from app import db
-from app.models.call import Call
 from app.models.user import User
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.models.archive import ArchivedCall
+from app.services import query_guard
+from app.services.authz import require_role
+from app.services.conditional import conditional_get
+from app.services.search import search_calls
+from app.services.ingestion import INGEST_FORMATS, ingest_calls
+from app.services.export import EXPORT_FORMATS, calls_export_query, export_response
+from app.services.serialization import InvalidFields, call_projection
+from app.services.pagination import (
+    DEFAULT_LIMIT, InvalidCursor, keyset_paginate, count_cache_key, resolve_total
+)
 import uuid
 
 calls_bp = Blueprint('calls', __name__)
 
+# Campos padrão da listagem (fields= escolhe outros; '*' devolve todos os de to_dict).
+# Os textos longos (description, notes) ficam de fora e só são lidos quando pedidos.
+CALL_LIST_FIELDS = [
+    'id', 'protocol', 'operator_id', 'operator_name', 'customer_name', 'customer_phone',
+    'customer_email', 'subject', 'category', 'priority', 'status', 'duration_seconds',
+    'recording_url', 'created_at', 'updated_at', 'closed_at', 'evaluation_count',
+    'avg_overall_score', 'last_evaluated_at', 'requires_coaching'
+]
+
+# Colunas lidas na paginação por cursor mesmo fora de fields= (posição do cursor)
+CURSOR_FIELDS = ('id', 'created_at')
+
+# Parâmetros de filtro aceitos pela listagem de chamadas
+CALL_FILTER_ARGS = [
+    'operator_id', 'status', 'category', 'priority', 'date_from', 'date_to', 'q',
+    'evaluated', 'requires_coaching', 'min_score', 'max_score'
+]
+
+# Ordenações aceitas pela listagem paginada por página ('-' = decrescente)
+CALL_SORTS = {
+    '-created_at': (Call.created_at.desc(),),
+    'avg_overall_score': (Call.avg_overall_score.asc().nulls_last(), Call.id.asc()),
+    '-avg_overall_score': (Call.avg_overall_score.desc().nulls_last(), Call.id.desc())
+}
+
 def generate_protocol():
     """Gera um protocolo único para a chamada"""
     timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
     random_suffix = str(uuid.uuid4())[:6].upper()
     return f'CALL-{timestamp}-{random_suffix}'
 
-@calls_bp.route('/', methods=['GET'])
-@jwt_required()
-def get_calls():
-    """Listar chamadas com filtros"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
+def filter_calls(query, args, current_user):
+    """Aplica os filtros da listagem e a regra de visibilidade do operador"""
     # Parâmetros de filtro
-    operator_id = request.args.get('operator_id', type=int)
-    status = request.args.get('status')
-    category = request.args.get('category')
-    priority = request.args.get('priority')
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    query = Call.query
+    operator_id = args.get('operator_id', type=int)
+    status = args.get('status')
+    category = args.get('category')
+    priority = args.get('priority')
+    date_from = args.get('date_from')
+    date_to = args.get('date_to')
+    search_terms = args.get('q')
+    evaluated = args.get('evaluated')
+    requires_coaching = args.get('requires_coaching')
+    min_score = args.get('min_score', type=float)
+    max_score = args.get('max_score', type=float)
     
     # Operadores só veem suas próprias chamadas
     if current_user.role == 'operator':
-        query = query.filter_by(operator_id=current_user_id)
+        query = query.filter(Call.operator_id == current_user.id)
     elif operator_id:
-        query = query.filter_by(operator_id=operator_id)
+        query = query.filter(Call.operator_id == operator_id)
     
     if status:
-        query = query.filter_by(status=status)
+        query = query.filter(Call.status == status)
     
     if category:
-        query = query.filter_by(category=category)
+        query = query.filter(Call.category == category)
     
     if priority:
-        query = query.filter_by(priority=priority)
+        query = query.filter(Call.priority == priority)
     
     if date_from:
         try:
@@ -62,41 +97,153 @@ def get_calls():
         except ValueError:
             pass
     
+    # Resumo das avaliações mantido na própria chamada (sem JOIN com evaluations)
+    if evaluated is not None:
+        if evaluated.lower() == 'true':
+            query = query.filter(Call.evaluation_count > 0)
+        else:
+            query = query.filter(Call.evaluation_count == 0)
+    
+    if requires_coaching is not None:
+        query = query.filter(Call.requires_coaching == (requires_coaching.lower() == 'true'))
+    
+    if min_score is not None:
+        query = query.filter(Call.avg_overall_score >= min_score)
+    
+    if max_score is not None:
+        query = query.filter(Call.avg_overall_score <= max_score)
+    
+    # Busca textual (tsvector no Postgres, FTS5 no SQLite), ordenada por relevância
+    if search_terms:
+        query = search_calls(query, search_terms)
+    
+    return query
+
+@calls_bp.route('/', methods=['GET'])
+@require_role()
+def get_calls():
+    """Listar chamadas com filtros"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    try:
+        fields = call_projection.parse_fields(request.args.get('fields'), default=CALL_LIST_FIELDS)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Apenas as colunas pedidas (operador por JOIN quando operator_name é pedido),
+    # serializadas sem instanciar o ORM
+    paginate_by_cursor = 'cursor' in request.args
+    projection = call_projection.project(fields, required=CURSOR_FIELDS if paginate_by_cursor else ())
+    query = filter_calls(projection.query(), request.args, current_user)
+    
+    # Paginação por cursor (keyset): sem OFFSET e com total opcional
+    if paginate_by_cursor:
+        try:
+            calls, next_cursor, prev_cursor = keyset_paginate(
+                query, Call,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_LIMIT, type=int)
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        
+        result = {
+            'calls': projection.many(calls),
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+        
+        total_mode = request.args.get('total')
+        if total_mode in ('exact', 'estimate'):
+            filters = {key: request.args[key] for key in CALL_FILTER_ARGS if request.args.get(key)}
+            scope = 'operator' if current_user.role == 'operator' else 'all'
+            cache_key = count_cache_key('calls', scope, current_user.id if scope == 'operator' else None, filters)
+            result['total'], result['total_is_estimate'] = resolve_total(
+                total_mode, query, Call, cache_key, filtered=bool(filters) or scope == 'operator'
+            )
+        
+        return jsonify(result), 200
+    
+    sort = request.args.get('sort', '-created_at')
+    if sort not in CALL_SORTS:
+        return jsonify({'error': 'Ordenação inválida (use -created_at, avg_overall_score ou -avg_overall_score)'}), 400
+    
     # Paginação
-    pagination = query.order_by(Call.created_at.desc()).paginate(
+    pagination = query.order_by(*CALL_SORTS[sort]).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
     return jsonify({
-        'calls': [call.to_dict() for call in pagination.items],
+        'calls': projection.many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
     }), 200
 
+@calls_bp.route('/export', methods=['GET'])
+@require_role()
+def export_calls():
+    """Exportar chamadas filtradas em CSV ou NDJSON (streaming)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Formato de exportação inválido (use csv ou ndjson)'}), 400
+    
+    query = filter_calls(calls_export_query(), request.args, current_user)
+    
+    return export_response(query, Call, export_format, 'chamadas')
+
+def call_validators(call_id):
+    """Versões de GET /api/calls/<id>: a chamada, suas avaliações e os nomes exibidos (uma consulta)"""
+    operator = aliased(User)
+    evaluator = aliased(User)
+    of_call = Evaluation.call_id == Call.id
+    row = db.session.query(
+        Call.operator_id,
+        Call.updated_at,
+        operator.updated_at,
+        select(func.max(Evaluation.updated_at)).where(of_call).scalar_subquery(),
+        select(func.count(Evaluation.id)).where(of_call).scalar_subquery(),
+        select(func.max(evaluator.updated_at)).join(Evaluation, Evaluation.evaluator_id == evaluator.id)
+                                              .where(of_call).scalar_subquery()
+    ).outerjoin(operator, operator.id == Call.operator_id).filter(Call.id == call_id).first()
+    
+    if row is None:
+        # Chamadas arquivadas não mudam mais
+        row = db.session.query(ArchivedCall.operator_id, ArchivedCall.archived_at)\
+                        .filter(ArchivedCall.id == call_id).first()
+        if row is None:
+            return None
+    
+    if current_user.role == 'operator' and row[0] != current_user.id:
+        return None
+    return tuple(row), max(value for value in row[1:] if isinstance(value, datetime))
+
 @calls_bp.route('/<int:call_id>', methods=['GET'])
-@jwt_required()
+@require_role()
+@conditional_get(call_validators)
 def get_call(call_id):
     """Obter chamada por ID"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    call = Call.query.get(call_id)
+    call = Call.query.options(joinedload(Call.operator)).get(call_id)
     
+    # Chamadas arquivadas continuam legíveis (somente leitura)
     if not call:
-        return jsonify({'error': 'Chamada não encontrada'}), 404
+        call = db.session.get(ArchivedCall, call_id)
+        if not call:
+            return jsonify({'error': 'Chamada não encontrada'}), 404
     
     # Operadores só podem ver suas próprias chamadas
-    if current_user.role == 'operator' and call.operator_id != current_user_id:
+    if current_user.role == 'operator' and call.operator_id != current_user.id:
         return jsonify({'error': 'Sem permissão para visualizar esta chamada'}), 403
     
+    if isinstance(call, ArchivedCall):
+        return jsonify(call.to_dict()), 200
     return jsonify(call.to_dict(include_evaluations=True)), 200
 
 @calls_bp.route('/', methods=['POST'])
-@jwt_required()
+@require_role()
 def create_call():
     """Criar nova chamada"""
-    current_user_id = get_jwt_identity()
     data = request.get_json()
     
     # Validar campos obrigatórios
@@ -108,7 +255,7 @@ def create_call():
     # Criar chamada
     call = Call(
         protocol=generate_protocol(),
-        operator_id=data.get('operator_id', current_user_id),
+        operator_id=data.get('operator_id', current_user.id),
         customer_name=data['customer_name'],
         customer_phone=data.get('customer_phone'),
         customer_email=data.get('customer_email'),
@@ -133,20 +280,37 @@ def create_call():
         db.session.rollback()
         return jsonify({'error': 'Erro ao criar chamada', 'details': str(e)}), 500
 
+@calls_bp.route('/bulk', methods=['POST'])
+@query_guard.exempt
+@require_role()
+def bulk_create_calls():
+    """Criar chamadas em lote a partir de upload NDJSON ou CSV"""
+    ingest_format = INGEST_FORMATS.get(request.mimetype)
+    if ingest_format is None:
+        return jsonify({'error': 'Envie o arquivo como application/x-ndjson ou text/csv'}), 415
+    
+    # O corpo é lido em streaming e gravado em lotes
+    report = ingest_calls(
+        request.stream,
+        ingest_format,
+        default_operator_id=current_user.id,
+        batch_size=current_app.config['BULK_INGEST_BATCH_SIZE']
+    )
+    
+    status_code = 201 if report['created'] else 400
+    return jsonify(report), status_code
+
 @calls_bp.route('/<int:call_id>', methods=['PUT'])
-@jwt_required()
+@require_role()
 def update_call(call_id):
     """Atualizar chamada"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
     call = Call.query.get(call_id)
     
     if not call:
         return jsonify({'error': 'Chamada não encontrada'}), 404
     
     # Operadores só podem atualizar suas próprias chamadas
-    if current_user.role == 'operator' and call.operator_id != current_user_id:
+    if current_user.role == 'operator' and call.operator_id != current_user.id:
         return jsonify({'error': 'Sem permissão para atualizar esta chamada'}), 403
     
     data = request.get_json()
@@ -177,16 +341,9 @@ def update_call(call_id):
         return jsonify({'error': 'Erro ao atualizar chamada', 'details': str(e)}), 500
 
 @calls_bp.route('/<int:call_id>', methods=['DELETE'])
-@jwt_required()
+@require_role('admin', 'supervisor', error='Sem permissão para deletar chamadas')
 def delete_call(call_id):
-    """Deletar chamada"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    # Apenas admin e supervisor podem deletar
-    if current_user.role not in ['admin', 'supervisor']:
-        return jsonify({'error': 'Sem permissão para deletar chamadas'}), 403
-    
+    """Deletar chamada (apenas admin e supervisor)"""
     call = Call.query.get(call_id)
     
     if not call:
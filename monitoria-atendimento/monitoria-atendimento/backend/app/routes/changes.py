@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import current_user
+from app.services.authz import require_role
+from app.services.pagination import InvalidCursor
+from app.services.changes import (
+    CHANGE_ENTITIES, DEFAULT_CHANGES_LIMIT, CursorExpired, head_cursor, read_changes
+)
+
+changes_bp = Blueprint('changes', __name__)
+
+@changes_bp.route('/', methods=['GET'])
+@require_role()
+def get_changes():
+    """Alterações em chamadas, avaliações e usuários depois do cursor since (sincronização incremental)"""
+    limit = request.args.get('limit', DEFAULT_CHANGES_LIMIT, type=int)
+    
+    entities = [entity.strip() for entity in request.args.get('entities', '').split(',') if entity.strip()]
+    unknown = set(entities) - set(CHANGE_ENTITIES)
+    if unknown:
+        return jsonify({'error': f'Entidades inválidas: {", ".join(sorted(unknown))} '
+                                 f'(use {", ".join(CHANGE_ENTITIES)})'}), 400
+    
+    try:
+        feed = read_changes(request.args.get('since'), current_user, entities, limit)
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    except CursorExpired:
+        # Exclusões anteriores ao cursor já foram compactadas: é preciso recarregar tudo
+        return jsonify({
+            'error': 'Cursor anterior à compactação do log; refaça a carga completa',
+            'cursor': head_cursor()
+        }), 410
+    
+    return jsonify(feed), 200
+
+@changes_bp.route('/cursor', methods=['GET'])
+@require_role()
+def get_head_cursor():
+    """Cursor atual do log, obtido antes de uma carga completa pelas listagens"""
+    return jsonify({'cursor': head_cursor()}), 200
@@ -1,200 +1,155 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, and_
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_jwt_extended import create_access_token, current_user, get_jwt
 from datetime import datetime, timedelta
-from app import db
-from app.models.user import User
-from app.models.call import Call
-from app.models.evaluation import Evaluation
+from app.services.authz import require_role, token_claims
+from app.services.conditional import conditional_get
+from app.services.cache import dashboard_cache
+from app.services.live import LiveBrokerFull, live_broker
+from app.services.dashboard import (
+    DISTRIBUTION_GROUPS, RECENT_CALL_FIELDS, cached_dashboard_stats, compute_operator_performance,
+    compute_distributions, compute_recent_activity
+)
+from app.services.serialization import InvalidFields, call_projection
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Escopo dos tickets do stream ao vivo (não valem nas demais rotas)
+STREAM_SCOPE = 'dashboard_stream'
+
+def dashboard_validators():
+    """Versões dos agregados: geração do cache, escopo do usuário e dia dos períodos.
+    
+    A geração é o contador de alterações compartilhado entre os workers,
+    incrementado a cada commit que toca chamadas, avaliações ou usuários.
+    """
+    generation = dashboard_cache.generation()
+    if generation is None:
+        return None
+    
+    operator_id = current_user.id if current_user.role == 'operator' else None
+    return (generation, operator_id, datetime.utcnow().date()), None
+
 @dashboard_bp.route('/stats', methods=['GET'])
-@jwt_required()
+@require_role()
+@conditional_get(dashboard_validators)
 def get_dashboard_stats():
     """Obter estatísticas gerais do dashboard"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
     # Parâmetros de período
     days = request.args.get('days', 30, type=int)
-    date_from = datetime.utcnow() - timedelta(days=days)
-    
-    # Base query - operadores veem apenas suas próprias estatísticas
-    calls_query = Call.query.filter(Call.created_at >= date_from)
-    if current_user.role == 'operator':
-        calls_query = calls_query.filter_by(operator_id=current_user_id)
-    
-    # Total de chamadas
-    total_calls = calls_query.count()
-    
-    # Chamadas por status
-    calls_by_status = db.session.query(
-        Call.status,
-        func.count(Call.id)
-    ).filter(Call.created_at >= date_from)
-    
-    if current_user.role == 'operator':
-        calls_by_status = calls_by_status.filter_by(operator_id=current_user_id)
-    
-    calls_by_status = calls_by_status.group_by(Call.status).all()
-    
-    # Chamadas por prioridade
-    calls_by_priority = db.session.query(
-        Call.priority,
-        func.count(Call.id)
-    ).filter(Call.created_at >= date_from)
-    
-    if current_user.role == 'operator':
-        calls_by_priority = calls_by_priority.filter_by(operator_id=current_user_id)
-    
-    calls_by_priority = calls_by_priority.group_by(Call.priority).all()
     
-    # Chamadas por categoria
-    calls_by_category = db.session.query(
-        Call.category,
-        func.count(Call.id)
-    ).filter(Call.created_at >= date_from)
+    # Operadores veem apenas suas próprias estatísticas
+    operator_id = current_user.id if current_user.role == 'operator' else None
     
-    if current_user.role == 'operator':
-        calls_by_category = calls_by_category.filter_by(operator_id=current_user_id)
-    
-    calls_by_category = calls_by_category.group_by(Call.category).all()
-    
-    # Tempo médio de atendimento
-    avg_duration = db.session.query(
-        func.avg(Call.duration_seconds)
-    ).filter(
-        and_(
-            Call.created_at >= date_from,
-            Call.duration_seconds.isnot(None)
-        )
-    )
-    
-    if current_user.role == 'operator':
-        avg_duration = avg_duration.filter_by(operator_id=current_user_id)
-    
-    avg_duration = avg_duration.scalar() or 0
-    
-    # Estatísticas de avaliações
-    evaluations_query = Evaluation.query.join(Call).filter(Evaluation.created_at >= date_from)
-    
-    if current_user.role == 'operator':
-        evaluations_query = evaluations_query.filter(Call.operator_id == current_user_id)
+    # Uma consulta agrupada para chamadas e outra para avaliações (com cache)
+    stats = cached_dashboard_stats(days, operator_id)
     
-    total_evaluations = evaluations_query.count()
-    
-    # Pontuação média geral
-    avg_overall_score = db.session.query(
-        func.avg(Evaluation.overall_score)
-    ).join(Call).filter(Evaluation.created_at >= date_from)
-    
-    if current_user.role == 'operator':
-        avg_overall_score = avg_overall_score.filter(Call.operator_id == current_user_id)
-    
-    avg_overall_score = avg_overall_score.scalar() or 0
-    
-    # Avaliações que requerem coaching
-    coaching_needed = db.session.query(Evaluation).join(Call).filter(
-        Evaluation.created_at >= date_from,
-        Evaluation.requires_coaching == True
-    )
-    if current_user.role == 'operator':
-        coaching_needed = coaching_needed.filter(Call.operator_id == current_user_id)
-    coaching_needed = coaching_needed.count()
-    
-    # Avaliações exemplares
-    exemplary_count = db.session.query(Evaluation).join(Call).filter(
-        Evaluation.created_at >= date_from,
-        Evaluation.is_exemplary == True
-    )
-    if current_user.role == 'operator':
-        exemplary_count = exemplary_count.filter(Call.operator_id == current_user_id)
-    exemplary_count = exemplary_count.count()
-    
-    return jsonify({
-        'period_days': days,
-        'calls': {
-            'total': total_calls,
-            'by_status': dict(calls_by_status),
-            'by_priority': dict(calls_by_priority),
-            'by_category': dict(calls_by_category),
-            'avg_duration_seconds': round(avg_duration, 2)
-        },
-        'evaluations': {
-            'total': total_evaluations,
-            'avg_overall_score': round(avg_overall_score, 2),
-            'coaching_needed': coaching_needed,
-            'exemplary': exemplary_count
-        }
-    }), 200
+    return jsonify(stats), 200
 
 @dashboard_bp.route('/operator-performance', methods=['GET'])
-@jwt_required()
+@require_role('supervisor', 'admin', error='Sem permissão para visualizar esta informação')
+@conditional_get(dashboard_validators)
 def get_operator_performance():
-    """Obter performance dos operadores"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    # Apenas supervisores e admins podem ver performance de todos
-    if current_user.role == 'operator':
-        return jsonify({'error': 'Sem permissão para visualizar esta informação'}), 403
-    
+    """Obter performance dos operadores (apenas supervisores e admins)"""
     days = request.args.get('days', 30, type=int)
     date_from = datetime.utcnow() - timedelta(days=days)
     
-    # Performance por operador
-    performance = db.session.query(
-        User.id,
-        User.full_name,
-        func.count(Call.id).label('total_calls'),
-        func.avg(Call.duration_seconds).label('avg_duration'),
-        func.avg(Evaluation.overall_score).label('avg_score')
-    ).join(Call, User.id == Call.operator_id)\
-     .outerjoin(Evaluation, Call.id == Evaluation.call_id)\
-     .filter(Call.created_at >= date_from)\
-     .group_by(User.id, User.full_name)\
-     .all()
-    
-    result = []
-    for operator_id, full_name, total_calls, avg_duration, avg_score in performance:
-        result.append({
-            'operator_id': operator_id,
-            'operator_name': full_name,
-            'total_calls': total_calls,
-            'avg_duration_seconds': round(avg_duration or 0, 2),
-            'avg_score': round(avg_score or 0, 2)
-        })
+    # Performance por operador (lida dos rollups diários, com cache)
+    cache_key = dashboard_cache.make_key('operator-performance', 'all', days=days)
+    result = dashboard_cache.get_or_compute(
+        cache_key, lambda: compute_operator_performance(date_from)
+    )
     
     return jsonify({
         'period_days': days,
         'operators': result
     }), 200
 
+@dashboard_bp.route('/distributions', methods=['GET'])
+@require_role()
+@conditional_get(dashboard_validators)
+def get_distributions():
+    """Obter percentis de duração e distribuição das notas por critério"""
+    days = request.args.get('days', 30, type=int)
+    date_from = datetime.utcnow() - timedelta(days=days)
+    
+    group_by = request.args.get('group_by') or None
+    if group_by not in DISTRIBUTION_GROUPS:
+        return jsonify({'error': 'Agrupamento inválido (use operator, day, week ou month)'}), 400
+    
+    # Operadores veem apenas suas próprias distribuições
+    if current_user.role == 'operator':
+        operator_id = current_user.id
+    else:
+        operator_id = request.args.get('operator_id', type=int)
+    
+    scope = 'operator' if current_user.role == 'operator' else 'all'
+    cache_key = dashboard_cache.make_key(f'distributions:{group_by}', scope, operator_id, days)
+    result = dashboard_cache.get_or_compute(
+        cache_key, lambda: compute_distributions(date_from, operator_id, group_by)
+    )
+    
+    return jsonify(dict(result, period_days=days, group_by=group_by)), 200
+
 @dashboard_bp.route('/recent-activity', methods=['GET'])
-@jwt_required()
+@require_role()
+@conditional_get(dashboard_validators)
 def get_recent_activity():
     """Obter atividades recentes"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
     limit = request.args.get('limit', 10, type=int)
     
-    # Chamadas recentes
-    calls_query = Call.query
-    if current_user.role == 'operator':
-        calls_query = calls_query.filter_by(operator_id=current_user_id)
+    # Campos das chamadas recentes (fields=); as avaliações vêm completas
+    try:
+        fields = call_projection.parse_fields(request.args.get('fields'), default=RECENT_CALL_FIELDS)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     
-    recent_calls = calls_query.order_by(Call.created_at.desc()).limit(limit).all()
+    # Operadores veem apenas suas próprias atividades
+    operator_id = current_user.id if current_user.role == 'operator' else None
     
-    # Avaliações recentes
-    evaluations_query = Evaluation.query.join(Call)
-    if current_user.role == 'operator':
-        evaluations_query = evaluations_query.filter(Call.operator_id == current_user_id)
+    scope = 'operator' if operator_id else 'all'
+    cache_key = dashboard_cache.make_key(f'recent-activity:{",".join(fields)}', scope, operator_id, limit=limit)
+    activity = dashboard_cache.get_or_compute(
+        cache_key, lambda: compute_recent_activity(limit, operator_id, fields)
+    )
     
-    recent_evaluations = evaluations_query.order_by(Evaluation.created_at.desc()).limit(limit).all()
+    return jsonify(activity), 200
+
+@dashboard_bp.route('/stream/ticket', methods=['POST'])
+@require_role()
+def create_stream_ticket():
+    """Ticket de curta duração para abrir o stream ao vivo.
+    
+    EventSource não envia cabeçalhos, então a credencial vai na query string.
+    Em vez do token de sessão, vai um token que só abre o stream e expira em
+    LIVE_TICKET_SECONDS; o stream termina quando o token de sessão expiraria.
+    """
+    claims = token_claims(current_user, current_user.auth_version)
+    claims.update(scope=STREAM_SCOPE, session_exp=get_jwt()['exp'])
+    expires_in = current_app.config['LIVE_TICKET_SECONDS']
+    ticket = create_access_token(identity=str(current_user.id), additional_claims=claims,
+                                 expires_delta=timedelta(seconds=expires_in))
+    return jsonify({'ticket': ticket, 'expires_in': expires_in}), 200
+
+@dashboard_bp.route('/stream', methods=['GET'])
+@require_role(locations=['query_string'], scope=STREAM_SCOPE)
+def stream_dashboard():
+    """Eventos ao vivo do dashboard (SSE): chamadas, avaliações e contadores"""
+    days = request.args.get('days', 30, type=int)
     
-    return jsonify({
-        'recent_calls': [call.to_dict() for call in recent_calls],
-        'recent_evaluations': [evaluation.to_dict() for evaluation in recent_evaluations]
-    }), 200
+    # Autenticado pelo ticket em ?ticket= (POST /api/dashboard/stream/ticket)
+    try:
+        subscriber = live_broker.subscribe(current_user, days)
+    except LiveBrokerFull:
+        return jsonify({'error': 'Limite de conexões ao vivo atingido; tente novamente em instantes'}), 503
+    
+    # O stream termina quando a sessão expira; o cliente reconecta com um novo ticket
+    return Response(live_broker.stream(subscriber, get_jwt()['session_exp']), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@dashboard_bp.route('/cache', methods=['GET'])
+@require_role('admin', error='Sem permissão para visualizar esta informação')
+def get_cache_stats():
+    """Obter contadores do cache do dashboard (apenas admins)"""
+    return jsonify(dashboard_cache.stats()), 200
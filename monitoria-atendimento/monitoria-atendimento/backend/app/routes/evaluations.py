@@ -1,49 +1,101 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import current_user
+from datetime import datetime
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased, joinedload
 from app import db
+from app.models.user import User
 from app.models.evaluation import Evaluation
+from app.models.evaluation_queue import EvaluationQueueEntry
 from app.models.call import Call
-from app.models.user import User
+from app.services.authz import require_role
+from app.services.conditional import conditional_get
+from app.services.sampling import evaluation_sampler
+from app.services.scoring import rubric_cache, validate_criteria_scores
+from app.services.export import EXPORT_FORMATS, evaluations_export_query, export_response
+from app.services.serialization import evaluation_projection
+from app.services.pagination import (
+    DEFAULT_LIMIT, InvalidCursor, keyset_paginate, count_cache_key, resolve_total
+)
 
 evaluations_bp = Blueprint('evaluations', __name__)
 
-@evaluations_bp.route('/', methods=['GET'])
-@jwt_required()
-def get_evaluations():
-    """Listar avaliações com filtros"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
+# Máximo de chamadas reservadas por pedido à fila
+MAX_QUEUE_CLAIM = 20
+
+# Parâmetros de filtro aceitos pela listagem de avaliações
+EVALUATION_FILTER_ARGS = ['call_id', 'evaluator_id', 'operator_id', 'requires_coaching', 'is_exemplary']
+
+def filter_evaluations(query, args, current_user, call_joined=False):
+    """Aplica os filtros da listagem e a regra de visibilidade do operador"""
     # Parâmetros de filtro
-    call_id = request.args.get('call_id', type=int)
-    evaluator_id = request.args.get('evaluator_id', type=int)
-    operator_id = request.args.get('operator_id', type=int)
-    requires_coaching = request.args.get('requires_coaching')
-    is_exemplary = request.args.get('is_exemplary')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    query = Evaluation.query
+    call_id = args.get('call_id', type=int)
+    evaluator_id = args.get('evaluator_id', type=int)
+    operator_id = args.get('operator_id', type=int)
+    requires_coaching = args.get('requires_coaching')
+    is_exemplary = args.get('is_exemplary')
     
     if call_id:
-        query = query.filter_by(call_id=call_id)
+        query = query.filter(Evaluation.call_id == call_id)
     
     if evaluator_id:
-        query = query.filter_by(evaluator_id=evaluator_id)
-    
-    if operator_id:
-        # Filtrar por operador através da chamada
-        query = query.join(Call).filter(Call.operator_id == operator_id)
+        query = query.filter(Evaluation.evaluator_id == evaluator_id)
     
     if requires_coaching is not None:
-        query = query.filter_by(requires_coaching=requires_coaching.lower() == 'true')
+        query = query.filter(Evaluation.requires_coaching == (requires_coaching.lower() == 'true'))
     
     if is_exemplary is not None:
-        query = query.filter_by(is_exemplary=is_exemplary.lower() == 'true')
+        query = query.filter(Evaluation.is_exemplary == (is_exemplary.lower() == 'true'))
     
-    # Operadores só veem avaliações de suas próprias chamadas
+    # Operadores só veem avaliações de suas próprias chamadas; os demais
+    # podem filtrar por operador. Ambos os casos passam pela chamada.
     if current_user.role == 'operator':
-        query = query.join(Call).filter(Call.operator_id == current_user_id)
+        operator_id = current_user.id
+    
+    if operator_id:
+        if not call_joined:
+            query = query.join(Call, Call.id == Evaluation.call_id)
+        query = query.filter(Call.operator_id == operator_id)
+    
+    return query
+
+@evaluations_bp.route('/', methods=['GET'])
+@require_role()
+def get_evaluations():
+    """Listar avaliações com filtros"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    # Projeção das colunas de to_dict (avaliador por JOIN), serializada sem instanciar o ORM
+    query = filter_evaluations(evaluation_projection.query(), request.args, current_user)
+    
+    # Paginação por cursor (keyset): sem OFFSET e com total opcional
+    if 'cursor' in request.args:
+        try:
+            evaluations, next_cursor, prev_cursor = keyset_paginate(
+                query, Evaluation,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_LIMIT, type=int)
+            )
+        except InvalidCursor:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        
+        result = {
+            'evaluations': evaluation_projection.many(evaluations),
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+        
+        total_mode = request.args.get('total')
+        if total_mode in ('exact', 'estimate'):
+            filters = {key: request.args[key] for key in EVALUATION_FILTER_ARGS if request.args.get(key)}
+            scope = 'operator' if current_user.role == 'operator' else 'all'
+            cache_key = count_cache_key('evaluations', scope, current_user.id if scope == 'operator' else None, filters)
+            result['total'], result['total_is_estimate'] = resolve_total(
+                total_mode, query, Evaluation, cache_key, filtered=bool(filters) or scope == 'operator'
+            )
+        
+        return jsonify(result), 200
     
     # Paginação
     pagination = query.order_by(Evaluation.created_at.desc()).paginate(
@@ -51,20 +103,149 @@ def get_evaluations():
     )
     
     return jsonify({
-        'evaluations': [evaluation.to_dict() for evaluation in pagination.items],
+        'evaluations': evaluation_projection.many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
     }), 200
 
+@evaluations_bp.route('/export', methods=['GET'])
+@require_role()
+def export_evaluations():
+    """Exportar avaliações filtradas em CSV ou NDJSON (streaming)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Formato de exportação inválido (use csv ou ndjson)'}), 400
+    
+    # A consulta de exportação já faz JOIN com a chamada
+    query = filter_evaluations(
+        evaluations_export_query(), request.args, current_user, call_joined=True
+    )
+    
+    return export_response(query, Evaluation, export_format, 'avaliacoes')
+
+@evaluations_bp.route('/queue', methods=['GET'])
+@require_role('supervisor', 'admin', error='Sem permissão para acessar a fila de avaliação')
+def get_evaluation_queue():
+    """Resumo da fila de avaliação por operador e reservas do usuário"""
+    current_period = evaluation_sampler.current_period()
+    
+    # Pendentes e reservadas de qualquer período; concluídas só do período corrente
+    rows = db.session.query(
+        EvaluationQueueEntry.operator_id,
+        User.full_name,
+        EvaluationQueueEntry.status,
+        func.count(EvaluationQueueEntry.id)
+    ).join(User, User.id == EvaluationQueueEntry.operator_id)\
+     .filter(or_(
+         EvaluationQueueEntry.status != 'done',
+         EvaluationQueueEntry.period_start >= current_period
+     ))\
+     .group_by(EvaluationQueueEntry.operator_id, User.full_name, EvaluationQueueEntry.status)\
+     .all()
+    
+    operators = {}
+    totals = {'pending': 0, 'claimed': 0, 'done': 0}
+    for operator_id, full_name, status, count in rows:
+        operator = operators.setdefault(operator_id, {
+            'operator_id': operator_id, 'operator_name': full_name, 'pending': 0, 'claimed': 0, 'done': 0
+        })
+        operator[status] += count
+        totals[status] += count
+    
+    claims = EvaluationQueueEntry.query.filter(
+        EvaluationQueueEntry.claimed_by == current_user.id,
+        EvaluationQueueEntry.status == 'claimed',
+        EvaluationQueueEntry.lease_expires_at >= datetime.utcnow()
+    ).order_by(EvaluationQueueEntry.sampled_at).all()
+    
+    return jsonify({
+        'period': evaluation_sampler.period,
+        'period_start': current_period.isoformat(),
+        **totals,
+        'operators': sorted(operators.values(), key=lambda operator: operator['operator_id']),
+        'claims': [entry.to_dict() for entry in claims]
+    }), 200
+
+@evaluations_bp.route('/queue/claim', methods=['POST'])
+@require_role('supervisor', 'admin', error='Sem permissão para acessar a fila de avaliação')
+def claim_evaluation_queue():
+    """Reservar as próximas chamadas da fila para o avaliador"""
+    data = request.get_json(silent=True) or {}
+    limit = data.get('limit', 1)
+    operator_id = data.get('operator_id')
+    
+    # bool é subclasse de int no Python: true/false não valem como limite
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_QUEUE_CLAIM:
+        return jsonify({'error': f'Campo limit deve ser um inteiro entre 1 e {MAX_QUEUE_CLAIM}'}), 400
+    
+    if operator_id is not None and (isinstance(operator_id, bool) or not isinstance(operator_id, int)):
+        return jsonify({'error': 'Campo operator_id deve ser um inteiro'}), 400
+    
+    try:
+        claimed = evaluation_sampler.claim(current_user.id, limit, operator_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao reservar chamadas', 'details': str(e)}), 500
+    
+    # Chamada e operador carregados por JOIN junto com as entradas
+    entries = EvaluationQueueEntry.query.options(
+        joinedload(EvaluationQueueEntry.call).joinedload(Call.operator)
+    ).filter(EvaluationQueueEntry.id.in_(claimed)).order_by(EvaluationQueueEntry.sampled_at).all()
+    
+    return jsonify({
+        'claims': [entry.to_dict(include_call=True) for entry in entries],
+        'lease_seconds': evaluation_sampler.lease_seconds
+    }), 200
+
+@evaluations_bp.route('/queue/<int:entry_id>/release', methods=['POST'])
+@require_role('supervisor', 'admin', error='Sem permissão para acessar a fila de avaliação')
+def release_evaluation_queue_entry(entry_id):
+    """Devolver à fila uma chamada reservada"""
+    entry = EvaluationQueueEntry.query.get(entry_id)
+    
+    if not entry:
+        return jsonify({'error': 'Entrada da fila não encontrada'}), 404
+    
+    if entry.status != 'claimed':
+        return jsonify({'error': 'Entrada da fila não está reservada'}), 409
+    
+    # Apenas quem reservou ou admin pode devolver
+    if current_user.role != 'admin' and entry.claimed_by != current_user.id:
+        return jsonify({'error': 'Sem permissão para devolver esta reserva'}), 403
+    
+    entry.status = 'pending'
+    entry.claimed_by = None
+    entry.lease_expires_at = None
+    
+    try:
+        db.session.commit()
+        return jsonify({'message': 'Reserva devolvida com sucesso', 'entry': entry.to_dict()}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao devolver reserva', 'details': str(e)}), 500
+
+def evaluation_validators(evaluation_id):
+    """Versões de GET /api/evaluations/<id>: a avaliação e o avaliador (nome exibido)"""
+    evaluator = aliased(User)
+    row = db.session.query(Call.operator_id, Evaluation.updated_at, evaluator.updated_at)\
+                    .join(Call, Call.id == Evaluation.call_id)\
+                    .outerjoin(evaluator, evaluator.id == Evaluation.evaluator_id)\
+                    .filter(Evaluation.id == evaluation_id).first()
+    if row is None:
+        return None
+    
+    if current_user.role == 'operator' and row.operator_id != current_user.id:
+        return None
+    return tuple(row), max(value for value in row[1:] if value is not None)
+
 @evaluations_bp.route('/<int:evaluation_id>', methods=['GET'])
-@jwt_required()
+@require_role()
+@conditional_get(evaluation_validators)
 def get_evaluation(evaluation_id):
     """Obter avaliação por ID"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    evaluation = Evaluation.query.get(evaluation_id)
+    evaluation = Evaluation.query.options(joinedload(Evaluation.evaluator)).get(evaluation_id)
     
     if not evaluation:
         return jsonify({'error': 'Avaliação não encontrada'}), 404
@@ -72,22 +253,15 @@ def get_evaluation(evaluation_id):
     # Operadores só podem ver avaliações de suas próprias chamadas
     if current_user.role == 'operator':
         call = Call.query.get(evaluation.call_id)
-        if call.operator_id != current_user_id:
+        if call.operator_id != current_user.id:
             return jsonify({'error': 'Sem permissão para visualizar esta avaliação'}), 403
     
     return jsonify(evaluation.to_dict()), 200
 
 @evaluations_bp.route('/', methods=['POST'])
-@jwt_required()
+@require_role('supervisor', 'admin', error='Sem permissão para criar avaliações')
 def create_evaluation():
-    """Criar nova avaliação"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    # Apenas supervisores e admins podem criar avaliações
-    if current_user.role not in ['supervisor', 'admin']:
-        return jsonify({'error': 'Sem permissão para criar avaliações'}), 403
-    
+    """Criar nova avaliação (apenas supervisores e admins)"""
     data = request.get_json()
     
     # Validar campos obrigatórios
@@ -99,16 +273,28 @@ def create_evaluation():
     if not call:
         return jsonify({'error': 'Chamada não encontrada'}), 404
     
+    # Chamada sorteada e reservada por outro avaliador
+    lease_holder = evaluation_sampler.lease_holder(call.id)
+    if lease_holder is not None and lease_holder != current_user.id:
+        return jsonify({'error': 'Chamada reservada para outro avaliador'}), 409
+    
+    criteria_scores = data.get('criteria_scores')
+    if criteria_scores is not None:
+        error = validate_criteria_scores(criteria_scores)
+        if error:
+            return jsonify({'error': error}), 400
+    
     # Criar avaliação
     evaluation = Evaluation(
         call_id=data['call_id'],
-        evaluator_id=current_user_id,
+        evaluator_id=current_user.id,
         greeting_score=data.get('greeting_score'),
         communication_score=data.get('communication_score'),
         problem_solving_score=data.get('problem_solving_score'),
         empathy_score=data.get('empathy_score'),
         procedure_score=data.get('procedure_score'),
         closing_score=data.get('closing_score'),
+        criteria_scores=criteria_scores,
         positive_points=data.get('positive_points'),
         improvement_points=data.get('improvement_points'),
         general_comments=data.get('general_comments'),
@@ -116,8 +302,9 @@ def create_evaluation():
         is_exemplary=data.get('is_exemplary', False)
     )
     
-    # Calcular pontuação geral
-    evaluation.calculate_overall_score()
+    # Calcular pontuação geral com a rubrica vigente da categoria
+    evaluation.rubric_id, weights = rubric_cache.for_category(call.category)
+    evaluation.calculate_overall_score(weights)
     
     try:
         db.session.add(evaluation)
@@ -131,36 +318,46 @@ def create_evaluation():
         return jsonify({'error': 'Erro ao criar avaliação', 'details': str(e)}), 500
 
 @evaluations_bp.route('/<int:evaluation_id>', methods=['PUT'])
-@jwt_required()
+@require_role('supervisor', 'admin', error='Sem permissão para atualizar avaliações')
 def update_evaluation(evaluation_id):
-    """Atualizar avaliação"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    # Apenas supervisores e admins podem atualizar avaliações
-    if current_user.role not in ['supervisor', 'admin']:
-        return jsonify({'error': 'Sem permissão para atualizar avaliações'}), 403
-    
+    """Atualizar avaliação (apenas supervisores e admins)"""
     evaluation = Evaluation.query.get(evaluation_id)
     
     if not evaluation:
         return jsonify({'error': 'Avaliação não encontrada'}), 404
     
     # Apenas o avaliador original ou admin pode atualizar
-    if current_user.role != 'admin' and evaluation.evaluator_id != current_user_id:
+    if current_user.role != 'admin' and evaluation.evaluator_id != current_user.id:
         return jsonify({'error': 'Sem permissão para atualizar esta avaliação'}), 403
     
     data = request.get_json()
     
+    criteria_scores = data.get('criteria_scores')
+    if criteria_scores is not None:
+        error = validate_criteria_scores(criteria_scores)
+        if error:
+            return jsonify({'error': error}), 400
+    
     # Atualizar campos
     score_fields = [
         'greeting_score', 'communication_score', 'problem_solving_score',
         'empathy_score', 'procedure_score', 'closing_score'
     ]
     
-    for field in score_fields:
-        if field in data:
-            setattr(evaluation, field, data[field])
+    # Só alterações de nota recalculam a pontuação geral; edições de texto e
+    # flags mantêm a nota e a rubrica com que a avaliação foi calculada
+    scores = {field: data[field] for field in score_fields if field in data}
+    if 'criteria_scores' in data:
+        scores['criteria_scores'] = data['criteria_scores']
+    rescore = any(value != getattr(evaluation, field) for field, value in scores.items())
+    
+    if rescore:
+        # Rubrica vigente da categoria, lida antes das alterações para não antecipar o flush
+        category = db.session.query(Call.category).filter(Call.id == evaluation.call_id).scalar()
+        rubric_id, weights = rubric_cache.for_category(category)
+    
+    for field, value in scores.items():
+        setattr(evaluation, field, value)
     
     text_fields = ['positive_points', 'improvement_points', 'general_comments']
     for field in text_fields:
@@ -174,7 +371,9 @@ def update_evaluation(evaluation_id):
         evaluation.is_exemplary = data['is_exemplary']
     
     # Recalcular pontuação geral
-    evaluation.calculate_overall_score()
+    if rescore:
+        evaluation.rubric_id = rubric_id
+        evaluation.calculate_overall_score(weights)
     
     try:
         db.session.commit()
@@ -187,16 +386,9 @@ def update_evaluation(evaluation_id):
         return jsonify({'error': 'Erro ao atualizar avaliação', 'details': str(e)}), 500
 
 @evaluations_bp.route('/<int:evaluation_id>', methods=['DELETE'])
-@jwt_required()
+@require_role('admin', error='Sem permissão para deletar avaliações')
 def delete_evaluation(evaluation_id):
-    """Deletar avaliação"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    # Apenas admin pode deletar avaliações
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Sem permissão para deletar avaliações'}), 403
-    
+    """Deletar avaliação (apenas admin)"""
     evaluation = Evaluation.query.get(evaluation_id)
     
     if not evaluation:
@@ -0,0 +1,78 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import current_user
+from sqlalchemy import func
+from app import db
+from app.models.rubric import Rubric
+from app.models.evaluation import DEFAULT_WEIGHTS
+from app.services.authz import require_role
+from app.services.scoring import active_rubrics, validate_weights
+
+rubrics_bp = Blueprint('rubrics', __name__)
+
+@rubrics_bp.route('/', methods=['GET'])
+@require_role('supervisor', 'admin', error='Sem permissão para visualizar rubricas')
+def get_rubrics():
+    """Listar as rubricas vigentes (última versão de cada categoria)"""
+    return jsonify({
+        'rubrics': [rubric.to_dict() for rubric in active_rubrics()],
+        'default_weights': DEFAULT_WEIGHTS
+    }), 200
+
+@rubrics_bp.route('/history', methods=['GET'])
+@require_role('supervisor', 'admin', error='Sem permissão para visualizar rubricas')
+def get_rubric_history():
+    """Listar todas as versões de rubrica, opcionalmente de uma categoria"""
+    query = Rubric.query
+    
+    category = request.args.get('category')
+    if category is not None:
+        query = query.filter(Rubric.category == category)
+    
+    rubrics = query.order_by(Rubric.category, Rubric.version.desc()).all()
+    return jsonify({'rubrics': [rubric.to_dict() for rubric in rubrics]}), 200
+
+@rubrics_bp.route('/<int:rubric_id>', methods=['GET'])
+@require_role('supervisor', 'admin', error='Sem permissão para visualizar rubricas')
+def get_rubric(rubric_id):
+    """Obter versão de rubrica por ID"""
+    rubric = Rubric.query.get(rubric_id)
+    
+    if not rubric:
+        return jsonify({'error': 'Rubrica não encontrada'}), 404
+    
+    return jsonify(rubric.to_dict()), 200
+
+@rubrics_bp.route('/', methods=['POST'])
+@require_role('admin', error='Sem permissão para alterar rubricas')
+def create_rubric():
+    """Publicar nova versão de rubrica para uma categoria (apenas admin)"""
+    data = request.get_json()
+    
+    weights = data.get('weights')
+    error = validate_weights(weights)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Sem categoria: rubrica padrão
+    category = data.get('category') or ''
+    version = db.session.query(func.max(Rubric.version)).filter(Rubric.category == category).scalar() or 0
+    
+    rubric = Rubric(
+        category=category,
+        version=version + 1,
+        weights={criterion: float(weight) for criterion, weight in weights.items()},
+        created_by=current_user.id
+    )
+    
+    try:
+        db.session.add(rubric)
+        db.session.commit()
+        return jsonify({
+            'message': 'Rubrica publicada com sucesso',
+            # Novas avaliações já usam a nova versão; o histórico é recalculado por recompute_scores.py
+            'recompute_required': True,
+            'rubric': rubric.to_dict()
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao publicar rubrica', 'details': str(e)}), 500
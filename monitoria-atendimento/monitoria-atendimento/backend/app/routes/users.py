@@ -1,34 +1,60 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import current_user
+from sqlalchemy import func
 from app import db
 from app.models.user import User
+from app.services.authz import require_role
+from app.services.conditional import conditional_get
+from app.services.passwords import PasswordHashBusy, password_hasher
+from app.services.serialization import user_projection
 
 users_bp = Blueprint('users', __name__)
 
-@users_bp.route('/', methods=['GET'])
-@jwt_required()
-def get_users():
-    """Listar todos os usuários"""
-    role = request.args.get('role')
-    is_active = request.args.get('is_active')
-    
-    query = User.query
+def filter_users(query, args):
+    """Aplica os filtros da listagem de usuários"""
+    role = args.get('role')
+    is_active = args.get('is_active')
     
     if role:
-        query = query.filter_by(role=role)
+        query = query.filter(User.role == role)
     
     if is_active is not None:
-        query = query.filter_by(is_active=is_active.lower() == 'true')
+        query = query.filter(User.is_active == (is_active.lower() == 'true'))
     
+    return query
+
+def users_validators():
+    """Versões da listagem: quantidade e última alteração dos usuários filtrados.
+    
+    Inclusões e alterações avançam o maior updated_at e exclusões mudam a quantidade.
+    """
+    total, updated_at = filter_users(
+        db.session.query(func.count(User.id), func.max(User.updated_at)), request.args
+    ).one()
+    return (total, updated_at), updated_at
+
+def user_validators(user_id):
+    updated_at = db.session.query(User.updated_at).filter(User.id == user_id).scalar()
+    if updated_at is None:
+        return None
+    return (updated_at,), updated_at
+
+@users_bp.route('/', methods=['GET'])
+@require_role()
+@conditional_get(users_validators)
+def get_users():
+    """Listar todos os usuários"""
+    query = filter_users(user_projection.query(), request.args)
     users = query.order_by(User.full_name).all()
     
     return jsonify({
-        'users': [user.to_dict() for user in users],
+        'users': user_projection.many(users),
         'total': len(users)
     }), 200
 
 @users_bp.route('/<int:user_id>', methods=['GET'])
-@jwt_required()
+@require_role()
+@conditional_get(user_validators)
 def get_user(user_id):
     """Obter usuário por ID"""
     user = User.query.get(user_id)
@@ -39,14 +65,11 @@ def get_user(user_id):
     return jsonify(user.to_dict()), 200
 
 @users_bp.route('/<int:user_id>', methods=['PUT'])
-@jwt_required()
+@require_role()
 def update_user(user_id):
     """Atualizar usuário"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
     # Verificar permissões (apenas admin ou o próprio usuário)
-    if current_user.role != 'admin' and current_user_id != user_id:
+    if current_user.role != 'admin' and current_user.id != user_id:
         return jsonify({'error': 'Sem permissão para atualizar este usuário'}), 403
     
     user = User.query.get(user_id)
@@ -72,7 +95,11 @@ def update_user(user_id):
             user.is_active = data['is_active']
     
     if 'password' in data and data['password']:
-        user.set_password(data['password'])
+        try:
+            user.password_hash = password_hasher.hash(data['password'])
+        except PasswordHashBusy:
+            db.session.rollback()
+            return jsonify({'error': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': '1'}
     
     try:
         db.session.commit()
@@ -85,16 +112,9 @@ def update_user(user_id):
         return jsonify({'error': 'Erro ao atualizar usuário', 'details': str(e)}), 500
 
 @users_bp.route('/<int:user_id>', methods=['DELETE'])
-@jwt_required()
+@require_role('admin', error='Sem permissão para desativar usuários')
 def delete_user(user_id):
     """Desativar usuário (soft delete)"""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(int(current_user_id))
-    
-    # Apenas admin pode desativar usuários
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Sem permissão para desativar usuários'}), 403
-    
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -0,0 +1,86 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select
+from app import db
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.models.evaluation_queue import EvaluationQueueEntry
+from app.models.archive import ArchivedCall
+from app.services.serialization import call_projection, evaluation_projection
+from app.services.changes import record_changes, call_owners
+
+# Situações de chamada que podem ir para o arquivo
+ARCHIVE_STATUSES = ('closed',)
+
+# Chamadas movidas por transação
+ARCHIVE_BATCH_SIZE = 1000
+
+def archive_cutoff(older_than_days, now=None):
+    return (now or datetime.utcnow()) - timedelta(days=older_than_days)
+
+def _archive_batch(call_ids):
+    """Grava os documentos comprimidos das chamadas e as remove das tabelas quentes"""
+    evaluations = defaultdict(list)
+    rows = evaluation_projection.query().filter(Evaluation.call_id.in_(call_ids))\
+                                        .order_by(Evaluation.id)
+    for evaluation in evaluation_projection.many(rows):
+        evaluations[evaluation['call_id']].append(evaluation)
+    
+    now = datetime.utcnow()
+    archived = []
+    for row in call_projection.query().filter(Call.id.in_(call_ids)):
+        data = call_projection.serialize(row)
+        data['evaluations'] = evaluations[data['id']]
+        archived.append({
+            'id': row.id,
+            'protocol': row.protocol,
+            'operator_id': row.operator_id,
+            'created_at': row.created_at,
+            'closed_at': row.closed_at,
+            'archived_at': now,
+            'payload': ArchivedCall.compress(data)
+        })
+    
+    db.session.execute(insert(ArchivedCall.__table__), archived)
+    
+    # Para o feed de alterações, chamadas arquivadas e suas avaliações saem das tabelas quentes
+    connection = db.session.connection()
+    record_changes(connection, 'evaluation', 'delete', select(Evaluation.id, Call.operator_id).join(
+        Call, Call.id == Evaluation.call_id
+    ).where(Evaluation.call_id.in_(call_ids)))
+    record_changes(connection, 'call', 'delete', call_owners(call_ids))
+    
+    db.session.execute(delete(EvaluationQueueEntry.__table__).where(EvaluationQueueEntry.call_id.in_(call_ids)))
+    db.session.execute(delete(Evaluation.__table__).where(Evaluation.call_id.in_(call_ids)))
+    db.session.execute(delete(Call.__table__).where(Call.id.in_(call_ids)))
+
+def archive_calls(older_than_days, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    """Move as chamadas encerradas criadas há mais de older_than_days dias para archived_calls.
+    
+    Cada lote grava o documento da chamada com as avaliações (o mesmo de
+    GET /api/calls/<id>) comprimido e remove chamada, avaliações e entrada da
+    fila, em uma transação. Os rollups e histogramas não mudam: os painéis
+    continuam contando o histórico arquivado (ao reconstruí-los, use uma data
+    --since posterior ao corte). progress(arquivadas) é chamado a cada lote.
+    Retorna o número de chamadas arquivadas.
+    """
+    cutoff = archive_cutoff(older_than_days)
+    archivable = select(Call.id).where(
+        Call.status.in_(ARCHIVE_STATUSES), Call.created_at < cutoff
+    ).order_by(Call.created_at, Call.id).limit(batch_size)
+    
+    archived = 0
+    while True:
+        call_ids = db.session.execute(archivable).scalars().all()
+        if not call_ids:
+            break
+        
+        _archive_batch(call_ids)
+        # Listas recentes do dashboard podem conter chamadas arquivadas
+        db.session.info['dashboard_cache_stale'] = True
+        db.session.commit()
+        
+        archived += len(call_ids)
+        if progress is not None:
+            progress(archived)
+    return archived
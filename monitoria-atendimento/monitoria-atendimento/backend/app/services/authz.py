@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import jwt_required, current_user, get_jwt
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+from app import db, jwt
+from app.models.user import User
+from app.services.cache import SQLiteStore
+
+# Atributos do usuário cuja alteração revoga os claims já emitidos
+AUTHORIZATION_ATTRIBUTES = ['role', 'is_active']
+
+# Usuário autenticado, montado a partir dos claims do token (sem consulta ao banco)
+Principal = namedtuple('Principal', ['id', 'role', 'is_active', 'auth_version'])
+
+class UserCache(SQLiteStore):
+    """Papel e situação dos usuários, em memória por worker.
+    
+    Uma versão global fica no arquivo compartilhado entre os workers e é
+    incrementada quando o papel ou a situação de algum usuário muda. Tokens
+    emitidos na versão corrente são autorizados só pelos claims; os demais
+    consultam este cache, descartado sempre que a versão avança.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.max_entries = 1024
+        self._users = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.max_entries = app.config.get('AUTH_USER_CACHE_SIZE', 1024)
+        self._configure(app.config.get('AUTH_STATE_PATH', ':memory:'))
+        self._users = OrderedDict()
+        self._version = None
+        app.extensions['user_cache'] = self
+    
+    @staticmethod
+    def _create_schema(connection):
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters (name, value) VALUES ('auth_version', 0);
+        ''')
+    
+    def version(self):
+        """Versão corrente do estado de autorização"""
+        return self._connect().execute(
+            "SELECT value FROM counters WHERE name = 'auth_version'"
+        ).fetchone()[0]
+    
+    def bump(self):
+        """Revoga os claims emitidos até agora em todos os workers"""
+        connection = self._connect()
+        with self._transaction(connection):
+            connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'auth_version'")
+    
+    def get(self, user_id, version):
+        """(papel, ativo) do usuário na versão informada; None se não existir"""
+        with self._lock:
+            if version != self._version:
+                self._users.clear()
+                self._version = version
+            if user_id in self._users:
+                self._users.move_to_end(user_id)
+                return self._users[user_id]
+        
+        # A versão é lida antes da consulta: uma alteração concorrente
+        # incrementa a versão depois do commit e descarta esta entrada
+        user = db.session.get(User, user_id)
+        state = (user.role, user.is_active) if user else None
+        
+        with self._lock:
+            if version == self._version:
+                self._users[user_id] = state
+                while len(self._users) > self.max_entries:
+                    self._users.popitem(last=False)
+        return state
+
+user_cache = UserCache()
+
+def token_claims(user, version):
+    """Claims de autorização incluídos nos tokens (additional_claims)"""
+    return {'role': user.role, 'is_active': user.is_active, 'auth_version': version}
+
+def require_role(*roles, error='Sem permissão para acessar este recurso', refresh=False, locations=None,
+                 scope=None):
+    """Exige token válido de usuário ativo e, se informado, um dos papéis.
+    
+    Tokens com o claim 'scope' (ex.: o ticket do stream ao vivo) só valem nas
+    rotas que exigem o mesmo escopo; os tokens de sessão, nas demais.
+    """
+    def decorator(view):
+        @wraps(view)
+        @jwt_required(refresh=refresh, locations=locations)
+        def wrapper(*args, **kwargs):
+            if get_jwt().get('scope') != scope:
+                return jsonify({'error': 'Token inválido para este recurso'}), 401
+            
+            if not current_user.is_active:
+                return jsonify({'error': 'Usuário inativo'}), 403
+            
+            if roles and current_user.role not in roles:
+                return jsonify({'error': error}), 403
+            
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@jwt.user_lookup_loader
+def _load_principal(jwt_header, jwt_data):
+    """Monta o usuário autenticado pelos claims; consulta o cache se foram revogados"""
+    user_id = int(jwt_data['sub'])
+    version = user_cache.version()
+    
+    if jwt_data.get('auth_version') == version:
+        return Principal(user_id, jwt_data['role'], jwt_data['is_active'], version)
+    
+    state = user_cache.get(user_id, version)
+    if state is None:
+        return None
+    return Principal(user_id, state[0], state[1], version)
+
+@jwt.user_lookup_error_loader
+def _principal_not_found(jwt_header, jwt_data):
+    return jsonify({'error': 'Usuário não encontrado'}), 401
+
+def init_app(app):
+    """Configura o cache de usuários do worker"""
+    user_cache.init_app(app)
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_authorization_changes(session, flush_context):
+    """Marca a sessão quando o papel ou a situação de algum usuário mudou"""
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            session.info['auth_version_stale'] = True
+            return
+    
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(
+            attributes.get_history(obj, attr).has_changes() for attr in AUTHORIZATION_ATTRIBUTES
+        ):
+            session.info['auth_version_stale'] = True
+            return
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_after_commit(session):
+    """Revoga os claims apenas depois que a alteração está visível para os outros workers"""
+    if session.info.pop('auth_version_stale', False):
+        user_cache.bump()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_authorization_mark(session):
+    session.info.pop('auth_version_stale', None)
@@ -0,0 +1,298 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event, inspect
+from app import db
+from app.models.user import User
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.services.routing import primary_reads
+
+# Modelos cujas alterações invalidam os resultados cacheados do dashboard
+INVALIDATING_MODELS = (Call, Evaluation, User)
+
+# Colunas que o dashboard não exibe: alterá-las não invalida o cache (ex.: o
+# rehash da senha no login)
+NON_INVALIDATING_ATTRIBUTES = {User: {'password_hash', 'updated_at'}}
+
+class SharedConnection:
+    """Conexão SQLite única do processo; comandos e transações são serializados pelo lock.
+    
+    Uma conexão por thread abriria uma nova conexão (PRAGMAs e esquema) a cada
+    greenlet no gevent; o sqlite3 é compilado em modo serializado, então a
+    mesma conexão atende todas as threads do worker.
+    """
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.RLock()
+    
+    def execute(self, *args):
+        with self.lock:
+            return self.connection.execute(*args)
+    
+    def executemany(self, *args):
+        with self.lock:
+            return self.connection.executemany(*args)
+    
+    def executescript(self, script):
+        with self.lock:
+            return self.connection.executescript(script)
+
+class SQLiteStore:
+    """Estado compartilhado entre os workers do gunicorn em um arquivo SQLite (modo WAL)"""
+    
+    def __init__(self):
+        self.path = None
+        self._shared = None
+        self._shared_pid = None
+        self._connect_lock = threading.Lock()
+    
+    def _configure(self, path):
+        self.path = path
+        self._shared = None
+        self._shared_pid = None
+    
+    def _connect(self):
+        """Conexão única do processo (reaberta no worker após o fork do gunicorn)"""
+        with self._connect_lock:
+            if self._shared is None or self._shared_pid != os.getpid():
+                if self.path == ':memory:':
+                    connection = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+                else:
+                    connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False,
+                                                 isolation_level=None)
+                    connection.execute('PRAGMA journal_mode=WAL')
+                    connection.execute('PRAGMA synchronous=NORMAL')
+                self._create_schema(connection)
+                self._shared = SharedConnection(connection)
+                self._shared_pid = os.getpid()
+            return self._shared
+    
+    @staticmethod
+    def _create_schema(connection):
+        raise NotImplementedError
+    
+    @staticmethod
+    @contextmanager
+    def _transaction(connection):
+        """Transação explícita com lock de escrita (conexões em modo autocommit)"""
+        with connection.lock:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+class DashboardCache(SQLiteStore):
+    """Cache de resultados do dashboard com TTL e despejo LRU.
+    
+    Os dados ficam em um arquivo SQLite (modo WAL), compartilhado entre os
+    workers do gunicorn. Cada invalidação incrementa uma geração global;
+    entradas calculadas em uma geração anterior são descartadas, o que evita
+    gravar no cache um resultado calculado antes de um commit concorrente.
+    Um acerto só lê o arquivo: os contadores de acertos e falhas ficam no
+    worker e são somados ao arquivo a cada flush_interval segundos, e o
+    last_access do LRU é regravado no máximo uma vez por intervalo.
+    Pelo mesmo motivo da geração, os valores são calculados no primário mesmo nas
+    requisições roteadas para uma réplica.
+    """
+    
+    def __init__(self, app=None):
+        super().__init__()
+        self.enabled = False
+        self.ttl = 60
+        self.max_entries = 1000
+        self.flush_interval = 5
+        self._counts = {'hits': 0, 'misses': 0}
+        self._last_flush = 0.0
+        self._counts_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Configura o cache a partir da configuração da aplicação"""
+        self.enabled = app.config.get('DASHBOARD_CACHE_ENABLED', True)
+        self.ttl = app.config.get('DASHBOARD_CACHE_TTL', 60)
+        self.max_entries = app.config.get('DASHBOARD_CACHE_MAX_ENTRIES', 1000)
+        self.flush_interval = app.config.get('DASHBOARD_CACHE_FLUSH_INTERVAL', 5)
+        self._counts = {'hits': 0, 'misses': 0}
+        self._last_flush = 0.0
+        self._configure(app.config.get('DASHBOARD_CACHE_PATH', ':memory:'))
+        app.extensions['dashboard_cache'] = self
+    
+    @staticmethod
+    def _create_schema(connection):
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters (name, value) VALUES
+                ('generation', 0), ('hits', 0), ('misses', 0), ('invalidations', 0);
+        ''')
+    
+    @staticmethod
+    def make_key(endpoint, scope, operator_id=None, days=None, limit=None):
+        """Monta a chave (endpoint, escopo do perfil, operador, dias, limite)"""
+        return f'{endpoint}:{scope}:{operator_id}:{days}:{limit}'
+    
+    def _generation(self, connection):
+        return connection.execute(
+            "SELECT value FROM counters WHERE name = 'generation'"
+        ).fetchone()[0]
+    
+    def generation(self):
+        """Geração corrente, que avança a cada invalidação; None com o cache desativado"""
+        if not self.enabled:
+            return None
+        return self._generation(self._connect())
+    
+    def _increment(self, connection, name):
+        connection.execute('UPDATE counters SET value = value + 1 WHERE name = ?', (name,))
+    
+    def _count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Soma os acertos e falhas acumulados neste worker aos contadores do arquivo"""
+        with self._counts_lock:
+            counts = [(value, name) for name, value in self._counts.items() if value]
+            self._counts = {'hits': 0, 'misses': 0}
+            self._last_flush = time.monotonic()
+        if counts and self.path is not None:
+            self._connect().executemany('UPDATE counters SET value = value + ? WHERE name = ?', counts)
+    
+    def get_or_compute(self, key, compute):
+        """Retorna o valor cacheado ou calcula, armazena e retorna um novo"""
+        if not self.enabled:
+            return compute()
+        
+        connection = self._connect()
+        now = time.time()
+        generation = self._generation(connection)
+        
+        row = connection.execute(
+            'SELECT value, last_access FROM entries WHERE key = ? AND generation = ? AND expires_at > ?',
+            (key, generation, now)
+        ).fetchone()
+        
+        if row is not None:
+            # Escrita (lock do arquivo) só quando o last_access ficou para trás
+            if now - row[1] >= self.flush_interval:
+                connection.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self._count('hits')
+            return json.loads(row[0])
+        
+        self._count('misses')
+        # Calculado no primário: uma réplica atrasada gravaria na geração nova (que
+        # também é a ETag do dashboard) um resultado anterior à escrita que a criou
+        with primary_reads():
+            value = compute()
+        
+        with self._transaction(connection):
+            # Não grava se houve invalidação durante o cálculo
+            if self._generation(connection) == generation:
+                connection.execute(
+                    'INSERT OR REPLACE INTO entries (key, value, generation, expires_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, json.dumps(value), generation, now + self.ttl, now)
+                )
+                self._evict(connection)
+        
+        return value
+    
+    def _evict(self, connection):
+        """Remove as entradas menos usadas recentemente acima do limite"""
+        connection.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),))
+        connection.execute('''
+            DELETE FROM entries WHERE key IN (
+                SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+    
+    def invalidate(self):
+        """Descarta todas as entradas incrementando a geração"""
+        if not self.enabled:
+            return
+        
+        connection = self._connect()
+        with self._transaction(connection):
+            self._increment(connection, 'generation')
+            self._increment(connection, 'invalidations')
+            connection.execute('DELETE FROM entries')
+    
+    def stats(self):
+        """Contadores de acertos, falhas e invalidações"""
+        if not self.enabled:
+            return {'enabled': False}
+        
+        self.flush()
+        connection = self._connect()
+        counters = dict(connection.execute('SELECT name, value FROM counters').fetchall())
+        entries = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        
+        return {
+            'enabled': True,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_ratio': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+            'invalidations': counters['invalidations'],
+            'generation': counters['generation']
+        }
+
+dashboard_cache = DashboardCache()
+
+def _changes_dashboard(obj):
+    """Alguma coluna exibida pelo dashboard mudou no objeto (já gravado)"""
+    ignored = NON_INVALIDATING_ATTRIBUTES.get(type(obj))
+    if not ignored:
+        return True
+    state = inspect(obj)
+    return any(
+        state.attrs[attr.key].history.has_changes()
+        for attr in state.mapper.column_attrs if attr.key not in ignored
+    )
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_dashboard_stale(session, flush_context):
+    """Marca a sessão quando chamadas, avaliações ou usuários foram gravados"""
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, INVALIDATING_MODELS):
+            session.info['dashboard_cache_stale'] = True
+            return
+    
+    for obj in session.dirty:
+        if isinstance(obj, INVALIDATING_MODELS) and _changes_dashboard(obj):
+            session.info['dashboard_cache_stale'] = True
+            return
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    """Invalida o cache apenas depois que a escrita está visível para os outros workers"""
+    if session.info.pop('dashboard_cache_stale', False):
+        dashboard_cache.invalidate()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stale_mark(session):
+    session.info.pop('dashboard_cache_stale', None)
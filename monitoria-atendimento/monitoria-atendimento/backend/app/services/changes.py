@@ -0,0 +1,259 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, insert, select, delete, exists, bindparam, or_, text, Integer
+from sqlalchemy.orm import attributes
+from app import db
+from app.models.user import User
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.models.change_log import ChangeLogEntry, ChangeLogCompaction
+from app.services.pagination import InvalidCursor
+from app.services.serialization import call_projection, evaluation_projection, user_projection
+
+# Registros acompanhados pelo feed: entidade -> (modelo, projeção do documento)
+CHANGE_ENTITIES = {
+    'call': (Call, call_projection),
+    'evaluation': (Evaluation, evaluation_projection),
+    'user': (User, user_projection)
+}
+
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+# Exclusões mantidas no log antes da compactação
+DEFAULT_TOMBSTONE_DAYS = 30
+
+# Lock de transação (Postgres) tomado só para gravar o log, logo antes do
+# commit: os ids são atribuídos na ordem em que as transações fazem commit
+CHANGE_LOG_LOCK_KEY = 0x6368616e
+
+# Canal do NOTIFY (Postgres) enviado no commit de transações que gravaram no log
+CHANGE_LOG_CHANNEL = 'change_log'
+
+class CursorExpired(Exception):
+    """Cursor anterior ao horizonte da compactação (exclusões podem ter sido descartadas)"""
+
+def encode_change_cursor(log_id):
+    """Cursor compacto: o id da última entrada lida em base64 (bytes big-endian)"""
+    raw = log_id.to_bytes(max(1, (log_id.bit_length() + 7) // 8), 'big')
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_change_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode())
+    except ValueError as e:
+        raise InvalidCursor(cursor) from e
+    if not 1 <= len(raw) <= 8:
+        raise InvalidCursor(cursor)
+    return int.from_bytes(raw, 'big')
+
+def _lock_log(connection):
+    """Serializa a gravação no log até o commit e avisa os ouvintes (LISTEN) quando ele ocorrer"""
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key), pg_notify(:channel, '')"),
+                           {'key': CHANGE_LOG_LOCK_KEY, 'channel': CHANGE_LOG_CHANNEL})
+
+def record_changes(connection, entity, operation, source):
+    """Enfileira para o log as linhas (id, operator_id) do SELECT source (gravações fora do ORM).
+    
+    O SELECT roda agora (antes de uma exclusão, por exemplo); as entradas
+    são gravadas no commit da sessão, com as do ORM.
+    """
+    session = db.session()
+    for entity_id, operator_id in connection.execute(source):
+        log_change(session, entity, operation, entity_id, operator_id)
+
+def _entity(obj):
+    if isinstance(obj, Call):
+        return 'call'
+    if isinstance(obj, Evaluation):
+        return 'evaluation'
+    if isinstance(obj, User):
+        return 'user'
+    return None
+
+def _old_value(obj, attr):
+    history = attributes.get_history(obj, attr)
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+def log_change(session, entity, operation, entity_id, operator_id=None, owner_call_id=None):
+    """Enfileira uma entrada do log, gravada no commit da sessão.
+    
+    Sem operator_id, o operador é lido da chamada owner_call_id no próprio INSERT.
+    """
+    session.info.setdefault('change_log', []).append({
+        'entity': entity,
+        'entity_id': entity_id,
+        'operation': operation,
+        'known_operator_id': operator_id,
+        'owner_call_id': owner_call_id
+    })
+
+def call_owners(call_ids):
+    return select(Call.id, Call.operator_id).where(Call.id.in_(call_ids))
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_deletes(session, flush_context, instances):
+    """Exclusões guardam o operador dono antes de a linha sumir"""
+    deleted_calls = {
+        obj.id: _old_value(obj, 'operator_id') for obj in session.deleted if isinstance(obj, Call)
+    }
+    for obj in session.deleted:
+        entity = _entity(obj)
+        if entity == 'call':
+            log_change(session, entity, 'delete', obj.id, deleted_calls[obj.id])
+        elif entity == 'evaluation':
+            call_id = _old_value(obj, 'call_id')
+            log_change(session, entity, 'delete', obj.id, deleted_calls.get(call_id), owner_call_id=call_id)
+        elif entity == 'user':
+            log_change(session, entity, 'delete', obj.id)
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """Inserções e atualizações do flush (ids já atribuídos)"""
+    for operation, objects in (('insert', session.new), ('update', session.dirty)):
+        for obj in objects:
+            entity = _entity(obj)
+            if entity is None or (operation == 'update' and not session.is_modified(obj)):
+                continue
+            if entity == 'call':
+                log_change(session, entity, operation, obj.id, obj.operator_id)
+            elif entity == 'evaluation':
+                log_change(session, entity, operation, obj.id, owner_call_id=obj.call_id)
+            else:
+                log_change(session, entity, operation, obj.id)
+
+@event.listens_for(db.session, 'before_commit')
+def _write_changes(session):
+    """Grava as entradas da transação (inclusive as de outros serviços) em um único INSERT.
+    
+    O lock do log é tomado só aqui, imediatamente antes do commit, e não
+    durante a transação inteira: transações longas (lotes da ingestão, da
+    recomputação de notas) não bloqueiam as demais escritas.
+    """
+    # O flush do commit ainda não ocorreu: as entradas dele precisam estar na fila
+    session.flush()
+    rows = session.info.pop('change_log', None)
+    if not rows:
+        return
+    
+    connection = session.connection()
+    _lock_log(connection)
+    owner = select(Call.operator_id).where(Call.id == bindparam('owner_call_id', type_=Integer))
+    statement = insert(ChangeLogEntry.__table__).values(operator_id=func.coalesce(
+        bindparam('known_operator_id', type_=Integer), owner.scalar_subquery()
+    ))
+    now = datetime.utcnow()
+    connection.execute(statement, [dict(row, changed_at=now) for row in rows])
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending_changes(session):
+    session.info.pop('change_log', None)
+
+def _horizon():
+    return db.session.query(func.max(ChangeLogCompaction.horizon)).scalar() or 0
+
+def head_cursor():
+    """Cursor da entrada mais recente (ponto de partida após uma carga completa)"""
+    latest = db.session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+    # As últimas entradas podem ter sido lápides já compactadas
+    return encode_change_cursor(max(latest, _horizon()))
+
+def read_changes(since, current_user, entities=None, limit=DEFAULT_CHANGES_LIMIT):
+    """Alterações confirmadas depois do cursor since, em ordem de commit.
+    
+    Cada registro aparece uma vez por lote, na posição da sua última
+    alteração: inserções e atualizações trazem o documento atual (o mesmo
+    das listagens completas) e exclusões vêm como lápides, sem documento.
+    Operadores recebem só as suas chamadas e avaliações. Levanta
+    InvalidCursor para cursores malformados e CursorExpired para cursores
+    anteriores à última compactação, que exigem uma nova carga completa.
+    """
+    limit = max(1, min(limit, MAX_CHANGES_LIMIT))
+    since_id = decode_change_cursor(since) if since else 0
+    
+    if since_id < _horizon():
+        raise CursorExpired(since)
+    
+    log = ChangeLogEntry
+    query = db.session.query(log.id, log.entity, log.entity_id, log.operation, log.changed_at)\
+                      .filter(log.id > since_id)
+    if entities:
+        query = query.filter(log.entity.in_(entities))
+    if current_user.role == 'operator':
+        query = query.filter(or_(log.operator_id == current_user.id, log.entity == 'user'))
+    
+    entries = query.order_by(log.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    
+    # Só a última alteração de cada registro, na posição dela
+    latest = {}
+    for entry in entries:
+        key = (entry.entity, entry.entity_id)
+        latest.pop(key, None)
+        latest[key] = entry
+    
+    documents = {}
+    for entity, (model, projection) in CHANGE_ENTITIES.items():
+        ids = [entity_id for (kind, entity_id), entry in latest.items()
+               if kind == entity and entry.operation != 'delete']
+        if ids:
+            rows = projection.query().filter(model.id.in_(ids))
+            documents[entity] = {document['id']: document for document in projection.many(rows)}
+    
+    changes = []
+    for (entity, entity_id), entry in latest.items():
+        change = {
+            'entity': entity,
+            'id': entity_id,
+            'op': entry.operation,
+            'changed_at': entry.changed_at.isoformat()
+        }
+        if entry.operation != 'delete':
+            document = documents.get(entity, {}).get(entity_id)
+            if document is None:
+                # Excluído depois; a lápide vem mais adiante no feed
+                continue
+            change['data'] = document
+        changes.append(change)
+    
+    return {
+        'changes': changes,
+        'next_cursor': encode_change_cursor(entries[-1].id if entries else since_id),
+        'has_more': has_more
+    }
+
+def compact_change_log(tombstone_days=DEFAULT_TOMBSTONE_DAYS, now=None):
+    """Compacta o log: mantém só a última entrada de cada registro e descarta lápides antigas.
+    
+    Remover entradas substituídas não afeta nenhum consumidor: quem está
+    atrás de uma delas ainda recebe a mais recente. Já as lápides com mais
+    de tombstone_days dias somem de vez, e o maior id descartado vira o
+    horizonte: cursores anteriores a ele recebem CursorExpired. Retorna o
+    registro da compactação.
+    """
+    log = ChangeLogEntry.__table__
+    newer = log.alias('newer')
+    superseded = db.session.execute(delete(log).where(exists().where(
+        newer.c.entity == log.c.entity,
+        newer.c.entity_id == log.c.entity_id,
+        newer.c.id > log.c.id
+    ))).rowcount
+    
+    cutoff = (now or datetime.utcnow()) - timedelta(days=tombstone_days)
+    horizon = db.session.execute(
+        select(func.max(log.c.id)).where(log.c.operation == 'delete', log.c.changed_at < cutoff)
+    ).scalar()
+    tombstones = 0
+    if horizon is not None:
+        tombstones = db.session.execute(
+            delete(log).where(log.c.operation == 'delete', log.c.id <= horizon)
+        ).rowcount
+    
+    compaction = ChangeLogCompaction(
+        horizon=horizon or 0, superseded_removed=superseded, tombstones_removed=tombstones
+    )
+    db.session.add(compaction)
+    db.session.commit()
+    return compaction
@@ -0,0 +1,63 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import current_app, make_response, request
+
+# Last-Modified tem resolução de segundos: só é enviado quando a última alteração
+# tem mais de um segundo, e aí qualquer alteração seguinte cai em outro segundo
+LAST_MODIFIED_MIN_AGE = timedelta(seconds=1)
+
+def make_etag(*parts):
+    """Hash das versões do recurso (rota, parâmetros e validadores)"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def _last_modified(moment):
+    if moment is None or moment > datetime.utcnow() - LAST_MODIFIED_MIN_AGE:
+        return None
+    return moment.replace(microsecond=0, tzinfo=timezone.utc)
+
+def _is_fresh(etag, last_modified):
+    # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return last_modified is not None and since is not None and last_modified <= since
+
+def conditional_get(validators):
+    """Responde 304 quando o cliente já tem a versão atual, sem executar a view.
+    
+    validators(*args, **kwargs) roda depois do require_role e devolve
+    (versões, última alteração ou None): consultas baratas (updated_at,
+    contagens, geração do cache) que mudam sempre que o payload muda. None
+    segue direto para a view, que responde 404/403; por isso o validador
+    também aplica a regra de visibilidade dos operadores. A ETag é fraca
+    (mesmo conteúdo, não necessariamente os mesmos bytes, ex.: com gzip).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            current = validators(*args, **kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+            
+            versions, moment = current
+            etag = make_etag(request.endpoint, sorted(request.args.items(multi=True)), versions)
+            last_modified = _last_modified(moment)
+            
+            if _is_fresh(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Respostas por usuário: o navegador revalida sempre e proxies não compartilham
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,271 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import db
+from app.models.user import User
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.models.rollup import (
+    CallDailyRollup, EvaluationDailyRollup, CallDurationHistogram, EvaluationScoreHistogram
+)
+from app.services.cache import dashboard_cache
+from app.services.sampling import period_start
+from app.services.serialization import call_projection, evaluation_projection
+from app.services.sketches import (
+    DURATION_QUANTILES, SCORE_QUANTILES, duration_value, score_value, quantiles
+)
+
+# Os agregados leem os rollups diários, então o custo depende do número
+# de dias do período e não do número de chamadas no histórico.
+
+# Campos padrão das chamadas em recent-activity (o painel mostra protocolo, assunto e status)
+RECENT_CALL_FIELDS = [
+    'id', 'protocol', 'operator_id', 'operator_name', 'customer_name', 'subject',
+    'category', 'priority', 'status', 'created_at', 'closed_at'
+]
+
+# Chaves de objetos JSON não podem ser nulas; dimensões ausentes usam este rótulo
+NULL_DIMENSION_KEY = 'null'
+
+def _from_rollup_key(value):
+    """Os rollups guardam dimensões nulas como string vazia"""
+    return value if value != '' else NULL_DIMENSION_KEY
+
+def compute_call_stats(date_from, operator_id=None):
+    """Calcula as métricas de chamadas em uma única varredura agrupada"""
+    query = db.session.query(
+        CallDailyRollup.status,
+        CallDailyRollup.priority,
+        CallDailyRollup.category,
+        func.sum(CallDailyRollup.call_count),
+        func.sum(CallDailyRollup.duration_sum),
+        func.sum(CallDailyRollup.duration_count)
+    ).filter(CallDailyRollup.day >= date_from.date())
+    
+    if operator_id is not None:
+        query = query.filter(CallDailyRollup.operator_id == operator_id)
+    
+    rows = query.group_by(
+        CallDailyRollup.status,
+        CallDailyRollup.priority,
+        CallDailyRollup.category
+    ).all()
+    
+    # Consolidar os grupos (status x prioridade x categoria) em memória
+    total = 0
+    duration_sum = 0
+    duration_count = 0
+    by_status = {}
+    by_priority = {}
+    by_category = {}
+    
+    for status, priority, category, count, group_duration_sum, group_duration_count in rows:
+        if not count:
+            continue
+        status = _from_rollup_key(status)
+        priority = _from_rollup_key(priority)
+        category = _from_rollup_key(category)
+        total += count
+        duration_sum += group_duration_sum or 0
+        duration_count += group_duration_count or 0
+        by_status[status] = by_status.get(status, 0) + count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+        by_category[category] = by_category.get(category, 0) + count
+    
+    avg_duration = duration_sum / duration_count if duration_count else 0
+    
+    return {
+        'total': total,
+        'by_status': by_status,
+        'by_priority': by_priority,
+        'by_category': by_category,
+        'avg_duration_seconds': round(float(avg_duration), 2)
+    }
+
+def compute_evaluation_stats(date_from, operator_id=None):
+    """Calcula as métricas de avaliações em uma única consulta"""
+    query = db.session.query(
+        func.sum(EvaluationDailyRollup.evaluation_count),
+        func.sum(EvaluationDailyRollup.score_sum),
+        func.sum(EvaluationDailyRollup.score_count),
+        func.sum(EvaluationDailyRollup.coaching_count),
+        func.sum(EvaluationDailyRollup.exemplary_count)
+    ).filter(EvaluationDailyRollup.day >= date_from.date())
+    
+    if operator_id is not None:
+        query = query.filter(EvaluationDailyRollup.operator_id == operator_id)
+    
+    total, score_sum, score_count, coaching_needed, exemplary = query.one()
+    avg_score = score_sum / score_count if score_count else 0
+    
+    return {
+        'total': int(total or 0),
+        'avg_overall_score': round(float(avg_score), 2),
+        'coaching_needed': int(coaching_needed or 0),
+        'exemplary': int(exemplary or 0)
+    }
+
+def compute_dashboard_stats(days, date_from, operator_id=None):
+    """Monta o payload de /api/dashboard/stats com duas consultas no total"""
+    return {
+        'period_days': days,
+        'calls': compute_call_stats(date_from, operator_id),
+        'evaluations': compute_evaluation_stats(date_from, operator_id)
+    }
+
+def cached_dashboard_stats(days, operator_id=None):
+    """Payload de /api/dashboard/stats pelo cache do dashboard (rota e stream ao vivo)"""
+    scope = 'operator' if operator_id else 'all'
+    cache_key = dashboard_cache.make_key('stats', scope, operator_id, days)
+    date_from = datetime.utcnow() - timedelta(days=days)
+    return dashboard_cache.get_or_compute(
+        cache_key, lambda: compute_dashboard_stats(days, date_from, operator_id)
+    )
+
+def compute_operator_performance(date_from):
+    """Calcula a performance por operador a partir dos rollups"""
+    calls = db.session.query(
+        User.id,
+        User.full_name,
+        func.sum(CallDailyRollup.call_count),
+        func.sum(CallDailyRollup.duration_sum),
+        func.sum(CallDailyRollup.duration_count)
+    ).join(CallDailyRollup, User.id == CallDailyRollup.operator_id)\
+     .filter(CallDailyRollup.day >= date_from.date())\
+     .group_by(User.id, User.full_name)\
+     .all()
+    
+    scores = db.session.query(
+        EvaluationDailyRollup.operator_id,
+        func.sum(EvaluationDailyRollup.score_sum),
+        func.sum(EvaluationDailyRollup.score_count)
+    ).filter(EvaluationDailyRollup.day >= date_from.date())\
+     .group_by(EvaluationDailyRollup.operator_id)\
+     .all()
+    scores = {operator_id: (score_sum, score_count) for operator_id, score_sum, score_count in scores}
+    
+    result = []
+    for operator_id, full_name, total_calls, duration_sum, duration_count in calls:
+        if not total_calls:
+            continue
+        score_sum, score_count = scores.get(operator_id, (0, 0))
+        avg_duration = duration_sum / duration_count if duration_count else 0
+        avg_score = score_sum / score_count if score_count else 0
+        result.append({
+            'operator_id': operator_id,
+            'operator_name': full_name,
+            'total_calls': int(total_calls),
+            'avg_duration_seconds': round(float(avg_duration), 2),
+            'avg_score': round(float(avg_score), 2)
+        })
+    
+    return result
+
+# Agrupamentos aceitos por compute_distributions
+DISTRIBUTION_GROUPS = (None, 'operator', 'day', 'week', 'month')
+
+def _quantile_key(q):
+    return f'p{q * 100:g}'
+
+def _summarize_durations(counts):
+    result = {'count': sum(counts.values())}
+    for q, value in quantiles(counts, DURATION_QUANTILES, duration_value).items():
+        result[_quantile_key(q)] = round(value, 1) if value is not None else None
+    return result
+
+def _summarize_scores(counts):
+    result = {'count': sum(counts.values())}
+    for q, value in quantiles(counts, SCORE_QUANTILES, score_value).items():
+        result[_quantile_key(q)] = value
+    result['histogram'] = {f'{score_value(bucket):g}': count for bucket, count in sorted(counts.items()) if count}
+    return result
+
+def compute_distributions(date_from, operator_id=None, group_by=None):
+    """Percentis de duração e distribuição das notas por critério no período.
+    
+    Soma os histogramas diários do período (agrupados por operador ou por
+    dia/semana/mês, se pedido) e extrai os percentis dos buckets; o custo
+    depende do número de buckets, não do número de chamadas.
+    """
+    def dimension(table):
+        if group_by == 'operator':
+            return table.operator_id
+        if group_by in ('day', 'week', 'month'):
+            return table.day
+        return None
+    
+    def group_key(value):
+        if group_by in ('day', 'week', 'month'):
+            return period_start(value, group_by)
+        return value
+    
+    duration_dimension = dimension(CallDurationHistogram)
+    duration_columns = [CallDurationHistogram.bucket]
+    if duration_dimension is not None:
+        duration_columns.insert(0, duration_dimension)
+    durations_query = db.session.query(*duration_columns, func.sum(CallDurationHistogram.count))\
+        .filter(CallDurationHistogram.day >= date_from.date())
+    if operator_id is not None:
+        durations_query = durations_query.filter(CallDurationHistogram.operator_id == operator_id)
+    
+    score_dimension = dimension(EvaluationScoreHistogram)
+    score_columns = [EvaluationScoreHistogram.criterion, EvaluationScoreHistogram.bucket]
+    if score_dimension is not None:
+        score_columns.insert(0, score_dimension)
+    scores_query = db.session.query(*score_columns, func.sum(EvaluationScoreHistogram.count))\
+        .filter(EvaluationScoreHistogram.day >= date_from.date())
+    if operator_id is not None:
+        scores_query = scores_query.filter(EvaluationScoreHistogram.operator_id == operator_id)
+    
+    # Mescla os histogramas (soma das contagens por bucket) em cada grupo
+    durations = defaultdict(lambda: defaultdict(int))
+    for row in durations_query.group_by(*duration_columns).all():
+        key = group_key(row[0]) if duration_dimension is not None else None
+        durations[key][row[-2]] += row[-1]
+    
+    scores = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for row in scores_query.group_by(*score_columns).all():
+        key = group_key(row[0]) if score_dimension is not None else None
+        scores[key][row[-3]][row[-2]] += row[-1]
+    
+    def summarize(key):
+        return {
+            'durations': _summarize_durations(durations.get(key, {})),
+            'scores': {
+                criterion: _summarize_scores(counts)
+                for criterion, counts in sorted(scores.get(key, {}).items())
+            }
+        }
+    
+    if group_by is None:
+        return summarize(None)
+    
+    label = 'operator_id' if group_by == 'operator' else 'period_start'
+    groups = []
+    for key in sorted(set(durations) | set(scores)):
+        group = {label: key.isoformat() if label == 'period_start' else key}
+        group.update(summarize(key))
+        groups.append(group)
+    return {'groups': groups}
+
+def compute_recent_activity(limit, operator_id=None, fields=None):
+    """Lista as chamadas e avaliações mais recentes (chamadas só com os campos pedidos)"""
+    # Chamadas recentes, lidas só com as colunas da projeção
+    calls_projection = call_projection.project(fields or RECENT_CALL_FIELDS)
+    calls_query = calls_projection.query()
+    if operator_id is not None:
+        calls_query = calls_query.filter(Call.operator_id == operator_id)
+    
+    recent_calls = calls_query.order_by(Call.created_at.desc()).limit(limit).all()
+    
+    # Avaliações recentes
+    evaluations_query = evaluation_projection.query().join(Call, Call.id == Evaluation.call_id)
+    if operator_id is not None:
+        evaluations_query = evaluations_query.filter(Call.operator_id == operator_id)
+    
+    recent_evaluations = evaluations_query.order_by(Evaluation.created_at.desc()).limit(limit).all()
+    
+    return {
+        'recent_calls': calls_projection.many(recent_calls),
+        'recent_evaluations': evaluation_projection.many(recent_evaluations)
+    }
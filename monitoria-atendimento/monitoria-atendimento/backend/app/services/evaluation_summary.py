@@ -0,0 +1,124 @@
+from sqlalchemy import event, func, case, select, update, exists, or_
+from sqlalchemy.orm import attributes
+from app import db
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.services.cache import dashboard_cache
+from app.services.changes import log_change
+
+# Colunas de Call derivadas das avaliações
+SUMMARY_ATTRIBUTES = ['evaluation_count', 'avg_overall_score', 'last_evaluated_at', 'requires_coaching']
+
+# Atributos da avaliação que entram no resumo da chamada
+SUMMARY_SOURCE_ATTRIBUTES = ['call_id', 'overall_score', 'created_at', 'requires_coaching']
+
+def refresh_call_summaries(connection, call_ids=None, touch=True):
+    """Recalcula o resumo das avaliações das chamadas informadas (todas se call_ids=None).
+    
+    Para todas as chamadas, zera o resumo e regrava, a partir de uma
+    agregação de evaluations, o das chamadas que têm avaliações
+    (UPDATE ... FROM). Com touch=False o updated_at das chamadas é preservado.
+    """
+    calls = Call.__table__
+    evaluations = Evaluation.__table__
+    
+    # Sem touch, anula o onupdate de updated_at
+    keep = {} if touch else {'updated_at': calls.c.updated_at}
+    
+    if call_ids is not None:
+        # Poucas chamadas (gravação pelo ORM): um único UPDATE com subconsultas correlacionadas
+        def correlated(expression):
+            return select(expression).where(evaluations.c.call_id == calls.c.id).scalar_subquery()
+        
+        connection.execute(
+            update(calls).where(calls.c.id.in_(sorted(call_ids))).values(
+                evaluation_count=correlated(func.count(evaluations.c.id)),
+                avg_overall_score=correlated(func.avg(evaluations.c.overall_score)),
+                last_evaluated_at=correlated(func.max(evaluations.c.created_at)),
+                requires_coaching=exists().where(
+                    evaluations.c.call_id == calls.c.id, evaluations.c.requires_coaching == True
+                ),
+                **keep
+            )
+        )
+        return
+    
+    # Só zera as linhas com resumo preenchido (as demais já estão zeradas)
+    reset = update(calls).where(or_(
+        calls.c.evaluation_count != 0,
+        calls.c.avg_overall_score.isnot(None),
+        calls.c.last_evaluated_at.isnot(None),
+        calls.c.requires_coaching == True
+    )).values(
+        evaluation_count=0, avg_overall_score=None, last_evaluated_at=None, requires_coaching=False, **keep
+    )
+    summaries = select(
+        evaluations.c.call_id,
+        func.count(evaluations.c.id).label('evaluation_count'),
+        func.avg(evaluations.c.overall_score).label('avg_overall_score'),
+        func.max(evaluations.c.created_at).label('last_evaluated_at'),
+        (func.max(case((evaluations.c.requires_coaching == True, 1), else_=0)) > 0).label('requires_coaching')
+    ).group_by(evaluations.c.call_id).subquery()
+    
+    connection.execute(reset)
+    connection.execute(
+        update(calls).values(
+            dict({column: summaries.c[column] for column in SUMMARY_ATTRIBUTES}, **keep)
+        ).where(calls.c.id == summaries.c.call_id)
+    )
+
+def rebuild_evaluation_summaries():
+    """Recalcula o resumo de avaliações de todas as chamadas (reparo; não altera updated_at)"""
+    refresh_call_summaries(db.session.connection(), touch=False)
+    db.session.commit()
+    
+    # Os totais cacheados das listagens podem depender do resumo
+    dashboard_cache.invalidate()
+
+def _affected_call_ids(session):
+    """Chamadas cujo resumo muda com as avaliações gravadas neste flush"""
+    call_ids = set()
+    
+    for obj in session.new:
+        if isinstance(obj, Evaluation):
+            call_ids.add(obj.call_id)
+    
+    deleted_calls = set()
+    for obj in session.deleted:
+        if isinstance(obj, Evaluation):
+            history = attributes.get_history(obj, 'call_id')
+            call_ids.update(history.deleted or [obj.call_id])
+        elif isinstance(obj, Call):
+            deleted_calls.add(obj.id)
+    
+    for obj in session.dirty:
+        if not isinstance(obj, Evaluation):
+            continue
+        if any(attributes.get_history(obj, attr).has_changes() for attr in SUMMARY_SOURCE_ATTRIBUTES):
+            history = attributes.get_history(obj, 'call_id')
+            call_ids.update(history.deleted)
+            call_ids.add(obj.call_id)
+    
+    # Chamadas excluídas no mesmo flush não têm resumo a atualizar
+    call_ids -= deleted_calls
+    call_ids.discard(None)
+    return call_ids
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_affected_summaries(session, flush_context):
+    """Atualiza o resumo das chamadas na mesma transação das avaliações"""
+    call_ids = _affected_call_ids(session)
+    if not call_ids:
+        return
+    
+    refresh_call_summaries(session.connection(), call_ids)
+    
+    # O resumo faz parte do documento da chamada no feed de alterações
+    for call_id in call_ids:
+        log_change(session, 'call', 'update', call_id, owner_call_id=call_id)
+    
+    # Chamadas já carregadas na sessão relêem o resumo no próximo acesso; o id vem
+    # da chave de identidade (ler obj.id recarregaria chamadas já expiradas)
+    for key, obj in list(session.identity_map.items()):
+        if isinstance(obj, Call) and key[1][0] in call_ids:
+            session.expire(obj, SUMMARY_ATTRIBUTES)
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, stream_with_context
+from sqlalchemy.orm import aliased
+from app import db
+from app.models.user import User
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.services.serialization import RowSerializer, dumps_line
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Linhas lidas do cursor do servidor por vez (memória constante)
+EXPORT_BATCH_SIZE = 1000
+
+def calls_export_query():
+    """Projeção das colunas da chamada com o nome do operador resolvido por JOIN"""
+    operator = aliased(User)
+    return db.session.query(
+        Call.id,
+        Call.protocol,
+        Call.operator_id,
+        operator.full_name.label('operator_name'),
+        Call.customer_name,
+        Call.customer_phone,
+        Call.customer_email,
+        Call.subject,
+        Call.description,
+        Call.category,
+        Call.priority,
+        Call.status,
+        Call.duration_seconds,
+        Call.recording_url,
+        Call.notes,
+        Call.created_at,
+        Call.updated_at,
+        Call.closed_at,
+        Call.evaluation_count,
+        Call.avg_overall_score,
+        Call.last_evaluated_at,
+        Call.requires_coaching
+    ).outerjoin(operator, operator.id == Call.operator_id)
+
+def evaluations_export_query():
+    """Projeção das colunas da avaliação com protocolo, operador e avaliador resolvidos por JOIN"""
+    operator = aliased(User)
+    evaluator = aliased(User)
+    return db.session.query(
+        Evaluation.id,
+        Evaluation.call_id,
+        Call.protocol.label('call_protocol'),
+        Call.operator_id,
+        operator.full_name.label('operator_name'),
+        Evaluation.evaluator_id,
+        evaluator.full_name.label('evaluator_name'),
+        Evaluation.greeting_score,
+        Evaluation.communication_score,
+        Evaluation.problem_solving_score,
+        Evaluation.empathy_score,
+        Evaluation.procedure_score,
+        Evaluation.closing_score,
+        Evaluation.criteria_scores,
+        Evaluation.overall_score,
+        Evaluation.rubric_id,
+        Evaluation.positive_points,
+        Evaluation.improvement_points,
+        Evaluation.general_comments,
+        Evaluation.requires_coaching,
+        Evaluation.is_exemplary,
+        Evaluation.created_at,
+        Evaluation.updated_at
+    ).join(Call, Call.id == Evaluation.call_id)\
+     .outerjoin(operator, operator.id == Call.operator_id)\
+     .outerjoin(evaluator, evaluator.id == Evaluation.evaluator_id)
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        # Notas dos critérios das rubricas numa única célula, em JSON
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def _stream_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_serialize(value) for value in row])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+def _stream_ndjson(rows, serializer):
+    lines = []
+    for row in rows:
+        lines.append(dumps_line(serializer.serialize(row)))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def export_response(query, model, export_format, filename):
+    """Resposta em streaming; as linhas são lidas em lotes via cursor do servidor"""
+    columns = [column['name'] for column in query.column_descriptions]
+    query = query.order_by(model.created_at.desc(), model.id.desc())\
+                 .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    if export_format == 'csv':
+        body = _stream_csv(query, columns)
+    else:
+        body = _stream_ndjson(query, RowSerializer.for_query(query))
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy import insert, select
+from app import db
+from app.models.user import User
+from app.models.call import Call
+from app.services.rollups import apply_call_rows
+from app.services.sampling import evaluation_sampler
+from app.services.changes import record_changes
+from app.services.protocols import reserve_protocols
+
+INGEST_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv'
+}
+
+REQUIRED_FIELDS = ['customer_name', 'subject']
+TEXT_FIELDS = [
+    'customer_name', 'customer_phone', 'customer_email', 'subject', 'description',
+    'category', 'priority', 'status', 'recording_url', 'notes'
+]
+INTEGER_FIELDS = ['operator_id', 'duration_seconds']
+
+# Ordem das colunas gravadas (INSERT em lote ou COPY)
+INSERT_COLUMNS = [
+    'protocol', 'operator_id', 'customer_name', 'customer_phone', 'customer_email',
+    'subject', 'description', 'category', 'priority', 'status', 'duration_seconds',
+    'recording_url', 'notes', 'created_at', 'updated_at'
+]
+
+class ProtocolSequence:
+    """Gera protocolos únicos em lote: CALL-<timestamp>-<lote>-<sequência>"""
+    
+    def __init__(self):
+        self.prefix = 'CALL-{}-{}'.format(
+            datetime.utcnow().strftime('%Y%m%d%H%M%S'),
+            uuid.uuid4().hex[:6].upper()
+        )
+        self.sequence = 0
+    
+    def next(self):
+        self.sequence += 1
+        return f'{self.prefix}-{self.sequence:06d}'
+
+def read_records(stream, ingest_format):
+    """Itera sobre os registros do upload sem carregá-lo inteiro em memória"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    
+    if ingest_format == 'csv':
+        for line_number, record in enumerate(csv.DictReader(text), 2):
+            yield line_number, record
+        return
+    
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, record
+
+def normalize_record(record, default_operator_id, valid_operator_ids):
+    """Valida um registro como create_call; retorna (linha, erro)"""
+    if not isinstance(record, dict):
+        return None, 'Registro inválido'
+    
+    # Campos vazios do CSV equivalem a ausentes
+    record = {key: (value if value != '' else None) for key, value in record.items()}
+    
+    for field in REQUIRED_FIELDS:
+        if record.get(field) is None:
+            return None, f'Campo {field} é obrigatório'
+    
+    row = {field: record.get(field) for field in TEXT_FIELDS}
+    row['priority'] = row['priority'] or 'medium'
+    row['status'] = row['status'] or 'open'
+    
+    for field in INTEGER_FIELDS:
+        value = record.get(field)
+        try:
+            row[field] = int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None, f'Campo {field} deve ser inteiro'
+    
+    if row['operator_id'] is None:
+        row['operator_id'] = default_operator_id
+    if row['operator_id'] not in valid_operator_ids:
+        return None, 'Operador não encontrado'
+    
+    return row, None
+
+def _copy_rows(connection, rows):
+    """Grava as linhas com COPY ... FROM STDIN (Postgres + psycopg2)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+            for column in INSERT_COLUMNS
+        ])
+    buffer.seek(0)
+    
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {Call.__tablename__} ({", ".join(INSERT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def insert_batch(rows):
+    """Insere um lote de chamadas e atualiza os rollups e a fila de avaliação na mesma transação"""
+    connection = db.session.connection()
+    
+    # Protocolo repetido falha aqui (IntegrityError), antes de duplicar chamadas e log
+    reserve_protocols(connection, [row['protocol'] for row in rows])
+    
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        _copy_rows(connection, rows)
+    else:
+        # executemany (insertmanyvalues) para SQLite e demais drivers
+        connection.execute(insert(Call.__table__), rows)
+    
+    apply_call_rows(connection, rows)
+    evaluation_sampler.sample(connection, rows)
+    
+    # Ids gerados pelo banco: o log lê as chamadas do lote pelo protocolo
+    record_changes(connection, 'call', 'insert', select(Call.id, Call.operator_id).where(
+        Call.protocol.in_([row['protocol'] for row in rows])
+    ))
+    
+    # Escritas fora do ORM não disparam os eventos de flush
+    db.session.info['dashboard_cache_stale'] = True
+    db.session.commit()
+
+def _flush_batch(batch, batch_results):
+    """Grava o lote; em caso de falha, marca todas as linhas do lote como erro"""
+    try:
+        insert_batch(batch)
+    except Exception as e:
+        db.session.rollback()
+        for result in batch_results:
+            result.pop('protocol', None)
+            result.update({'status': 'error', 'error': f'Erro ao inserir lote: {e}'})
+
+def ingest_calls(stream, ingest_format, default_operator_id, batch_size):
+    """Valida, numera e insere chamadas em lotes; retorna o relatório por linha"""
+    valid_operator_ids = {user_id for (user_id,) in db.session.query(User.id)}
+    protocols = ProtocolSequence()
+    results = []
+    batch = []
+    batch_results = []
+    
+    for line_number, record in read_records(stream, ingest_format):
+        row, error = normalize_record(record, default_operator_id, valid_operator_ids)
+        
+        if error:
+            results.append({'line': line_number, 'status': 'error', 'error': error})
+            continue
+        
+        now = datetime.utcnow()
+        row.update(protocol=protocols.next(), created_at=now, updated_at=now)
+        result = {'line': line_number, 'status': 'created', 'protocol': row['protocol']}
+        results.append(result)
+        batch.append(row)
+        batch_results.append(result)
+        
+        if len(batch) >= batch_size:
+            _flush_batch(batch, batch_results)
+            batch = []
+            batch_results = []
+    
+    if batch:
+        _flush_batch(batch, batch_results)
+    
+    created = sum(1 for result in results if result['status'] == 'created')
+    return {
+        'received': len(results),
+        'created': created,
+        'failed': len(results) - created,
+        'results': results
+    }
@@ -0,0 +1,251 @@
+import os
+import queue
+import select
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models.change_log import ChangeLogEntry
+from app.services.changes import CHANGE_ENTITIES, CHANGE_LOG_CHANNEL, encode_change_cursor
+from app.services.dashboard import cached_dashboard_stats
+
+# Entidades transmitidas ao painel (alterações de usuários ficam de fora)
+LIVE_ENTITIES = ('call', 'evaluation')
+
+# Entradas do log lidas por ciclo do broker
+LIVE_BATCH_SIZE = 500
+
+class LiveBrokerFull(Exception):
+    """O worker já atingiu LIVE_MAX_SUBSCRIBERS conexões ao vivo"""
+
+def format_event(name, data, event_id=None):
+    """Mensagem SSE com o payload serializado pelo provider JSON da aplicação"""
+    lines = [f'event: {name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {current_app.json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+class Subscriber:
+    """Conexão SSE de um usuário; os eventos esperam na fila até o stream enviá-los"""
+    
+    def __init__(self, user, days, queue_size):
+        self.operator_id = user.id if user.role == 'operator' else None
+        self.days = days
+        self.events = queue.Queue(queue_size)
+        self.dropped = False
+    
+    def sees(self, entry):
+        # Operadores acompanham só as próprias chamadas e avaliações
+        return self.operator_id is None or entry.operator_id == self.operator_id
+    
+    def push(self, message):
+        try:
+            self.events.put_nowait(message)
+        except queue.Full:
+            # Cliente lento: o stream termina e o painel reconecta com uma carga completa
+            self.dropped = True
+
+class LiveBroker:
+    """Distribui as alterações confirmadas às conexões SSE do worker.
+    
+    O log de alterações (services/changes.py) é o canal comum entre os
+    workers. Cada worker tem uma única thread que lê as entradas novas do
+    log e repassa os eventos às filas das conexões: no Postgres ela acorda
+    com o NOTIFY enviado no commit (LISTEN em uma conexão própria) e, nos
+    demais bancos, a cada LIVE_POLL_SECONDS. Documentos e contadores são
+    montados uma vez por ciclo e compartilhados pelas conexões.
+    """
+    
+    def __init__(self):
+        self.poll_seconds = 2.0
+        self.heartbeat_seconds = 15
+        self.queue_size = 100
+        self.max_subscribers = 5000
+        self.max_stream_seconds = 3600
+        self._app = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._position = None
+        self._thread = None
+        self._thread_pid = None
+    
+    def init_app(self, app):
+        self.poll_seconds = app.config.get('LIVE_POLL_SECONDS', 2.0)
+        self.heartbeat_seconds = app.config.get('LIVE_HEARTBEAT_SECONDS', 15)
+        self.queue_size = app.config.get('LIVE_QUEUE_SIZE', 100)
+        self.max_subscribers = app.config.get('LIVE_MAX_SUBSCRIBERS', 5000)
+        self.max_stream_seconds = app.config.get('LIVE_MAX_STREAM_SECONDS', 3600)
+        self._app = app
+        self._subscribers = set()
+        self._position = None
+        app.extensions['live_broker'] = self
+    
+    def subscribe(self, user, days):
+        """Registra uma conexão; levanta LiveBrokerFull acima do limite do worker"""
+        subscriber = Subscriber(user, days, self.queue_size)
+        head = None
+        if self._position is None:
+            head = db.session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+        
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise LiveBrokerFull()
+            # Broker ocioso: a leitura começa no fim do log, antes da carga completa do cliente
+            if self._position is None:
+                self._position = head
+            self._subscribers.add(subscriber)
+            # Thread criada sob demanda em cada worker (após o fork do gunicorn)
+            if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-broker', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+        self._wakeup.set()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def stream(self, subscriber, expires_at=None):
+        """Gerador da resposta SSE; termina no limite de duração ou na expiração do token"""
+        deadline = time.time() + self.max_stream_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        
+        try:
+            # O cliente recarrega o painel a cada (re)conexão e depois aplica os eventos
+            yield f'retry: 5000\nevent: ready\ndata: {{"days": {subscriber.days}}}\n\n'
+            while not subscriber.dropped:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    yield subscriber.events.get(timeout=min(self.heartbeat_seconds, remaining))
+                except queue.Empty:
+                    # Comentário SSE: mantém a conexão aberta em proxies e detecta clientes que saíram
+                    yield ': ping\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+    
+    def stats(self):
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {
+            'subscribers': subscribers,
+            'max_subscribers': self.max_subscribers,
+            'listening': self._thread is not None and self._thread.is_alive()
+        }
+    
+    def _listen(self):
+        """Conexão dedicada com LISTEN no canal do log (somente Postgres)"""
+        engine = db.engine
+        if engine.dialect.name != 'postgresql':
+            return None
+        
+        connection = engine.raw_connection()
+        # Fora do pool: a conexão fica presa ao LISTEN enquanto o worker existir
+        connection.detach()
+        driver = connection.driver_connection
+        driver.autocommit = True
+        driver.cursor().execute(f'LISTEN {CHANGE_LOG_CHANNEL}')
+        return connection
+    
+    def _wait(self, listener):
+        if listener is None:
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+            return
+        
+        driver = listener.driver_connection
+        if select.select([driver], [], [], self.poll_seconds)[0]:
+            driver.poll()
+            driver.notifies.clear()
+    
+    def _run(self):
+        listener = None
+        while True:
+            with self._lock:
+                subscribers = list(self._subscribers)
+                if not subscribers:
+                    # Sem conexões, a leitura recomeça do fim do log na próxima
+                    self._position = None
+                position = self._position
+            
+            more = False
+            try:
+                with self._app.app_context():
+                    if listener is None:
+                        listener = self._listen()
+                    if subscribers:
+                        position, more = self._dispatch(position, subscribers)
+                        with self._lock:
+                            self._position = position
+                
+                if not more:
+                    self._wait(listener)
+            except Exception:
+                self._app.logger.exception('Falha no broker ao vivo; nova tentativa em %ss', self.poll_seconds)
+                if listener is not None:
+                    listener.close()
+                    listener = None
+                time.sleep(self.poll_seconds)
+    
+    def _dispatch(self, last_id, subscribers):
+        """Envia as entradas posteriores a last_id; retorna (último id lido, há mais entradas)"""
+        log = ChangeLogEntry
+        entries = db.session.query(log.id, log.entity, log.entity_id, log.operation, log.operator_id)\
+                            .filter(log.id > last_id, log.entity.in_(LIVE_ENTITIES))\
+                            .order_by(log.id).limit(LIVE_BATCH_SIZE).all()
+        if not entries:
+            return last_id, False
+        
+        # Só a última alteração de cada registro, na posição dela
+        latest = {}
+        for entry in entries:
+            key = (entry.entity, entry.entity_id)
+            latest.pop(key, None)
+            latest[key] = entry
+        
+        documents = {}
+        for entity in LIVE_ENTITIES:
+            model, projection = CHANGE_ENTITIES[entity]
+            ids = [entity_id for (kind, entity_id), entry in latest.items()
+                   if kind == entity and entry.operation != 'delete']
+            if ids:
+                rows = projection.query().filter(model.id.in_(ids))
+                documents[entity] = {document['id']: document for document in projection.many(rows)}
+        
+        messages = []
+        for (entity, entity_id), entry in latest.items():
+            change = {'id': entity_id, 'op': entry.operation}
+            if entry.operation != 'delete':
+                document = documents.get(entity, {}).get(entity_id)
+                if document is None:
+                    continue
+                change['data'] = document
+            messages.append((entry, format_event(entity, change, encode_change_cursor(entry.id))))
+        
+        # Contadores uma vez por escopo (operador ou todos) e período, pelo cache do dashboard
+        counters = {}
+        for subscriber in subscribers:
+            visible = [message for entry, message in messages if subscriber.sees(entry)]
+            if not visible:
+                continue
+            for message in visible:
+                subscriber.push(message)
+            
+            scope = (subscriber.operator_id, subscriber.days)
+            if scope not in counters:
+                counters[scope] = format_event('stats', cached_dashboard_stats(subscriber.days, subscriber.operator_id))
+            subscriber.push(counters[scope])
+        
+        return entries[-1].id, len(entries) == LIVE_BATCH_SIZE
+
+live_broker = LiveBroker()
+
+def init_app(app):
+    """Configura o broker do stream ao vivo do dashboard"""
+    live_broker.init_app(app)
@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request, has_request_context, current_app, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import db
+from app.services.cache import SQLiteStore
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_CONNECTION_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 100)
+
+# Histogramas expostos em /api/metrics: nome -> (descrição, limites dos buckets)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Latência das requisições HTTP', LATENCY_BUCKETS),
+    'http_request_sql_queries': ('Consultas SQL por requisição', QUERY_COUNT_BUCKETS),
+    'http_request_sql_duration_seconds': ('Tempo em consultas SQL por requisição', LATENCY_BUCKETS),
+    'http_response_serialization_seconds': ('Tempo de serialização JSON por requisição', LATENCY_BUCKETS),
+    'db_pool_connect_seconds': ('Tempo para abrir uma conexão nova do pool', LATENCY_BUCKETS),
+    'db_pool_checked_out_connections': ('Conexões do pool em uso a cada checkout', POOL_CONNECTION_BUCKETS)
+}
+
+# pid das linhas que acumulam os totais dos workers já encerrados
+RETIRED_PID = 0
+
+# Endpoint usado nos rótulos de requisições que não casaram com nenhuma rota
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _merge(totals, key, value):
+    total = totals.get(key)
+    if total is None or len(total) != len(value):
+        totals[key] = value
+    else:
+        totals[key] = [a + b for a, b in zip(total, value)]
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+class MetricsRegistry(SQLiteStore):
+    """Histogramas de desempenho agregados entre os workers do gunicorn.
+    
+    Cada worker acumula as observações em memória e, no máximo a cada
+    METRICS_FLUSH_INTERVAL segundos, grava seus totais acumulados no arquivo
+    compartilhado (uma linha por pid e série). A exposição soma as linhas de
+    todos os workers. Quando um worker termina, o master do gunicorn soma as
+    linhas dele às de RETIRED_PID (retire), de modo que os contadores não
+    diminuem quando um worker é reciclado e as linhas não crescem com os pids.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        self.flush_interval = 5
+        self._series = {}
+        self._dirty = set()
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+        self._configure(app.config.get('METRICS_STATE_PATH', ':memory:'))
+        self._series = {}
+        self._dirty = set()
+        self._last_flush = 0.0
+        app.extensions['metrics'] = self
+    
+    @staticmethod
+    def _create_schema(connection):
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS samples (
+                pid INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (pid, metric, labels)
+            );
+        ''')
+    
+    def observe(self, metric, value, **labels):
+        """Registra uma observação no histograma (contagens por bucket + soma)"""
+        buckets = HISTOGRAMS[metric][1]
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(buckets) + 1) + [0.0]
+            series[bisect_left(buckets, value)] += 1
+            series[-1] += value
+            self._dirty.add(key)
+    
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Grava os totais das séries alteradas deste worker no arquivo compartilhado"""
+        with self._lock:
+            rows = [
+                (os.getpid(), metric, json.dumps(labels), json.dumps(self._series[(metric, labels)]))
+                for metric, labels in self._dirty
+            ]
+            self._dirty = set()
+            self._last_flush = time.monotonic()
+        
+        if not rows:
+            return
+        connection = self._connect()
+        with self._transaction(connection):
+            connection.executemany(
+                'INSERT OR REPLACE INTO samples (pid, metric, labels, value) VALUES (?, ?, ?, ?)', rows
+            )
+    
+    def collect(self):
+        """Séries somadas entre os workers: {(métrica, rótulos): [contagens..., soma]}"""
+        self.flush()
+        totals = {}
+        for metric, labels, value in self._connect().execute('SELECT metric, labels, value FROM samples'):
+            if metric not in HISTOGRAMS:
+                continue
+            _merge(totals, (metric, tuple(tuple(pair) for pair in json.loads(labels))), json.loads(value))
+        return totals
+    
+    def retire(self, pid):
+        """Soma as séries de um worker encerrado às dos workers anteriores e remove as linhas dele"""
+        connection = self._connect()
+        with self._transaction(connection):
+            totals = {}
+            for row_pid, metric, labels, value in connection.execute(
+                'SELECT pid, metric, labels, value FROM samples WHERE pid IN (?, ?) ORDER BY pid',
+                (RETIRED_PID, pid)
+            ):
+                _merge(totals, (metric, labels), json.loads(value))
+            if not totals:
+                return
+            connection.execute('DELETE FROM samples WHERE pid = ?', (pid,))
+            connection.executemany(
+                'INSERT OR REPLACE INTO samples (pid, metric, labels, value) VALUES (?, ?, ?, ?)',
+                [(RETIRED_PID, metric, labels, json.dumps(value)) for (metric, labels), value in totals.items()]
+            )
+    
+    def render(self):
+        """Exposição no formato texto do Prometheus"""
+        totals = self.collect()
+        lines = []
+        for metric, (description, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (name, labels), series in sorted(totals.items()):
+                if name != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], series[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(float(bound))
+                    lines.append(f'{metric}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+                lines.append(f'{metric}_sum{_format_labels(labels)} {_format_value(float(series[-1]))}')
+                lines.append(f'{metric}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+metrics_registry = MetricsRegistry()
+
+def retire_worker_metrics(path, pid):
+    """Consolida as métricas de um worker encerrado (hook child_exit do gunicorn, no master)"""
+    registry = MetricsRegistry()
+    registry._configure(path)
+    registry.retire(pid)
+
+def _add(name, value):
+    if has_request_context():
+        setattr(g, name, g.get(name, 0) + value)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_query_started')
+    if started:
+        _add('metrics_sql_seconds', time.perf_counter() - started.pop())
+        _add('metrics_sql_queries', 1)
+
+def _instrument_pool(engine):
+    """Mede a abertura de conexões novas e a ocupação do pool a cada checkout.
+    
+    Usa eventos registrados no engine: o SQLAlchemy os repassa ao pool
+    recriado por engine.dispose() (ex.: após o fork dos workers).
+    """
+    def connect_started(dialect, connection_record, cargs, cparams):
+        connection_record.info['metrics_connect_started'] = time.perf_counter()
+    
+    def connected(dbapi_connection, connection_record):
+        started = connection_record.info.pop('metrics_connect_started', None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            _add('metrics_pool_seconds', elapsed)
+            metrics_registry.observe('db_pool_connect_seconds', elapsed)
+    
+    def checked_out(dbapi_connection, connection_record, connection_proxy):
+        # Só o QueuePool conta as conexões em uso (StaticPool/NullPool não)
+        checkedout = getattr(engine.pool, 'checkedout', None)
+        if checkedout is not None:
+            metrics_registry.observe('db_pool_checked_out_connections', checkedout())
+    
+    event.listen(engine, 'do_connect', connect_started)
+    event.listen(engine, 'connect', connected)
+    event.listen(engine, 'checkout', checked_out)
+
+def _instrument_json(app):
+    """Mede o tempo de serialização das respostas JSON"""
+    provider = app.json
+    dumps = provider.dumps
+    
+    def timed_dumps(obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return dumps(obj, **kwargs)
+        finally:
+            _add('metrics_serialization_seconds', time.perf_counter() - started)
+    
+    provider.dumps = timed_dumps
+
+def _server_timing(total, sql_seconds, sql_queries, pool_seconds, serialization_seconds):
+    return ', '.join([
+        f'app;dur={total * 1000:.1f}',
+        f'db;dur={sql_seconds * 1000:.1f};desc="{sql_queries} queries"',
+        f'pool;dur={pool_seconds * 1000:.1f}',
+        f'serialize;dur={serialization_seconds * 1000:.1f}'
+    ])
+
+def init_app(app):
+    """Instrumenta requisições, consultas SQL, pool e serialização e expõe /api/metrics"""
+    metrics_registry.init_app(app)
+    if not metrics_registry.enabled:
+        return
+    
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrument_pool(engine)
+    _instrument_json(app)
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        
+        total = time.perf_counter() - started
+        sql_seconds = g.get('metrics_sql_seconds', 0)
+        sql_queries = g.get('metrics_sql_queries', 0)
+        serialization_seconds = g.get('metrics_serialization_seconds', 0)
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        labels = {'method': request.method, 'endpoint': endpoint}
+        
+        metrics_registry.observe(
+            'http_request_duration_seconds', total,
+            blueprint=request.blueprint or '', status=str(response.status_code), **labels
+        )
+        metrics_registry.observe('http_request_sql_queries', sql_queries, **labels)
+        metrics_registry.observe('http_request_sql_duration_seconds', sql_seconds, **labels)
+        metrics_registry.observe('http_response_serialization_seconds', serialization_seconds, **labels)
+        
+        if current_app.config.get('METRICS_SERVER_TIMING'):
+            response.headers['Server-Timing'] = _server_timing(
+                total, sql_seconds, sql_queries, g.get('metrics_pool_seconds', 0), serialization_seconds
+            )
+        
+        metrics_registry.maybe_flush()
+        return response
+    
+    @app.route('/api/metrics')
+    def metrics():
+        # Com METRICS_TOKEN definido, o coletor envia "Authorization: Bearer <token>";
+        # com METRICS_REQUIRE_TOKEN (produção), sem token configurado o endpoint fica fechado
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token and current_app.config.get('METRICS_REQUIRE_TOKEN'):
+            return jsonify({'error': 'Métricas desativadas: defina METRICS_TOKEN'}), 403
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Token de métricas inválido'}), 401
+        
+        return metrics_registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+from sqlalchemy import text, tuple_
+from app import db
+from app.services.cache import dashboard_cache
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou adulterado"""
+
+def encode_cursor(row, direction):
+    """Gera um cursor opaco a partir de (created_at, id) da linha"""
+    payload = {'d': direction, 't': row.created_at.isoformat(), 'id': row.id}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodifica um cursor em (direção, created_at, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = payload['d']
+        if direction not in ('next', 'prev'):
+            raise InvalidCursor(cursor)
+        return direction, datetime.fromisoformat(payload['t']), int(payload['id'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+def keyset_paginate(query, model, cursor=None, limit=DEFAULT_LIMIT):
+    """Pagina por (created_at, id) decrescente sem OFFSET.
+    
+    Retorna (itens, próximo cursor, cursor anterior). Lê limit + 1 linhas
+    para saber se existe outra página na direção percorrida.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    position = tuple_(model.created_at, model.id)
+    direction = 'next'
+    
+    if cursor:
+        direction, created_at, row_id = decode_cursor(cursor)
+        # O limite redundante em created_at permite o pruning de partições no Postgres,
+        # que não poda por comparação de tuplas
+        if direction == 'next':
+            query = query.filter(model.created_at <= created_at, position < tuple_(created_at, row_id))
+        else:
+            query = query.filter(model.created_at >= created_at, position > tuple_(created_at, row_id))
+    
+    # A ordem do cursor substitui qualquer ordenação anterior (ex.: relevância da busca)
+    query = query.order_by(None)
+    if direction == 'next':
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+    
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    if direction == 'prev':
+        rows.reverse()
+    
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        if has_more or direction == 'prev':
+            next_cursor = encode_cursor(rows[-1], 'next')
+        if cursor and (has_more or direction == 'next'):
+            prev_cursor = encode_cursor(rows[0], 'prev')
+    
+    return rows, next_cursor, prev_cursor
+
+def count_cache_key(resource, scope, operator_id, filters):
+    """Chave do total cacheado para um conjunto de filtros"""
+    return f'count:{resource}:{scope}:{operator_id}:{urlencode(sorted(filters.items()))}'
+
+def cached_count(query, cache_key):
+    """COUNT(*) exato, reaproveitado entre workers até a próxima escrita ou o TTL"""
+    return dashboard_cache.get_or_compute(cache_key, lambda: query.order_by(None).count())
+
+def estimated_count(model):
+    """Estimativa do total de linhas pelas estatísticas do Postgres (pg_class.reltuples)"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return None
+    
+    # Tabela particionada: soma das partições (a tabela-mãe não guarda reltuples).
+    # reltuples é -1 enquanto a tabela nunca foi analisada
+    estimate = db.session.execute(
+        text('''
+            SELECT sum(reltuples)::bigint FROM pg_class
+            WHERE relkind = 'r' AND reltuples >= 0 AND (
+                oid = CAST(:table AS regclass)
+                OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))
+            )
+        '''),
+        {'table': model.__tablename__}
+    ).scalar()
+    
+    if estimate is None:
+        return None
+    return int(estimate)
+
+def resolve_total(mode, query, model, cache_key, filtered):
+    """Total opcional: 'exact' usa contagem cacheada, 'estimate' usa reltuples quando possível"""
+    if mode == 'estimate' and not filtered:
+        estimate = estimated_count(model)
+        if estimate is not None:
+            return estimate, True
+    return cached_count(query, cache_key), False
@@ -0,0 +1,214 @@
+import re
+from datetime import date
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+from app import db
+
+# Tabelas particionadas por mês no Postgres: tabela -> coluna de partição.
+# A ordem importa: as FKs que apontam para calls caem antes de evaluations ser recriada.
+PARTITIONED_TABLES = {
+    'calls': 'created_at',
+    'evaluations': 'created_at'
+}
+
+# Partições futuras criadas além do mês corrente
+DEFAULT_MONTHS_AHEAD = 3
+
+PARTITION_NAME_PATTERN = re.compile(r'^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$')
+
+def month_start(moment):
+    return date(moment.year, moment.month, 1)
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+def _exists(connection, name):
+    return connection.execute(text('SELECT to_regclass(:name) IS NOT NULL'), {'name': name}).scalar()
+
+def is_partitioned(connection, table):
+    return connection.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))'
+    ), {'table': table}).scalar()
+
+def _stored_columns(connection, table):
+    """Colunas gravadas da tabela, sem as geradas (o banco as recalcula)"""
+    names = connection.execute(text('''
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = CAST(:table AS regclass) AND attnum > 0
+          AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+    '''), {'table': table}).scalars().all()
+    return ', '.join(f'"{name}"' for name in names)
+
+def create_partition(connection, table, column, month):
+    """Cria a partição do mês (idempotente); retorna True se ela foi criada.
+    
+    Linhas do mês que já tinham caído na partição padrão são movidas para
+    a nova partição (a padrão é desanexada durante a troca, na mesma transação).
+    """
+    name = partition_name(table, month)
+    if _exists(connection, name):
+        return False
+    
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    in_range = f'{column} >= :start AND {column} < :end'
+    default = default_partition_name(table)
+    stray = _exists(connection, default) and connection.execute(
+        text(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})'), bounds
+    ).scalar()
+    
+    if stray:
+        connection.execute(text(f'ALTER TABLE {table} DETACH PARTITION {default}'))
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+    if stray:
+        columns = _stored_columns(connection, table)
+        connection.execute(
+            text(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {default} WHERE {in_range}'), bounds
+        )
+        connection.execute(text(f'DELETE FROM {default} WHERE {in_range}'), bounds)
+        connection.execute(text(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT'))
+    return True
+
+def ensure_partitions(connection, months_ahead=DEFAULT_MONTHS_AHEAD, today=None):
+    """Cria as partições do mês corrente e dos próximos meses; retorna os nomes criados"""
+    if connection.dialect.name != 'postgresql':
+        return []
+    
+    current = month_start(today or date.today())
+    created = []
+    for table, column in PARTITIONED_TABLES.items():
+        if not is_partitioned(connection, table):
+            continue
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if create_partition(connection, table, column, month):
+                created.append(partition_name(table, month))
+    return created
+
+def list_partitions(connection, table):
+    """[(nome, mês)] das partições mensais da tabela, em ordem"""
+    names = connection.execute(text('''
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(:table)
+    '''), {'table': table}).scalars().all()
+    
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match and match.group('table') == table:
+            partitions.append((name, date(int(match.group('year')), int(match.group('month')), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def drop_empty_partitions(connection, before):
+    """Remove as partições vazias de meses anteriores a before (ex.: esvaziadas pelo arquivamento)"""
+    if connection.dialect.name != 'postgresql':
+        return []
+    
+    dropped = []
+    for table in PARTITIONED_TABLES:
+        for name, month in list_partitions(connection, table):
+            if add_months(month, 1) > month_start(before):
+                continue
+            if not connection.execute(text(f'SELECT EXISTS (SELECT 1 FROM {name})')).scalar():
+                connection.execute(text(f'DROP TABLE {name}'))
+                dropped.append(name)
+    return dropped
+
+def partition_table(connection, table, column, months_ahead=DEFAULT_MONTHS_AHEAD, only_empty=False):
+    """Converte a tabela em particionada por mês (RANGE em column), preservando os dados.
+    
+    A tabela é recriada com LIKE (defaults, colunas geradas, CHECKs) e
+    chave primária (id, column), exigência do Postgres para partições; os
+    índices únicos também passam a incluir column (a unicidade do protocolo
+    das chamadas fica em call_protocols, ver services/protocols.py). FKs de
+    outras tabelas para esta não são possíveis sem unicidade em id e são
+    removidas (a aplicação já remove os dependentes). Retorna False se nada foi feito.
+    """
+    if is_partitioned(connection, table):
+        return False
+    if only_empty and connection.execute(text(f'SELECT EXISTS (SELECT 1 FROM {table})')).scalar():
+        return False
+    
+    indexes = connection.execute(text('''
+        SELECT pg_get_indexdef(indexrelid), indisunique FROM pg_index
+        WHERE indrelid = CAST(:table AS regclass) AND NOT indisprimary
+    '''), {'table': table}).all()
+    foreign_keys = connection.execute(text('''
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+    '''), {'table': table}).all()
+    referencing = connection.execute(text('''
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE confrelid = CAST(:table AS regclass) AND contype = 'f' AND conrelid <> confrelid
+    '''), {'table': table}).all()
+    sequence = connection.execute(text('SELECT pg_get_serial_sequence(:table, :column)'),
+                                  {'table': table, 'column': 'id'}).scalar()
+    first = connection.execute(text(f'SELECT min({column}) FROM {table}')).scalar()
+    
+    for other_table, constraint in referencing:
+        connection.execute(text(f'ALTER TABLE {other_table} DROP CONSTRAINT {constraint}'))
+    
+    staging = f'{table}_partitioned'
+    connection.execute(text(
+        f'CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING GENERATED '
+        f'INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE ({column})'
+    ))
+    
+    # Partições do primeiro mês com dados até months_ahead à frente, mais a padrão
+    current = month_start(date.today())
+    month = month_start(first) if first is not None and month_start(first) < current else current
+    while month <= add_months(current, months_ahead):
+        connection.execute(text(
+            f"CREATE TABLE {partition_name(table, month)} PARTITION OF {staging} "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        ))
+        month = add_months(month, 1)
+    connection.execute(text(f'CREATE TABLE {default_partition_name(table)} PARTITION OF {staging} DEFAULT'))
+    
+    columns = _stored_columns(connection, table)
+    connection.execute(text(f'INSERT INTO {staging} ({columns}) SELECT {columns} FROM {table}'))
+    
+    # A sequência do id pertence à tabela antiga e cairia com ela
+    if sequence:
+        connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY {staging}.id'))
+    connection.execute(text(f'DROP TABLE {table}'))
+    connection.execute(text(f'ALTER TABLE {staging} RENAME TO {table}'))
+    connection.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {column})'))
+    
+    for definition, unique in indexes:
+        if unique and not re.search(rf'\b{column}\b', definition):
+            close = definition.rindex(')')
+            definition = f'{definition[:close]}, {column}{definition[close:]}'
+        connection.execute(text(definition))
+    for constraint, definition in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT {constraint} {definition}'))
+    
+    connection.execute(text(f'ANALYZE {table}'))
+    return True
+
+def partition_tables(connection, months_ahead=DEFAULT_MONTHS_AHEAD, only_empty=False):
+    """Particiona as tabelas de PARTITIONED_TABLES (somente Postgres); retorna as convertidas"""
+    if connection.dialect.name != 'postgresql':
+        return []
+    return [
+        table for table, column in PARTITIONED_TABLES.items()
+        if partition_table(connection, table, column, months_ahead, only_empty)
+    ]
+
+@event.listens_for(db.metadata, 'after_create')
+def _partition_new_tables(target, connection, **kw):
+    """Tabelas recém-criadas (vazias) já nascem particionadas; bases existentes usam partition_tables.py"""
+    config = current_app.config if has_app_context() else {}
+    if not config.get('PARTITIONING_ENABLED', True):
+        return
+    partition_tables(connection, config.get('PARTITION_MONTHS_AHEAD', DEFAULT_MONTHS_AHEAD), only_empty=True)
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class PasswordHashBusy(Exception):
+    """Nenhuma vaga para calcular o hash dentro do tempo de espera configurado"""
+
+class PasswordHasher:
+    """Hash e verificação de senhas em um pool de processos limitado.
+    
+    O KDF consome CPU de propósito; fora do processo do worker ele não
+    disputa o GIL com as demais requisições. O número de cálculos em
+    andamento (inclusive na fila do pool) é limitado por worker, e quem
+    esperar mais que o tempo configurado recebe PasswordHashBusy.
+    """
+    
+    def __init__(self):
+        self.method = 'scrypt'
+        self.workers = 0
+        self.queue_timeout = 2.0
+        self._slots = threading.BoundedSemaphore(1)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._current_prefix = None
+    
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0)
+        concurrency = app.config.get('PASSWORD_HASH_CONCURRENCY') or max(1, self.workers)
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._current_prefix = None
+        app.extensions['password_hasher'] = self
+    
+    def _pool(self):
+        """Pool criado sob demanda em cada worker (após o fork do gunicorn)"""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                # spawn: os processos do pool não herdam threads nem conexões do worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+    
+    def _run(self, function, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHashBusy()
+        try:
+            if not self.workers:
+                return function(*args)
+            return self._pool().submit(function, *args).result()
+        finally:
+            self._slots.release()
+    
+    def hash(self, password):
+        """Hash da senha com o método configurado"""
+        return self._run(generate_password_hash, password, self.method)
+    
+    def verify(self, password_hash, password):
+        """Verifica a senha contra o hash armazenado"""
+        return self._run(check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        """Indica se o hash foi gerado com método ou parâmetros diferentes dos atuais"""
+        if self._current_prefix is None:
+            # O werkzeug completa os parâmetros padrão (ex.: scrypt -> scrypt:32768:8:1)
+            self._current_prefix = self._run(generate_password_hash, '', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._current_prefix
+
+password_hasher = PasswordHasher()
+
+class LoginThrottle:
+    """Limite de falhas de login por usuário e por IP (em memória, por worker).
+    
+    Janela deslizante: com o limite de falhas atingido, novas tentativas são
+    recusadas antes de qualquer consulta ou cálculo de hash até a falha mais
+    antiga sair da janela.
+    """
+    
+    def __init__(self):
+        self.window = 900
+        self.max_failures_per_user = 5
+        self.max_failures_per_ip = 20
+        self.max_keys = 10000
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.window = app.config.get('LOGIN_THROTTLE_WINDOW', 900)
+        self.max_failures_per_user = app.config.get('LOGIN_MAX_FAILURES_PER_USER', 5)
+        self.max_failures_per_ip = app.config.get('LOGIN_MAX_FAILURES_PER_IP', 20)
+        self.max_keys = app.config.get('LOGIN_THROTTLE_MAX_KEYS', 10000)
+        self._failures = OrderedDict()
+        app.extensions['login_throttle'] = self
+    
+    def _keys(self, username, ip):
+        return [
+            (('user', username.lower()), self.max_failures_per_user),
+            (('ip', ip), self.max_failures_per_ip)
+        ]
+    
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+    
+    def retry_after(self, username, ip):
+        """Segundos até a próxima tentativa permitida (0 se liberado)"""
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for key, limit in self._keys(username, ip):
+                failures = self._recent(key, now)
+                if failures is not None and len(failures) >= limit:
+                    wait = max(wait, failures[-limit] + self.window - now)
+        return int(wait) + 1 if wait else 0
+    
+    def record_failure(self, username, ip):
+        now = time.monotonic()
+        with self._lock:
+            for key, limit in self._keys(username, ip):
+                failures = self._recent(key, now)
+                if failures is None:
+                    failures = self._failures[key] = deque(maxlen=limit)
+                failures.append(now)
+                self._failures.move_to_end(key)
+            
+            # Limita a memória descartando as chaves menos recentes
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+    
+    def reset(self, username):
+        """Login bem-sucedido zera as falhas do usuário (as do IP permanecem)"""
+        with self._lock:
+            self._failures.pop(('user', username.lower()), None)
+
+login_throttle = LoginThrottle()
+
+def init_app(app):
+    """Configura o pool de hash de senhas e o limite de falhas de login"""
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
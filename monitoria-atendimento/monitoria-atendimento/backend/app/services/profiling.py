@@ -0,0 +1,235 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime
+from flask import g, request, has_request_context, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Filho do logger da aplicação ('app'), que já tem handler configurado pelo Flask
+slow_query_logger = logging.getLogger('app.slow_queries')
+
+# Tamanho máximo dos parâmetros gravados no log
+MAX_PARAMETERS_LENGTH = 1000
+
+# Modos aceitos no cabeçalho X-Profile / parâmetro _profile
+PROFILE_MODES = {'1': 'store', 'store': 'store', 'inline': 'inline'}
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+# Funções listadas no modo inline
+PROFILE_INLINE_LIMIT = 50
+
+class SlowQueryLog:
+    """Registra no log as consultas SQL acima do limite, com a rota que as executou.
+    
+    Com SLOW_QUERY_EXPLAIN no Postgres, SELECTs lentos são executados de novo
+    com EXPLAIN ANALYZE (em um savepoint) e o plano vai junto no log.
+    Sem limite configurado, nenhum listener é registrado.
+    """
+    
+    def __init__(self):
+        self.threshold = None
+        self.explain = False
+    
+    def init_app(self, app):
+        threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+        self.threshold = threshold_ms / 1000 if threshold_ms else None
+        self.explain = app.config.get('SLOW_QUERY_EXPLAIN', False)
+        
+        if self.threshold is not None and not event.contains(Engine, 'after_cursor_execute', _check_slow_query):
+            event.listen(Engine, 'before_cursor_execute', _start_query_timer)
+            event.listen(Engine, 'after_cursor_execute', _check_slow_query)
+    
+    def _explain(self, conn, statement, parameters):
+        """Plano de execução real (EXPLAIN ANALYZE) de um SELECT no Postgres"""
+        if conn.dialect.name != 'postgresql' or not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        
+        cursor = conn.connection.cursor()
+        try:
+            # Um erro no EXPLAIN não pode abortar a transação da requisição
+            cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + statement, parameters)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+                return plan
+            except Exception as e:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                return f'EXPLAIN falhou: {e}'
+        finally:
+            cursor.close()
+    
+    def record(self, conn, statement, parameters, elapsed, executemany):
+        if has_request_context():
+            route = f'{request.method} {request.path} ({request.endpoint})'
+        else:
+            route = 'fora de requisição'
+        
+        parameters_text = repr(parameters)
+        if len(parameters_text) > MAX_PARAMETERS_LENGTH:
+            parameters_text = parameters_text[:MAX_PARAMETERS_LENGTH] + '...'
+        
+        message = f'Consulta lenta: {elapsed * 1000:.1f} ms em {route}\nSQL: {statement}\nParâmetros: {parameters_text}'
+        if self.explain and not executemany:
+            plan = self._explain(conn, statement, parameters)
+            if plan:
+                message += f'\nPlano:\n{plan}'
+        slow_query_logger.warning(message)
+
+slow_query_log = SlowQueryLog()
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+def _check_slow_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('slow_query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if slow_query_log.threshold is not None and elapsed >= slow_query_log.threshold:
+        slow_query_log.record(conn, statement, parameters, elapsed, executemany)
+
+class RequestProfiler:
+    """Executa uma requisição sob cProfile quando um admin pede (X-Profile ou _profile).
+    
+    Modo store (X-Profile: 1) grava o perfil em PROFILE_DIR e devolve o id no
+    cabeçalho X-Profile-Id; modo inline substitui o corpo da resposta pelas
+    estatísticas em texto. Sem PROFILING_ENABLED, nenhum hook é registrado.
+    """
+    
+    def __init__(self):
+        self.directory = None
+        self.max_files = 50
+    
+    def init_app(self, app):
+        self.directory = app.config.get('PROFILE_DIR')
+        self.max_files = app.config.get('PROFILE_MAX_FILES', 50)
+        app.extensions['request_profiler'] = self
+        
+        if not app.config.get('PROFILING_ENABLED'):
+            return
+        
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._discard)
+    
+    def _requested_mode(self):
+        flag = request.headers.get('X-Profile') or request.args.get('_profile')
+        return PROFILE_MODES.get(flag) if flag else None
+    
+    def _is_admin(self):
+        try:
+            verify_jwt_in_request(optional=True)
+            user = get_current_user()
+        except Exception:
+            return False
+        return user is not None and user.is_active and user.role == 'admin'
+    
+    def _start(self):
+        mode = self._requested_mode()
+        if mode is None or not self._is_admin():
+            return
+        
+        g.profile_mode = mode
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    
+    def _finish(self, response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        
+        duration_ms = (time.perf_counter() - g.profile_started) * 1000
+        metadata = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'created_at': datetime.utcnow().isoformat()
+        }
+        
+        if g.profile_mode == 'inline':
+            text = self.format_stats(profiler, limit=PROFILE_INLINE_LIMIT)
+            header = ' '.join(f'{key}={value}' for key, value in metadata.items())
+            profiled = current_app.response_class(f'{header}\n\n{text}', mimetype='text/plain')
+            profiled.headers['X-Profiled-Status'] = str(response.status_code)
+            return profiled
+        
+        response.headers['X-Profile-Id'] = self.store(profiler, metadata)
+        return response
+    
+    def _discard(self, exc):
+        # Requisição interrompida por exceção: não deixar o profiler ativo na thread
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+    
+    def store(self, profiler, metadata):
+        """Grava o perfil (.prof, para snakeviz/pstats) e seus metadados; retorna o id"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f'{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}'
+        profiler.dump_stats(os.path.join(self.directory, f'{profile_id}.prof'))
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(metadata, f)
+        self._prune()
+        return profile_id
+    
+    def _prune(self):
+        """Mantém apenas os PROFILE_MAX_FILES perfis mais recentes"""
+        profile_ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.prof'))
+        for profile_id in profile_ids[:-self.max_files]:
+            for extension in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+    
+    def path(self, profile_id):
+        """Caminho do .prof do perfil, ou None se o id for inválido ou não existir"""
+        if not PROFILE_ID_PATTERN.match(profile_id) or not self.directory:
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.prof')
+        return path if os.path.exists(path) else None
+    
+    def list(self):
+        """Metadados dos perfis gravados, do mais recente ao mais antigo"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profiles.append(dict(metadata, id=name[:-5]))
+        return profiles
+    
+    @staticmethod
+    def format_stats(source, sort='cumulative', limit=50):
+        """Estatísticas em texto (pstats) de um profiler ou arquivo .prof"""
+        output = io.StringIO()
+        stats = pstats.Stats(source, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+request_profiler = RequestProfiler()
+
+def init_app(app):
+    """Configura o log de consultas lentas e o profiler de requisições"""
+    slow_query_log.init_app(app)
+    request_profiler.init_app(app)
@@ -0,0 +1,20 @@
+from sqlalchemy import event, exists, insert, select, union
+from app.models.call import Call, CallProtocol
+from app.models.archive import ArchivedCall
+
+def reserve_protocols(connection, protocols):
+    """Reserva os protocolos de chamadas inseridas fora do ORM; repetidos levantam IntegrityError"""
+    if protocols:
+        connection.execute(insert(CallProtocol.__table__), [{'protocol': protocol} for protocol in protocols])
+
+def backfill_protocols(connection):
+    """Reserva os protocolos das chamadas gravadas sem passar por reserve_protocols (ex.: COPY, bases antigas)"""
+    used = union(select(Call.protocol), select(ArchivedCall.protocol)).subquery()
+    connection.execute(insert(CallProtocol.__table__).from_select(['protocol'], select(used.c.protocol).where(
+        ~exists().where(CallProtocol.protocol == used.c.protocol)
+    )))
+
+@event.listens_for(Call, 'before_insert')
+def _reserve_protocol(mapper, connection, target):
+    """Chamadas criadas pelo ORM reservam o protocolo no mesmo flush"""
+    reserve_protocols(connection, [target.protocol])
@@ -0,0 +1,54 @@
+from flask import g, has_request_context, request, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryBudgetExceeded(AssertionError):
+    """Endpoint executou mais leituras SQL do que o limite configurado"""
+
+def exempt(view):
+    """Marca um endpoint cujo número de consultas cresce com o volume enviado (ex.: lotes)"""
+    view.query_budget_exempt = True
+    return view
+
+def is_read(statement):
+    """SELECTs (inclusive com CTE): as leituras que um N+1 multiplica"""
+    return statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH')
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """Conta as leituras SQL executadas durante a requisição"""
+    if has_request_context() and is_read(statement):
+        g.query_count = g.get('query_count', 0) + 1
+
+def init_app(app):
+    """Ativa o limite de leituras por requisição (QUERY_BUDGET).
+    
+    O limite é uma constante pequena, igual para qualquer tamanho de
+    página: um endpoint que lê uma relação por linha (N+1) passa dele assim
+    que a página cresce. Só SELECTs contam; as escritas de manutenção
+    (rollups, log de alterações) têm custo fixo por requisição e não
+    consomem o limite.
+    """
+    budget = app.config.get('QUERY_BUDGET')
+    if not budget:
+        return
+    
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+    
+    @app.before_request
+    def reset_query_count():
+        g.query_count = 0
+    
+    @app.after_request
+    def check_query_budget(response):
+        view = current_app.view_functions.get(request.endpoint)
+        if getattr(view, 'query_budget_exempt', False):
+            return response
+        
+        query_count = g.get('query_count', 0)
+        if query_count > budget:
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path} ({request.endpoint}) executou '
+                f'{query_count} leituras SQL; limite: {budget}'
+            )
+        return response
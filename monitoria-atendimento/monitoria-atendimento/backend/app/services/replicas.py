@@ -0,0 +1,187 @@
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import event
+from app import db
+from app.services.cache import SQLiteStore
+from app.services.routing import is_replica_bind
+
+# Rotas só de leitura servidas pelas réplicas (apenas GET/HEAD)
+READ_ONLY_BLUEPRINTS = {'dashboard', 'changes'}
+READ_ONLY_ENDPOINTS = {
+    'calls.get_calls',
+    'calls.export_calls',
+    'evaluations.get_evaluations',
+    'evaluations.export_evaluations',
+    'users.get_users'
+}
+
+class ReplicaRouter(SQLiteStore):
+    """Escolha da réplica de leitura de cada requisição.
+    
+    As réplicas são usadas em rodízio. Uma réplica com falha de conexão sai
+    do rodízio do worker por REPLICA_RETRY_SECONDS e as leituras voltam ao
+    primário; depois disso ela é testada antes de voltar a receber tráfego.
+    Quem gravou algo lê do primário por REPLICA_STICKY_SECONDS (ler as
+    próprias escritas apesar do atraso da replicação); essa marca fica no
+    arquivo compartilhado entre os workers.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.binds = []
+        self.sticky_seconds = 10
+        self.retry_seconds = 30
+        self._retry_at = {}
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.binds = sorted(key for key in app.config.get('SQLALCHEMY_BINDS', {}) if is_replica_bind(key))
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10)
+        self.retry_seconds = app.config.get('REPLICA_RETRY_SECONDS', 30)
+        self._configure(app.config.get('REPLICA_STATE_PATH', ':memory:'))
+        self._retry_at = {}
+        self._next = 0
+        app.extensions['replica_router'] = self
+    
+    @staticmethod
+    def _create_schema(connection):
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS sticky_users (
+                user_id TEXT PRIMARY KEY,
+                until REAL NOT NULL
+            );
+        ''')
+    
+    def stick(self, user_id):
+        """Leituras do usuário vão para o primário pelos próximos sticky_seconds"""
+        now = time.time()
+        connection = self._connect()
+        with self._transaction(connection):
+            connection.execute(
+                'INSERT OR REPLACE INTO sticky_users (user_id, until) VALUES (?, ?)',
+                (str(user_id), now + self.sticky_seconds)
+            )
+            connection.execute('DELETE FROM sticky_users WHERE until <= ?', (now,))
+    
+    def is_sticky(self, user_id):
+        return self._connect().execute(
+            'SELECT 1 FROM sticky_users WHERE user_id = ? AND until > ?', (str(user_id), time.time())
+        ).fetchone() is not None
+    
+    def mark_down(self, bind):
+        with self._lock:
+            self._retry_at[bind] = time.monotonic() + self.retry_seconds
+    
+    def _available(self, bind):
+        """Réplica fora do rodízio só volta depois de uma conexão bem-sucedida"""
+        with self._lock:
+            retry_at = self._retry_at.get(bind)
+        if retry_at is None:
+            return True
+        if retry_at > time.monotonic():
+            return False
+        
+        try:
+            with db.engines[bind].connect():
+                pass
+        except Exception:
+            self.mark_down(bind)
+            return False
+        
+        with self._lock:
+            self._retry_at.pop(bind, None)
+        current_app.logger.info('Réplica %s de volta ao rodízio', bind)
+        return True
+    
+    def choose(self):
+        """Próxima réplica disponível; None (primário) se todas estão fora"""
+        for _ in range(len(self.binds)):
+            with self._lock:
+                bind = self.binds[self._next % len(self.binds)]
+                self._next += 1
+            if self._available(bind):
+                return bind
+        return None
+    
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            down = {bind: round(retry_at - now, 1) for bind, retry_at in self._retry_at.items()}
+        return {
+            'replicas': self.binds,
+            'down': down,
+            'sticky_seconds': self.sticky_seconds
+        }
+
+replica_router = ReplicaRouter()
+
+def _is_read_only():
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return request.blueprint in READ_ONLY_BLUEPRINTS or request.endpoint in READ_ONLY_ENDPOINTS
+
+def _identity():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+def _route_request():
+    """Define a réplica das leituras da requisição (g.db_read_bind; None lê do primário)"""
+    g.db_read_bind = None
+    if not _is_read_only():
+        return
+    
+    user_id = _identity()
+    if user_id is not None and replica_router.is_sticky(user_id):
+        return
+    g.db_read_bind = replica_router.choose()
+
+def _stick_after_write(response):
+    if g.pop('db_committed_write', False):
+        user_id = _identity()
+        if user_id is not None:
+            replica_router.stick(user_id)
+    return response
+
+def _listen_for_failures(bind, engine):
+    @event.listens_for(engine, 'handle_error')
+    def _replica_failed(context):
+        # Conexão recusada ou perdida: tira a réplica do rodízio do worker e a
+        # sessão repete a leitura no primário (RoutingSession)
+        if context.is_disconnect or context.connection is None:
+            replica_router.mark_down(bind)
+            current_app.logger.warning('Réplica %s indisponível; leituras no primário', bind)
+            if has_request_context() and g.get('db_read_bind') == bind:
+                g.db_read_failed = bind
+
+def init_app(app):
+    """Roteia as leituras das rotas só de leitura para as réplicas configuradas"""
+    replica_router.init_app(app)
+    if not replica_router.binds:
+        return
+    
+    with app.app_context():
+        for bind in replica_router.binds:
+            _listen_for_failures(bind, db.engines[bind])
+    
+    app.before_request(_route_request)
+    app.after_request(_stick_after_write)
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info['db_wrote'] = session.info['db_pinned'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def _stick_after_commit(session):
+    """A marca de leitura no primário vale só para escritas confirmadas"""
+    if session.info.pop('db_wrote', False) and replica_router.binds and has_request_context():
+        g.db_committed_write = True
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_write_mark(session):
+    session.info.pop('db_wrote', None)
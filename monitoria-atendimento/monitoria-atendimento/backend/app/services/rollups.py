@@ -0,0 +1,367 @@
+from collections import defaultdict
+from datetime import datetime, time
+from sqlalchemy import event, func, case, insert, select, update, delete
+from sqlalchemy.orm import attributes, object_session
+from app import db
+from app.models.call import Call
+from app.models.evaluation import Evaluation, SCORE_FIELDS
+from app.models.rollup import (
+    CallDailyRollup, EvaluationDailyRollup, CallDurationHistogram, EvaluationScoreHistogram
+)
+from app.services.cache import dashboard_cache
+from app.services.sketches import duration_bucket, score_bucket
+
+CALL_ROLLUP_KEYS = ['day', 'operator_id', 'status', 'priority', 'category']
+CALL_ROLLUP_METRICS = ['call_count', 'duration_sum', 'duration_count']
+
+EVALUATION_ROLLUP_KEYS = ['day', 'operator_id']
+EVALUATION_ROLLUP_METRICS = [
+    'evaluation_count', 'score_sum', 'score_count', 'coaching_count', 'exemplary_count'
+]
+
+# Histogramas diários (percentis de duração e distribuição das notas)
+DURATION_HISTOGRAM_KEYS = ['day', 'operator_id', 'bucket']
+SCORE_HISTOGRAM_KEYS = ['day', 'operator_id', 'criterion', 'bucket']
+HISTOGRAM_METRICS = ['count']
+SCORE_HISTOGRAM_CRITERIA = SCORE_FIELDS + ['overall_score']
+
+# Linhas de histograma gravadas por INSERT na reconstrução
+HISTOGRAM_INSERT_BATCH_SIZE = 5000
+
+def _value(obj, attr, old=False):
+    """Retorna o valor atual do atributo ou, se old=True, o valor antes da alteração pendente.
+    
+    Os atributos lidos com old=True são declarados com tracked() nos modelos.
+    """
+    if old:
+        history = attributes.get_history(obj, attr)
+        if history.deleted:
+            return history.deleted[0]
+    return getattr(obj, attr)
+
+def call_contribution(call, old=False):
+    """Chave e métricas com que uma chamada contribui para o rollup diário"""
+    created_at = _value(call, 'created_at', old)
+    duration = _value(call, 'duration_seconds', old)
+    key = (
+        created_at.date(),
+        _value(call, 'operator_id', old),
+        _value(call, 'status', old) or '',
+        _value(call, 'priority', old) or '',
+        _value(call, 'category', old) or ''
+    )
+    metrics = (1, duration or 0, 1 if duration is not None else 0)
+    return key, metrics
+
+def evaluation_contribution(evaluation, old=False):
+    """Chave e métricas com que uma avaliação contribui para o rollup diário"""
+    created_at = _value(evaluation, 'created_at', old)
+    score = _value(evaluation, 'overall_score', old)
+    # Objetos pendentes não carregam relacionamentos; busca a chamada pelo mapa de identidade
+    call = object_session(evaluation).get(Call, _value(evaluation, 'call_id', old))
+    key = (created_at.date(), call.operator_id)
+    metrics = (
+        1,
+        score or 0.0,
+        1 if score is not None else 0,
+        1 if _value(evaluation, 'requires_coaching', old) else 0,
+        1 if _value(evaluation, 'is_exemplary', old) else 0
+    )
+    return key, metrics
+
+# As funções de histograma recebem a chave do rollup, que começa por (dia, operador)
+
+def call_histogram_keys(call, rollup_key, old=False):
+    """Buckets de duração em que a chamada é contada"""
+    duration = _value(call, 'duration_seconds', old)
+    if duration is None:
+        return []
+    return [rollup_key[:2] + (duration_bucket(duration),)]
+
+def evaluation_histogram_keys(evaluation, rollup_key, old=False):
+    """Buckets de nota, um por critério avaliado, em que a avaliação é contada"""
+    keys = []
+    for criterion in SCORE_HISTOGRAM_CRITERIA:
+        score = _value(evaluation, criterion, old)
+        if score is not None:
+            keys.append(rollup_key[:2] + (criterion, score_bucket(score)))
+    return keys
+
+_CONTRIBUTIONS = {
+    Call: ('calls', call_contribution),
+    Evaluation: ('evaluations', evaluation_contribution)
+}
+
+_HISTOGRAM_CONTRIBUTIONS = {
+    Call: ('call_durations', call_histogram_keys),
+    Evaluation: ('evaluation_scores', evaluation_histogram_keys)
+}
+
+def _pending_deltas(session):
+    """Deltas acumulados durante o flush corrente"""
+    if 'rollup_deltas' not in session.info:
+        session.info['rollup_deltas'] = {
+            'calls': defaultdict(lambda: [0] * len(CALL_ROLLUP_METRICS)),
+            'evaluations': defaultdict(lambda: [0] * len(EVALUATION_ROLLUP_METRICS)),
+            'call_durations': defaultdict(lambda: [0]),
+            'evaluation_scores': defaultdict(lambda: [0])
+        }
+    return session.info['rollup_deltas']
+
+def _accumulate(deltas, obj, sign, old=False):
+    entry = _CONTRIBUTIONS.get(type(obj))
+    if entry is None:
+        return
+    name, contribution = entry
+    key, metrics = contribution(obj, old)
+    target = deltas[name][key]
+    for i, value in enumerate(metrics):
+        target[i] += sign * value
+    
+    name, histogram_keys = _HISTOGRAM_CONTRIBUTIONS[type(obj)]
+    for histogram_key in histogram_keys(obj, key, old):
+        deltas[name][histogram_key][0] += sign
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_removed_contributions(session, flush_context, instances):
+    """Subtrai a contribuição anterior de registros removidos ou alterados"""
+    deltas = _pending_deltas(session)
+    
+    for obj in session.deleted:
+        _accumulate(deltas, obj, -1, old=True)
+    
+    for obj in session.dirty:
+        if type(obj) in _CONTRIBUTIONS and session.is_modified(obj):
+            _accumulate(deltas, obj, -1, old=True)
+            _accumulate(deltas, obj, 1)
+
+@event.listens_for(db.session, 'after_flush')
+def _apply_rollup_deltas(session, flush_context):
+    """Soma a contribuição dos novos registros e grava os deltas na mesma transação"""
+    deltas = _pending_deltas(session)
+    
+    # Valores default (created_at) e ids só existem após o INSERT
+    for obj in session.new:
+        _accumulate(deltas, obj, 1)
+    
+    connection = session.connection()
+    apply_deltas(connection, CallDailyRollup.__table__, CALL_ROLLUP_KEYS,
+                 CALL_ROLLUP_METRICS, deltas['calls'])
+    apply_deltas(connection, EvaluationDailyRollup.__table__, EVALUATION_ROLLUP_KEYS,
+                 EVALUATION_ROLLUP_METRICS, deltas['evaluations'])
+    apply_deltas(connection, CallDurationHistogram.__table__, DURATION_HISTOGRAM_KEYS,
+                 HISTOGRAM_METRICS, deltas['call_durations'])
+    apply_deltas(connection, EvaluationScoreHistogram.__table__, SCORE_HISTOGRAM_KEYS,
+                 HISTOGRAM_METRICS, deltas['evaluation_scores'])
+    
+    del session.info['rollup_deltas']
+
+def upsert_insert(connection):
+    """INSERT com ON CONFLICT do dialeto da conexão, ou None se o dialeto não tiver"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+def add_to_rows(connection, table, key_columns, metric_columns, rows):
+    """Soma as métricas às linhas existentes e insere as que faltam (sem ON CONFLICT).
+    
+    Alternativa portável ao upsert: UPDATE por chave e INSERT quando nenhuma
+    linha foi atualizada. Duas transações inserindo a mesma chave ao mesmo
+    tempo falham na chave primária em vez de somar.
+    """
+    for row in rows:
+        updated = connection.execute(
+            update(table).where(*(table.c[column] == row[column] for column in key_columns))
+                         .values({column: table.c[column] + row[column] for column in metric_columns})
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(row))
+
+def apply_deltas(connection, table, key_columns, metric_columns, deltas):
+    """Aplica deltas ao rollup com upsert (INSERT ... ON CONFLICT DO UPDATE)"""
+    rows = []
+    for key, metrics in deltas.items():
+        if not any(metrics):
+            continue
+        row = dict(zip(key_columns, key))
+        row.update(zip(metric_columns, metrics))
+        rows.append(row)
+    
+    if not rows:
+        return
+    
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is None:
+        add_to_rows(connection, table, key_columns, metric_columns, rows)
+        return
+    
+    stmt = dialect_insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: table.c[column] + stmt.excluded[column] for column in metric_columns}
+    )
+    connection.execute(stmt)
+
+def apply_call_rows(connection, rows):
+    """Atualiza o rollup de chamadas para linhas inseridas em lote, fora do ORM"""
+    deltas = defaultdict(lambda: [0] * len(CALL_ROLLUP_METRICS))
+    durations = defaultdict(lambda: [0])
+    for row in rows:
+        duration = row.get('duration_seconds')
+        key = (
+            row['created_at'].date(),
+            row['operator_id'],
+            row.get('status') or '',
+            row.get('priority') or '',
+            row.get('category') or ''
+        )
+        target = deltas[key]
+        target[0] += 1
+        target[1] += duration or 0
+        target[2] += 1 if duration is not None else 0
+        if duration is not None:
+            durations[(key[0], key[1], duration_bucket(duration))][0] += 1
+    
+    apply_deltas(connection, CallDailyRollup.__table__, CALL_ROLLUP_KEYS, CALL_ROLLUP_METRICS, deltas)
+    apply_deltas(connection, CallDurationHistogram.__table__, DURATION_HISTOGRAM_KEYS,
+                 HISTOGRAM_METRICS, durations)
+
+def apply_score_changes(connection, rows):
+    """Atualiza rollup e histograma de notas gerais para notas regravadas em lote, fora do ORM.
+    
+    rows traz (dia, operador, nota anterior, nota nova) de cada avaliação
+    alterada. Só as avaliações das tabelas quentes mudam: o histórico
+    arquivado continua contado como estava.
+    """
+    deltas = defaultdict(lambda: [0] * len(EVALUATION_ROLLUP_METRICS))
+    scores = defaultdict(lambda: [0])
+    for day, operator_id, old_score, new_score in rows:
+        target = deltas[(day, operator_id)]
+        target[1] += (new_score or 0.0) - (old_score or 0.0)
+        target[2] += (new_score is not None) - (old_score is not None)
+        if old_score is not None:
+            scores[(day, operator_id, 'overall_score', score_bucket(old_score))][0] -= 1
+        if new_score is not None:
+            scores[(day, operator_id, 'overall_score', score_bucket(new_score))][0] += 1
+    
+    apply_deltas(connection, EvaluationDailyRollup.__table__, EVALUATION_ROLLUP_KEYS,
+                 EVALUATION_ROLLUP_METRICS, deltas)
+    apply_deltas(connection, EvaluationScoreHistogram.__table__, SCORE_HISTOGRAM_KEYS,
+                 HISTOGRAM_METRICS, scores)
+
+def _insert_histogram(table, key_columns, counts):
+    rows = [dict(zip(key_columns, key), count=count) for key, count in counts.items()]
+    for start in range(0, len(rows), HISTOGRAM_INSERT_BATCH_SIZE):
+        db.session.execute(insert(table), rows[start:start + HISTOGRAM_INSERT_BATCH_SIZE])
+
+def rebuild_histograms(since=None):
+    """Recalcula os histogramas diários (não faz commit).
+    
+    Cada consulta agrupa por dia, operador e valor distinto, de modo que só
+    os valores distintos (e não todas as linhas) passam pelo Python para
+    serem mapeados em buckets.
+    """
+    duration_table = CallDurationHistogram.__table__
+    score_table = EvaluationScoreHistogram.__table__
+    clear_durations = delete(duration_table)
+    clear_scores = delete(score_table)
+    if since is not None:
+        clear_durations = clear_durations.where(duration_table.c.day >= since)
+        clear_scores = clear_scores.where(score_table.c.day >= since)
+    db.session.execute(clear_durations)
+    db.session.execute(clear_scores)
+    
+    call_day = func.date(Call.created_at, type_=db.Date)
+    durations_select = select(
+        call_day, Call.operator_id, Call.duration_seconds, func.count(Call.id)
+    ).where(Call.duration_seconds.isnot(None))\
+     .group_by(call_day, Call.operator_id, Call.duration_seconds)
+    if since is not None:
+        durations_select = durations_select.where(Call.created_at >= datetime.combine(since, time.min))
+    
+    durations = defaultdict(int)
+    for day, operator_id, duration, count in db.session.execute(durations_select):
+        durations[(day, operator_id, duration_bucket(duration))] += count
+    _insert_histogram(duration_table, DURATION_HISTOGRAM_KEYS, durations)
+    
+    evaluation_day = func.date(Evaluation.created_at, type_=db.Date)
+    for criterion in SCORE_HISTOGRAM_CRITERIA:
+        column = Evaluation.__table__.c[criterion]
+        scores_select = select(
+            evaluation_day, Call.operator_id, column, func.count(Evaluation.id)
+        ).join(Call, Call.id == Evaluation.call_id)\
+         .where(column.isnot(None))\
+         .group_by(evaluation_day, Call.operator_id, column)
+        if since is not None:
+            scores_select = scores_select.where(Evaluation.created_at >= datetime.combine(since, time.min))
+        
+        scores = defaultdict(int)
+        for day, operator_id, score, count in db.session.execute(scores_select):
+            scores[(day, operator_id, criterion, score_bucket(score))] += count
+        _insert_histogram(score_table, SCORE_HISTOGRAM_KEYS, scores)
+
+def rebuild_rollups(since=None):
+    """Recalcula rollups e histogramas a partir das tabelas de origem (todo o histórico ou a partir da data since)"""
+    call_table = CallDailyRollup.__table__
+    evaluation_table = EvaluationDailyRollup.__table__
+    
+    clear_calls = delete(call_table)
+    clear_evaluations = delete(evaluation_table)
+    if since is not None:
+        clear_calls = clear_calls.where(call_table.c.day >= since)
+        clear_evaluations = clear_evaluations.where(evaluation_table.c.day >= since)
+    
+    call_day = func.date(Call.created_at)
+    calls_select = select(
+        call_day,
+        Call.operator_id,
+        func.coalesce(Call.status, ''),
+        func.coalesce(Call.priority, ''),
+        func.coalesce(Call.category, ''),
+        func.count(Call.id),
+        func.coalesce(func.sum(Call.duration_seconds), 0),
+        func.count(Call.duration_seconds)
+    ).group_by(
+        call_day,
+        Call.operator_id,
+        func.coalesce(Call.status, ''),
+        func.coalesce(Call.priority, ''),
+        func.coalesce(Call.category, '')
+    )
+    
+    evaluation_day = func.date(Evaluation.created_at)
+    evaluations_select = select(
+        evaluation_day,
+        Call.operator_id,
+        func.count(Evaluation.id),
+        func.coalesce(func.sum(Evaluation.overall_score), 0.0),
+        func.count(Evaluation.overall_score),
+        func.sum(case((Evaluation.requires_coaching == True, 1), else_=0)),
+        func.sum(case((Evaluation.is_exemplary == True, 1), else_=0))
+    ).join(Call, Call.id == Evaluation.call_id).group_by(evaluation_day, Call.operator_id)
+    
+    if since is not None:
+        since_datetime = datetime.combine(since, time.min)
+        calls_select = calls_select.where(Call.created_at >= since_datetime)
+        evaluations_select = evaluations_select.where(Evaluation.created_at >= since_datetime)
+    
+    db.session.execute(clear_calls)
+    db.session.execute(clear_evaluations)
+    db.session.execute(
+        insert(call_table).from_select(CALL_ROLLUP_KEYS + CALL_ROLLUP_METRICS, calls_select)
+    )
+    db.session.execute(
+        insert(evaluation_table).from_select(
+            EVALUATION_ROLLUP_KEYS + EVALUATION_ROLLUP_METRICS, evaluations_select
+        )
+    )
+    rebuild_histograms(since)
+    db.session.commit()
+    
+    # Os rollups são lidos pelo dashboard; descartar resultados cacheados
+    dashboard_cache.invalidate()
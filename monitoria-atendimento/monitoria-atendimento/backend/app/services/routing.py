@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+
+# Binds das réplicas de leitura em SQLALCHEMY_BINDS: replica_0, replica_1, ...
+REPLICA_BIND_PREFIX = 'replica_'
+
+def is_replica_bind(key):
+    return isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)
+
+def engine_options(url, config, statement_timeout_ms=0):
+    """Opções do engine (pool e timeout por comando) conforme o driver da URL"""
+    url = make_url(url)
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    
+    # SQLite em memória usa StaticPool (uma conexão): não há pool para dimensionar
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+    
+    options.update({
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800)
+    })
+    if statement_timeout_ms and url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout_ms)}'}
+    return options
+
+def configure_engines(app):
+    """Preenche as opções do engine primário e os binds das réplicas (antes do db.init_app).
+    
+    Opções definidas explicitamente em SQLALCHEMY_ENGINE_OPTIONS têm precedência.
+    """
+    config = app.config
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(config['SQLALCHEMY_DATABASE_URI'], config, config.get('DB_STATEMENT_TIMEOUT_MS')),
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    for index, url in enumerate(config.get('DATABASE_REPLICA_URLS') or []):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = {
+            'url': url,
+            **engine_options(url, config, config.get('DB_REPLICA_STATEMENT_TIMEOUT_MS'))
+        }
+    config['SQLALCHEMY_BINDS'] = binds
+
+@contextmanager
+def primary_reads():
+    """Leituras do bloco no primário, mesmo em uma requisição roteada para a réplica"""
+    if not has_request_context():
+        yield
+        return
+    
+    read_bind = g.get('db_read_bind')
+    g.db_read_bind = None
+    try:
+        yield
+    finally:
+        g.db_read_bind = read_bind
+
+class RoutingSession(Session):
+    """Sessão que lê de uma réplica nas requisições roteadas para ela.
+    
+    A réplica da requisição fica em g.db_read_bind (ver services/replicas.py).
+    Só SELECTs vão para ela; flush, INSERT/UPDATE/DELETE e SQL textual ficam
+    no primário, e depois da primeira escrita a sessão não volta à réplica,
+    para ler o que acabou de gravar. Uma leitura que falha por queda da
+    réplica (g.db_read_failed, ver services/replicas.py) é repetida no
+    primário, e o resto da requisição também lê dele.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if getattr(clause, 'is_dml', False):
+            self.info['db_wrote'] = self.info['db_pinned'] = True
+        
+        if bind is None and has_request_context() and not self._flushing:
+            read_bind = g.get('db_read_bind')
+            if read_bind is not None and getattr(clause, 'is_select', False) \
+                    and not self.info.get('db_pinned'):
+                return self._db.engines[read_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+    
+    def _with_primary_fallback(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except exc.DBAPIError:
+            if not has_request_context() or g.pop('db_read_failed', None) is None:
+                raise
+        g.db_read_bind = None
+        return method(*args, **kwargs)
+    
+    def execute(self, *args, **kwargs):
+        return self._with_primary_fallback(super().execute, *args, **kwargs)
+    
+    def scalar(self, *args, **kwargs):
+        return self._with_primary_fallback(super().scalar, *args, **kwargs)
+    
+    def scalars(self, *args, **kwargs):
+        return self._with_primary_fallback(super().scalars, *args, **kwargs)
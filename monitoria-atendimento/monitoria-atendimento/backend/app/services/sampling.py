@@ -0,0 +1,373 @@
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import event, func, select, insert, update, delete, exists, and_, or_, tuple_
+from app import db
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+from app.models.evaluation_queue import EvaluationSamplingStratum, EvaluationQueueEntry
+from app.services.rollups import upsert_insert, add_to_rows
+
+SAMPLING_PERIODS = ('day', 'week', 'month')
+STRATUM_KEYS = ['period_start', 'operator_id', 'category', 'priority']
+
+# Chamadas lidas por vez na reconstrução da fila
+REBUILD_BATCH_SIZE = 5000
+
+def period_start(moment, period):
+    """Primeiro dia do período (dia, semana começando na segunda ou mês) que contém moment"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'Período de amostragem inválido: {period}')
+
+def period_end(start, period):
+    """Primeiro dia do período seguinte ao que começa em start"""
+    if period == 'day':
+        return start + timedelta(days=1)
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _available(now):
+    """Entradas pendentes ou com reserva vencida"""
+    queue = EvaluationQueueEntry.__table__
+    # Agrupado explicitamente: o OR é combinado por AND com os demais filtros da reserva
+    return or_(
+        queue.c.status == 'pending',
+        and_(queue.c.status == 'claimed', queue.c.lease_expires_at < now)
+    ).self_group()
+
+class EvaluationSampler:
+    """Fila de avaliação por amostragem estratificada (reservoir sampling).
+    
+    Cada estrato (período x operador x categoria x prioridade) mantém um
+    reservatório de até `cota` chamadas: as primeiras ocupam as vagas e a
+    n-ésima substitui uma vaga pendente com probabilidade cota/n, de modo que
+    toda chamada do período tem a mesma chance de ser avaliada. Vagas
+    reservadas ou já avaliadas não são substituídas. A vaga de uma chamada
+    excluída é preenchida por outra do estrato, sorteada entre as que ficaram
+    fora da fila.
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        self.period = 'week'
+        self.quota = 2
+        self.quota_by_priority = {}
+        self.lease_seconds = 1800
+        self._random = random.Random()
+    
+    def init_app(self, app):
+        self.enabled = app.config.get('EVALUATION_SAMPLING_ENABLED', True)
+        self.period = app.config.get('EVALUATION_SAMPLING_PERIOD', 'week')
+        if self.period not in SAMPLING_PERIODS:
+            raise ValueError(f'EVALUATION_SAMPLING_PERIOD deve ser um de {", ".join(SAMPLING_PERIODS)}')
+        self.quota = app.config.get('EVALUATION_SAMPLE_QUOTA', 2)
+        self.quota_by_priority = app.config.get('EVALUATION_SAMPLE_QUOTA_BY_PRIORITY', {})
+        self.lease_seconds = app.config.get('EVALUATION_QUEUE_LEASE_SECONDS', 1800)
+        app.extensions['evaluation_sampler'] = self
+    
+    def quota_for(self, priority):
+        return self.quota_by_priority.get(priority, self.quota)
+    
+    def current_period(self):
+        return period_start(datetime.utcnow(), self.period)
+    
+    def _advance(self, connection, arrivals):
+        """Soma as chegadas aos contadores dos estratos; retorna o total visto por estrato"""
+        strata = EvaluationSamplingStratum.__table__
+        rows = [dict(zip(STRATUM_KEYS, key), seen_count=count) for key, count in arrivals.items()]
+        dialect_insert = upsert_insert(connection)
+        if dialect_insert is None:
+            add_to_rows(connection, strata, STRATUM_KEYS, ['seen_count'], rows)
+            seen = connection.execute(
+                select(*(strata.c[key] for key in STRATUM_KEYS), strata.c.seen_count)
+                .where(tuple_(*(strata.c[key] for key in STRATUM_KEYS)).in_(list(arrivals)))
+            )
+            return {tuple(row[:-1]): row[-1] for row in seen}
+        
+        stmt = dialect_insert(strata).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=STRATUM_KEYS,
+            set_={'seen_count': strata.c.seen_count + stmt.excluded.seen_count}
+        ).returning(*(strata.c[key] for key in STRATUM_KEYS), strata.c.seen_count)
+        return {tuple(row[:-1]): row[-1] for row in connection.execute(stmt)}
+    
+    def _resolve_ids(self, connection, calls):
+        """IDs das chamadas inseridas em lote (sem id), pelo protocolo"""
+        missing = [call for call in calls if call.get('id') is None]
+        if not missing:
+            return
+        table = Call.__table__
+        ids = dict(connection.execute(
+            select(table.c.protocol, table.c.id).where(table.c.protocol.in_([call['protocol'] for call in missing]))
+        ).all())
+        for call in missing:
+            call['id'] = ids[call['protocol']]
+    
+    def sample(self, connection, calls):
+        """Passa novas chamadas pelos reservatórios dos seus estratos.
+        
+        calls: dicionários com operator_id, category, priority, created_at e
+        id ou protocol. Executa na transação da conexão informada.
+        """
+        if not self.enabled:
+            return
+        
+        arrivals = defaultdict(list)
+        for call in calls:
+            arrivals[self._stratum_key(call)].append(call)
+        
+        if not arrivals:
+            return
+        
+        seen = self._advance(connection, {key: len(stratum) for key, stratum in arrivals.items()})
+        
+        # Vagas novas (ainda não existem na fila) e vagas pendentes a substituir
+        fills = {}
+        replacements = {}
+        for key, stratum in arrivals.items():
+            quota = self.quota_for(key[3])
+            position = seen[key] - len(stratum)
+            for call in stratum:
+                position += 1
+                if position <= quota:
+                    fills[(key, position)] = call
+                    continue
+                slot = self._random.randint(1, position)
+                if slot > quota:
+                    continue
+                if (key, slot) in fills:
+                    fills[(key, slot)] = call
+                else:
+                    replacements[(key, slot)] = call
+        
+        if not fills and not replacements:
+            return
+        
+        self._resolve_ids(connection, list(fills.values()) + list(replacements.values()))
+        queue = EvaluationQueueEntry.__table__
+        now = datetime.utcnow()
+        
+        if fills:
+            connection.execute(insert(queue), [
+                dict(zip(STRATUM_KEYS, key), slot=slot, call_id=call['id'], status='pending', sampled_at=now)
+                for (key, slot), call in fills.items()
+            ])
+        
+        for (key, slot), call in replacements.items():
+            connection.execute(
+                update(queue).where(
+                    *(queue.c[column] == value for column, value in zip(STRATUM_KEYS, key)),
+                    queue.c.slot == slot,
+                    queue.c.status == 'pending'
+                ).values(call_id=call['id'], sampled_at=now)
+            )
+    
+    def _stratum_key(self, call):
+        return (
+            period_start(call['created_at'], self.period),
+            call['operator_id'],
+            call.get('category') or '',
+            call.get('priority') or ''
+        )
+    
+    def release(self, connection, calls):
+        """Tira chamadas excluídas dos estratos e preenche as vagas que elas ocupavam.
+        
+        calls: dicionários com id, operator_id, category, priority e created_at.
+        """
+        queue = EvaluationQueueEntry.__table__
+        strata = EvaluationSamplingStratum.__table__
+        call_ids = [call['id'] for call in calls]
+        slots = connection.execute(
+            select(*(queue.c[key] for key in STRATUM_KEYS), queue.c.slot).where(queue.c.call_id.in_(call_ids))
+        ).all()
+        # O SQLite não aplica ON DELETE CASCADE sem PRAGMA foreign_keys
+        connection.execute(delete(queue).where(queue.c.call_id.in_(call_ids)))
+        
+        departures = defaultdict(int)
+        for call in calls:
+            departures[self._stratum_key(call)] += 1
+        for key, count in departures.items():
+            connection.execute(update(strata).where(
+                *(strata.c[column] == value for column, value in zip(STRATUM_KEYS, key))
+            ).values(seen_count=strata.c.seen_count - count))
+        
+        if not self.enabled:
+            return
+        
+        table = Call.__table__
+        evaluations = Evaluation.__table__
+        now = datetime.utcnow()
+        for *key, slot in slots:
+            start, operator_id, category, priority = key
+            replacement = connection.execute(
+                select(table.c.id).where(
+                    table.c.operator_id == operator_id,
+                    func.coalesce(table.c.category, '') == category,
+                    func.coalesce(table.c.priority, '') == priority,
+                    table.c.created_at >= datetime.combine(start, time.min),
+                    table.c.created_at < datetime.combine(period_end(start, self.period), time.min),
+                    table.c.id.not_in(call_ids),
+                    ~exists().where(queue.c.call_id == table.c.id),
+                    ~exists().where(evaluations.c.call_id == table.c.id)
+                ).order_by(func.random()).limit(1)
+            ).scalar()
+            if replacement is not None:
+                connection.execute(insert(queue).values(
+                    **dict(zip(STRATUM_KEYS, key)), slot=slot, call_id=replacement, status='pending', sampled_at=now
+                ))
+    
+    def claim(self, evaluator_id, limit=1, operator_id=None):
+        """Reserva até limit entradas disponíveis para o avaliador; retorna os IDs reservados.
+        
+        As entradas do período mais recente saem primeiro (a amostra corrente
+        antes das pendências de períodos anteriores), pelo índice (status,
+        period_start, sampled_at) da fila, sem consultar calls. A reserva é um UPDATE condicional: entradas que outro avaliador
+        pegou entre a leitura e a escrita são ignoradas e outras são lidas.
+        """
+        queue = EvaluationQueueEntry.__table__
+        now = datetime.utcnow()
+        lease_expires_at = now + timedelta(seconds=self.lease_seconds)
+        claimed = []
+        skipped = set()
+        
+        for _ in range(3):
+            query = select(queue.c.id).where(_available(now))
+            if operator_id:
+                query = query.where(queue.c.operator_id == operator_id)
+            if skipped:
+                query = query.where(queue.c.id.not_in(skipped))
+            
+            # No Postgres, SKIP LOCKED evita esperar por reservas concorrentes
+            candidates = db.session.execute(
+                query.order_by(queue.c.period_start.desc(), queue.c.sampled_at, queue.c.id)
+                     .limit(limit - len(claimed))
+                     .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not candidates:
+                break
+            
+            # Só as que continuam disponíveis são reservadas (UPDATE ... RETURNING)
+            reserved = db.session.execute(
+                update(queue).where(queue.c.id.in_(candidates), _available(now)).values(
+                    status='claimed', claimed_by=evaluator_id, lease_expires_at=lease_expires_at
+                ).returning(queue.c.id)
+            ).scalars().all()
+            claimed.extend(reserved)
+            skipped.update(set(candidates) - set(reserved))
+            
+            if len(claimed) >= limit:
+                break
+        
+        return claimed
+    
+    def lease_holder(self, call_id):
+        """Avaliador com reserva vigente da chamada, se houver"""
+        return db.session.query(EvaluationQueueEntry.claimed_by).filter(
+            EvaluationQueueEntry.call_id == call_id,
+            EvaluationQueueEntry.status == 'claimed',
+            EvaluationQueueEntry.lease_expires_at >= datetime.utcnow()
+        ).scalar()
+
+evaluation_sampler = EvaluationSampler()
+
+def rebuild_evaluation_queue(since=None):
+    """Refaz estratos e fila a partir das chamadas, do período de since (padrão: o corrente) em diante"""
+    first_period = period_start(since or datetime.utcnow(), evaluation_sampler.period)
+    connection = db.session.connection()
+    calls = Call.__table__
+    queue = EvaluationQueueEntry.__table__
+    strata = EvaluationSamplingStratum.__table__
+    
+    connection.execute(delete(queue).where(queue.c.period_start >= first_period))
+    connection.execute(delete(strata).where(strata.c.period_start >= first_period))
+    
+    # Reprocessa as chamadas em ordem de criação, em lotes (keyset em created_at, id)
+    columns = [calls.c.id, calls.c.operator_id, calls.c.category, calls.c.priority, calls.c.created_at]
+    position = None
+    while True:
+        query = select(*columns).where(calls.c.created_at >= datetime.combine(first_period, time.min))
+        if position is not None:
+            query = query.where(tuple_(calls.c.created_at, calls.c.id) > position)
+        rows = connection.execute(
+            query.order_by(calls.c.created_at, calls.c.id).limit(REBUILD_BATCH_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        evaluation_sampler.sample(connection, [dict(row) for row in rows])
+        position = (rows[-1]['created_at'], rows[-1]['id'])
+    
+    # Chamadas sorteadas que já têm avaliação
+    connection.execute(
+        update(queue).where(
+            queue.c.period_start >= first_period,
+            exists().where(Evaluation.__table__.c.call_id == queue.c.call_id)
+        ).values(status='done', claimed_by=None, lease_expires_at=None)
+    )
+    db.session.commit()
+
+def init_app(app):
+    """Configura a amostragem de chamadas para avaliação"""
+    evaluation_sampler.init_app(app)
+
+def _sampling_fields(call):
+    return {
+        'id': call.id, 'operator_id': call.operator_id, 'category': call.category,
+        'priority': call.priority, 'created_at': call.created_at
+    }
+
+@event.listens_for(db.session, 'after_flush')
+def _update_evaluation_queue(session, flush_context):
+    """Amostra as chamadas criadas e fecha/reabre entradas conforme as avaliações"""
+    new_calls = []
+    evaluated = set()
+    reopened = set()
+    deleted_calls = []
+    
+    for obj in session.new:
+        if isinstance(obj, Call):
+            new_calls.append(_sampling_fields(obj))
+        elif isinstance(obj, Evaluation):
+            evaluated.add(obj.call_id)
+    
+    for obj in session.deleted:
+        if isinstance(obj, Evaluation):
+            reopened.add(obj.call_id)
+        elif isinstance(obj, Call):
+            deleted_calls.append(_sampling_fields(obj))
+    
+    if not (new_calls or evaluated or reopened or deleted_calls):
+        return
+    
+    connection = session.connection()
+    queue = EvaluationQueueEntry.__table__
+    
+    if new_calls:
+        evaluation_sampler.sample(connection, new_calls)
+    
+    if evaluated:
+        connection.execute(
+            update(queue).where(queue.c.call_id.in_(evaluated))
+                         .values(status='done', claimed_by=None, lease_expires_at=None)
+        )
+    
+    # Chamada que ficou sem avaliações volta para a fila
+    reopened -= {call['id'] for call in deleted_calls}
+    if reopened:
+        connection.execute(
+            update(queue).where(
+                queue.c.call_id.in_(reopened),
+                queue.c.status == 'done',
+                ~exists().where(Evaluation.__table__.c.call_id == queue.c.call_id)
+            ).values(status='pending')
+        )
+    
+    if deleted_calls:
+        evaluation_sampler.release(connection, deleted_calls)
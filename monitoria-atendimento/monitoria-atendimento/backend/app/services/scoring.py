@@ -0,0 +1,229 @@
+import threading
+from sqlalchemy import event, func, case, select, update, and_, or_, literal
+from app import db
+from app.models.call import Call
+from app.models.evaluation import Evaluation, SCORE_FIELDS, SCORE_MIN, SCORE_MAX, DEFAULT_WEIGHTS
+from app.models.rubric import Rubric
+from app.models.change_log import ChangeLogEntry
+from app.services.cache import SQLiteStore
+from app.services.changes import record_changes, call_owners
+
+# Avaliações reescritas por UPDATE na recomputação (um commit por lote)
+RECOMPUTE_BATCH_SIZE = 50000
+
+class RubricCache(SQLiteStore):
+    """Rubricas vigentes (última versão por categoria), em memória por worker.
+    
+    Uma versão global no arquivo compartilhado entre os workers é
+    incrementada quando uma rubrica é gravada; cada worker recarrega as
+    rubricas vigentes quando a versão muda.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._rubrics = None
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self._configure(app.config.get('RUBRIC_STATE_PATH', ':memory:'))
+        self._rubrics = None
+        self._version = None
+        app.extensions['rubric_cache'] = self
+    
+    @staticmethod
+    def _create_schema(connection):
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters (name, value) VALUES ('rubric_version', 0);
+        ''')
+    
+    def version(self):
+        return self._connect().execute(
+            "SELECT value FROM counters WHERE name = 'rubric_version'"
+        ).fetchone()[0]
+    
+    def bump(self):
+        """Descarta as rubricas carregadas em todos os workers"""
+        connection = self._connect()
+        with self._transaction(connection):
+            connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'rubric_version'")
+    
+    def active(self):
+        """{categoria: (id, pesos)} das rubricas vigentes; '' é a rubrica padrão"""
+        version = self.version()
+        with self._lock:
+            if version == self._version:
+                return self._rubrics
+        
+        rubrics = {rubric.category: (rubric.id, rubric.weights) for rubric in active_rubrics()}
+        with self._lock:
+            self._rubrics = rubrics
+            self._version = version
+        return rubrics
+    
+    def for_category(self, category):
+        """(id, pesos) da rubrica aplicável à categoria; id None para os pesos padrão"""
+        rubrics = self.active()
+        return rubrics.get(category or '') or rubrics.get('') or (None, DEFAULT_WEIGHTS)
+
+rubric_cache = RubricCache()
+
+def active_rubrics():
+    """Última versão da rubrica de cada categoria"""
+    latest = db.session.query(
+        Rubric.category, func.max(Rubric.version).label('version')
+    ).group_by(Rubric.category).subquery()
+    return Rubric.query.join(
+        latest, and_(Rubric.category == latest.c.category, Rubric.version == latest.c.version)
+    ).order_by(Rubric.category).all()
+
+def validate_weights(weights):
+    """Mensagem de erro para pesos inválidos, ou None"""
+    if not isinstance(weights, dict) or not weights:
+        return 'Campo weights deve ser um objeto {critério: peso} não vazio'
+    
+    for criterion, weight in weights.items():
+        if not criterion.replace('_', '').isalnum() or len(criterion) > 50:
+            return f'Critério inválido: {criterion}'
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            return f'Peso do critério {criterion} deve ser um número não negativo'
+    
+    if not any(weights.values()):
+        return 'Ao menos um critério deve ter peso positivo'
+    return None
+
+def validate_criteria_scores(criteria_scores):
+    """Mensagem de erro para notas de critérios adicionais inválidas, ou None"""
+    if not isinstance(criteria_scores, dict):
+        return 'Campo criteria_scores deve ser um objeto {critério: nota}'
+    
+    for criterion, score in criteria_scores.items():
+        if not criterion.replace('_', '').isalnum() or len(criterion) > 50:
+            return f'Critério inválido: {criterion}'
+        # Nulo remove a nota; bool é subclasse de int e não vale como nota
+        if score is None:
+            continue
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not SCORE_MIN <= score <= SCORE_MAX:
+            return f'Nota do critério {criterion} deve ser um número entre {SCORE_MIN} e {SCORE_MAX}'
+    return None
+
+def _criterion_column(criterion):
+    evaluations = Evaluation.__table__
+    if criterion in SCORE_FIELDS:
+        return evaluations.c[criterion]
+    return evaluations.c.criteria_scores[criterion].as_float()
+
+def score_expression(weights):
+    """Média ponderada dos critérios com nota, em SQL (mesma regra de calculate_overall_score)"""
+    total = literal(0.0)
+    weight_sum = literal(0.0)
+    for criterion, weight in weights.items():
+        column = _criterion_column(criterion)
+        total = total + case((column.isnot(None), column * float(weight)), else_=0.0)
+        weight_sum = weight_sum + case((column.isnot(None), float(weight)), else_=0.0)
+    return case((weight_sum > 0, total / weight_sum), else_=0.0)
+
+def recompute_scores(batch_size=RECOMPUTE_BATCH_SIZE, progress=None):
+    """Recalcula overall_score de todas as avaliações com as rubricas vigentes.
+    
+    Cada lote (faixa de ids) é um único UPDATE ... FROM calls que escolhe a
+    rubrica pela categoria da chamada; só as linhas cuja nota ou rubrica
+    mudam são reescritas, e os rollups recebem a diferença das notas na
+    mesma transação (uma reconstrução apagaria o histórico arquivado). Ao
+    final, o resumo das chamadas é reconstruído. progress(ids percorridos, faixa total de ids, atualizadas)
+    é chamado a cada lote. Retorna o número de avaliações atualizadas.
+    """
+    from app.services.evaluation_summary import rebuild_evaluation_summaries
+    from app.services.rollups import apply_score_changes
+    
+    evaluations = Evaluation.__table__
+    calls = Call.__table__
+    rubrics = rubric_cache.active()
+    default_id, default_weights = rubrics.get('', (None, DEFAULT_WEIGHTS))
+    specific = [(category, rubric) for category, rubric in rubrics.items() if category]
+    
+    if specific:
+        new_score = case(
+            *((calls.c.category == category, score_expression(weights)) for category, (_, weights) in specific),
+            else_=score_expression(default_weights)
+        )
+        new_rubric_id = case(
+            *((calls.c.category == category, rubric_id) for category, (rubric_id, _) in specific),
+            else_=default_id
+        )
+    else:
+        new_score = score_expression(default_weights)
+        new_rubric_id = literal(default_id, evaluations.c.rubric_id.type)
+    
+    first_id, last_id = db.session.execute(
+        select(func.min(evaluations.c.id), func.max(evaluations.c.id))
+    ).one()
+    if first_id is None:
+        return 0
+    
+    span = last_id - first_id + 1
+    updated = 0
+    log_start = db.session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+    for start in range(first_id, last_id + 1, batch_size):
+        end = min(start + batch_size, last_id + 1)
+        changed = and_(
+            calls.c.id == evaluations.c.call_id,
+            evaluations.c.id >= start,
+            evaluations.c.id < end,
+            or_(
+                evaluations.c.overall_score.is_distinct_from(new_score),
+                evaluations.c.rubric_id.is_distinct_from(new_rubric_id)
+            )
+        )
+        connection = db.session.connection()
+        record_changes(connection, 'evaluation', 'update',
+                       select(evaluations.c.id, calls.c.operator_id).where(changed))
+        apply_score_changes(connection, db.session.execute(select(
+            func.date(evaluations.c.created_at, type_=db.Date), calls.c.operator_id,
+            evaluations.c.overall_score, new_score
+        ).where(changed)).all())
+        result = db.session.execute(
+            update(evaluations).values(overall_score=new_score, rubric_id=new_rubric_id).where(changed)
+        )
+        db.session.info['dashboard_cache_stale'] = True
+        db.session.commit()
+        updated += result.rowcount
+        if progress is not None:
+            progress(end - first_id, span, updated)
+    
+    # Médias por chamada dependem das notas
+    if updated:
+        rebuild_evaluation_summaries()
+        
+        # As médias das chamadas mudam só na reconstrução: entram no feed depois dela
+        rescored_calls = select(Evaluation.call_id).join(ChangeLogEntry, and_(
+            ChangeLogEntry.entity == 'evaluation', ChangeLogEntry.entity_id == Evaluation.id
+        )).where(ChangeLogEntry.id > log_start)
+        record_changes(db.session.connection(), 'call', 'update', call_owners(rescored_calls))
+        db.session.commit()
+    return updated
+
+def init_app(app):
+    """Configura o cache de rubricas do worker"""
+    rubric_cache.init_app(app)
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_rubric_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Rubric):
+            session.info['rubric_version_stale'] = True
+            return
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_after_commit(session):
+    """Os outros workers só recarregam depois que a rubrica está visível"""
+    if session.info.pop('rubric_version_stale', False):
+        rubric_cache.bump()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_rubric_mark(session):
+    session.info.pop('rubric_version_stale', None)
@@ -0,0 +1,128 @@
+import re
+from sqlalchemy import event, func, false, literal_column, or_, select, text
+from app import db
+from app.models.call import Call
+
+# Campos pesquisáveis da chamada (na ordem das colunas do índice FTS5)
+SEARCH_FIELDS = ['customer_name', 'subject', 'description', 'notes']
+
+# Postgres: configuração portuguesa sem acentos e coluna tsvector gerada,
+# mantida pelo próprio banco em INSERT/UPDATE (inclusive COPY)
+POSTGRES_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    '''
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END
+    $$
+    ''',
+    '''
+    ALTER TABLE calls ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('pt_unaccent'::regconfig, coalesce(subject, '')), 'A') ||
+        setweight(to_tsvector('pt_unaccent'::regconfig, coalesce(customer_name, '')), 'B') ||
+        setweight(to_tsvector('pt_unaccent'::regconfig, coalesce(description, '')), 'C') ||
+        setweight(to_tsvector('pt_unaccent'::regconfig, coalesce(notes, '')), 'D')
+    ) STORED
+    ''',
+    'CREATE INDEX IF NOT EXISTS ix_calls_search_vector ON calls USING GIN (search_vector)'
+]
+
+# SQLite: tabela FTS5 de conteúdo externo sincronizada por triggers
+SQLITE_DDL = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS calls_fts USING fts5(
+        customer_name, subject, description, notes,
+        content='calls', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS calls_fts_insert AFTER INSERT ON calls BEGIN
+        INSERT INTO calls_fts (rowid, customer_name, subject, description, notes)
+        VALUES (new.id, new.customer_name, new.subject, new.description, new.notes);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS calls_fts_delete AFTER DELETE ON calls BEGIN
+        INSERT INTO calls_fts (calls_fts, rowid, customer_name, subject, description, notes)
+        VALUES ('delete', old.id, old.customer_name, old.subject, old.description, old.notes);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS calls_fts_update
+    AFTER UPDATE OF customer_name, subject, description, notes ON calls BEGIN
+        INSERT INTO calls_fts (calls_fts, rowid, customer_name, subject, description, notes)
+        VALUES ('delete', old.id, old.customer_name, old.subject, old.description, old.notes);
+        INSERT INTO calls_fts (rowid, customer_name, subject, description, notes)
+        VALUES (new.id, new.customer_name, new.subject, new.description, new.notes);
+    END
+    '''
+]
+
+SEARCH_DDL = {
+    'postgresql': POSTGRES_DDL,
+    'sqlite': SQLITE_DDL
+}
+
+def ensure_search_index(connection):
+    """Cria (de forma idempotente) o índice textual para o dialeto da conexão"""
+    for statement in SEARCH_DDL.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+def rebuild_search_index():
+    """Garante a estrutura do índice e reindexa as chamadas existentes"""
+    connection = db.session.connection()
+    ensure_search_index(connection)
+    
+    # No Postgres a coluna gerada já é preenchida pelo ALTER TABLE
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("INSERT INTO calls_fts (calls_fts) VALUES ('rebuild')"))
+    
+    db.session.commit()
+
+@event.listens_for(Call.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    ensure_search_index(connection)
+
+@event.listens_for(Call.__table__, 'after_drop')
+def _drop_search_index(target, connection, **kw):
+    # A tabela FTS5 não pertence ao metadata; no Postgres a coluna cai junto com a tabela
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DROP TABLE IF EXISTS calls_fts'))
+
+def _fts5_query(terms):
+    """Converte o texto livre em termos FTS5 entre aspas (todos obrigatórios)"""
+    tokens = re.findall(r'\w+', terms)
+    return ' '.join('"{}"'.format(token) for token in tokens)
+
+def search_calls(query, terms):
+    """Filtra a consulta de chamadas pelo texto e ordena pela relevância"""
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'postgresql':
+        search_vector = literal_column('calls.search_vector')
+        ts_query = func.websearch_to_tsquery('pt_unaccent', terms)
+        return query.filter(search_vector.op('@@')(ts_query))\
+                    .order_by(func.ts_rank_cd(search_vector, ts_query).desc())
+    
+    if dialect == 'sqlite':
+        match = _fts5_query(terms)
+        if not match:
+            return query.filter(false())
+        
+        # bm25: menor é mais relevante; pesos seguem a ordem de SEARCH_FIELDS
+        matches = select(
+            literal_column('calls_fts.rowid').label('call_id'),
+            literal_column('bm25(calls_fts, 2.0, 4.0, 1.0, 1.0)').label('rank')
+        ).select_from(text('calls_fts'))\
+         .where(text('calls_fts MATCH :fts_query').bindparams(fts_query=match))\
+         .subquery('call_search')
+        return query.join(matches, matches.c.call_id == Call.id).order_by(matches.c.rank)
+    
+    # Demais bancos: busca simples por substring, sem ranqueamento
+    pattern = f'%{terms}%'
+    return query.filter(or_(*(getattr(Call, field).ilike(pattern) for field in SEARCH_FIELDS)))
@@ -0,0 +1,235 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import DateTime
+from sqlalchemy.orm import aliased
+from app import db
+from app.models.user import User
+from app.models.call import Call
+from app.models.evaluation import Evaluation
+
+try:
+    import orjson
+except ImportError:  # dependência opcional: sem ela fica o provider padrão do Flask
+    orjson = None
+
+JSON_PROVIDERS = ('orjson', 'default')
+
+# Combinações de fields= com serializador compilado guardadas por modelo
+PROJECTION_CACHE_SIZE = 256
+
+def compile_serializer(fields, name='row'):
+    """Gera uma função linha -> dicionário para os campos [(nome, é_datetime)].
+    
+    O corpo é montado uma única vez como um literal de dicionário que lê
+    as posições da tupla diretamente, sem laço nem getattr por campo.
+    Datetimes viram isoformat() e None continua None, como nos to_dict().
+    """
+    items = []
+    for index, (field, is_datetime) in enumerate(fields):
+        value = f'row[{index}]'
+        if is_datetime:
+            value = f'({value}.isoformat() if {value} is not None else None)'
+        items.append(f'{field!r}: {value}')
+    
+    source = 'def serialize(row):\n    return {' + ', '.join(items) + '}\n'
+    namespace = {}
+    exec(compile(source, f'<serializer {name}>', 'exec'), namespace)
+    return namespace['serialize']
+
+class RowSerializer:
+    """Serializador compilado para linhas (tuplas) de uma consulta por colunas"""
+    
+    def __init__(self, fields, name='row'):
+        self.fields = [field for field, _ in fields]
+        self.serialize = compile_serializer(fields, name)
+    
+    @classmethod
+    def for_query(cls, query):
+        """Serializador das colunas de uma consulta (nomes e tipos de column_descriptions)"""
+        return cls([
+            (column['name'], isinstance(column['type'], DateTime))
+            for column in query.column_descriptions
+        ])
+    
+    def many(self, rows):
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+class InvalidFields(ValueError):
+    """Campo desconhecido no parâmetro fields"""
+
+class ModelProjection(RowSerializer):
+    """Colunas de Model.to_dict() projetadas em SQL, com o serializador compilado.
+    
+    As listagens leem tuplas em vez de instâncias do ORM (sem identity map
+    nem relacionamentos) e geram os mesmos campos e valores de to_dict().
+    Com project(), apenas um subconjunto dos campos é lido e serializado;
+    os JOINs entram só quando algum campo selecionado depende deles.
+    """
+    
+    def __init__(self, model, columns, joins=None, extra_columns=()):
+        super().__init__(
+            [(column.key, isinstance(column.type, DateTime)) for column in columns],
+            name=model.__name__
+        )
+        self.model = model
+        # Colunas extras são lidas (ex.: as do cursor), mas não entram no dicionário
+        self.columns = list(columns) + list(extra_columns)
+        self.joins = joins or {}
+        self._subsets = {}
+    
+    def query(self):
+        query = db.session.query(*self.columns).select_from(self.model)
+        for field in self.fields:
+            if field in self.joins:
+                target, onclause = self.joins[field]
+                query = query.outerjoin(target, onclause)
+        return query
+    
+    def parse_fields(self, value, default=None):
+        """Campos pedidos em fields=a,b,c na ordem de to_dict(); '*' pede todos.
+        
+        Sem o parâmetro, vale a projeção padrão do endpoint (ou todos os campos).
+        """
+        requested = {field.strip() for field in (value or '').split(',') if field.strip()}
+        if not requested:
+            return list(default or self.fields)
+        if '*' in requested:
+            return list(self.fields)
+        
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise InvalidFields(f'Campos inválidos em fields: {", ".join(sorted(unknown))}')
+        return [field for field in self.fields if field in requested]
+    
+    def project(self, fields, required=()):
+        """Projeção só com os campos pedidos; as colunas em required são lidas sem ir para o resultado"""
+        key = (tuple(fields), tuple(required))
+        projection = self._subsets.get(key)
+        if projection is None:
+            columns = {column.key: column for column in self.columns}
+            if len(self._subsets) >= PROJECTION_CACHE_SIZE:
+                self._subsets.clear()
+            projection = self._subsets[key] = ModelProjection(
+                self.model,
+                [columns[field] for field in fields],
+                self.joins,
+                extra_columns=[columns[field] for field in required if field not in fields]
+            )
+        return projection
+
+_call_operator = aliased(User, name='call_operator')
+_evaluator = aliased(User, name='evaluator')
+
+call_projection = ModelProjection(Call, [
+    Call.id,
+    Call.protocol,
+    Call.operator_id,
+    _call_operator.full_name.label('operator_name'),
+    Call.customer_name,
+    Call.customer_phone,
+    Call.customer_email,
+    Call.subject,
+    Call.description,
+    Call.category,
+    Call.priority,
+    Call.status,
+    Call.duration_seconds,
+    Call.recording_url,
+    Call.notes,
+    Call.created_at,
+    Call.updated_at,
+    Call.closed_at,
+    Call.evaluation_count,
+    Call.avg_overall_score,
+    Call.last_evaluated_at,
+    Call.requires_coaching
+], joins={'operator_name': (_call_operator, _call_operator.id == Call.operator_id)})
+
+evaluation_projection = ModelProjection(Evaluation, [
+    Evaluation.id,
+    Evaluation.call_id,
+    Evaluation.evaluator_id,
+    _evaluator.full_name.label('evaluator_name'),
+    Evaluation.greeting_score,
+    Evaluation.communication_score,
+    Evaluation.problem_solving_score,
+    Evaluation.empathy_score,
+    Evaluation.procedure_score,
+    Evaluation.closing_score,
+    Evaluation.criteria_scores,
+    Evaluation.overall_score,
+    Evaluation.rubric_id,
+    Evaluation.positive_points,
+    Evaluation.improvement_points,
+    Evaluation.general_comments,
+    Evaluation.requires_coaching,
+    Evaluation.is_exemplary,
+    Evaluation.created_at,
+    Evaluation.updated_at
+], joins={'evaluator_name': (_evaluator, _evaluator.id == Evaluation.evaluator_id)})
+
+user_projection = ModelProjection(User, [
+    User.id,
+    User.username,
+    User.email,
+    User.full_name,
+    User.role,
+    User.is_active,
+    User.created_at,
+    User.updated_at
+])
+
+if orjson is not None:
+    _ORJSON_KWARGS = {'default', 'sort_keys', 'indent', 'separators', 'ensure_ascii'}
+    
+    class OrjsonProvider(DefaultJSONProvider):
+        """Provider JSON do Flask sobre o orjson, com as mesmas conversões do padrão.
+        
+        Datetimes passam pelo default do Flask (data HTTP) como no provider
+        padrão, chaves não textuais são aceitas e sort_keys é respeitado. A
+        saída é UTF-8 sem escapes \\u; opções que o orjson não conhece e
+        valores que ele recusa (ex.: inteiros acima de 64 bits) seguem para o
+        json da biblioteca padrão.
+        """
+        
+        def dumps(self, obj, **kwargs):
+            if not kwargs.keys() <= _ORJSON_KWARGS:
+                return super().dumps(obj, **kwargs)
+            
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+            except orjson.JSONEncodeError:
+                return super().dumps(obj, **kwargs)
+        
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+    
+    def dumps_line(record):
+        """Uma linha NDJSON (UTF-8, sem escapes)"""
+        return orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS).decode()
+else:
+    OrjsonProvider = None
+    
+    def dumps_line(record):
+        """Uma linha NDJSON (UTF-8, sem escapes)"""
+        return json.dumps(record, ensure_ascii=False)
+
+def init_app(app):
+    """Troca o provider JSON da aplicação conforme JSON_PROVIDER (orjson quando instalado)"""
+    provider = app.config.get('JSON_PROVIDER', 'orjson')
+    if provider not in JSON_PROVIDERS:
+        raise ValueError(f'JSON_PROVIDER inválido: {provider} (use orjson ou default)')
+    
+    if provider == 'orjson':
+        if OrjsonProvider is None:
+            app.logger.warning('JSON_PROVIDER=orjson, mas o pacote orjson não está instalado; usando o padrão')
+            return
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,51 @@
+import math
+
+# Histogramas de buckets fixos: contagens por bucket são aditivas, então os
+# rollups diários se combinam somando as linhas do período.
+
+# Duração: buckets logarítmicos (como no DDSketch) com erro relativo máximo de 2%
+DURATION_RELATIVE_ACCURACY = 0.02
+_GAMMA = (1 + DURATION_RELATIVE_ACCURACY) / (1 - DURATION_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+# Notas: buckets de 0,1 ponto (exatos para os critérios inteiros)
+SCORE_BUCKET_SCALE = 10
+
+DURATION_QUANTILES = (0.5, 0.9, 0.99)
+SCORE_QUANTILES = (0.1, 0.5, 0.9)
+
+def duration_bucket(seconds):
+    """Bucket da duração; 0 guarda durações menores que 1 segundo"""
+    if seconds < 1:
+        return 0
+    return 1 + math.ceil(math.log(seconds) / _LOG_GAMMA)
+
+def duration_value(bucket):
+    """Valor representativo do bucket (erro relativo <= DURATION_RELATIVE_ACCURACY)"""
+    if bucket <= 0:
+        return 0.0
+    return 2 * _GAMMA ** (bucket - 1) / (_GAMMA + 1)
+
+def score_bucket(score):
+    return int(round(score * SCORE_BUCKET_SCALE))
+
+def score_value(bucket):
+    return bucket / SCORE_BUCKET_SCALE
+
+def quantiles(counts, qs, value):
+    """Quantis de um histograma {bucket: contagem}; value converte bucket em valor"""
+    total = sum(counts.values())
+    if not total:
+        return {q: None for q in qs}
+    
+    buckets = sorted(bucket for bucket, count in counts.items() if count)
+    result = {}
+    for q in qs:
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in buckets:
+            seen += counts[bucket]
+            if seen > rank:
+                result[q] = value(bucket)
+                break
+    return result
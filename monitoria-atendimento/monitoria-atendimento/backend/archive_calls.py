@@ -0,0 +1,59 @@
+"""Manutenção periódica: cria partições futuras e arquiva as chamadas encerradas antigas"""
+import os
+import sys
+import argparse
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app, db
+from app.services.archive import archive_calls, archive_cutoff
+from app.services.partitioning import ensure_partitions, drop_empty_partitions
+
+def main():
+    """Executa a manutenção das partições e o arquivamento (indicado para o cron)"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--older-than-days', type=int,
+                        help='Idade mínima das chamadas encerradas arquivadas (padrão: ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--batch-size', type=int, help='Chamadas por transação (padrão: ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--months-ahead', type=int,
+                        help='Partições futuras garantidas (padrão: PARTITION_MONTHS_AHEAD)')
+    parser.add_argument('--skip-archive', action='store_true', help='Apenas criar as partições futuras')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        # Cria a tabela archived_calls em bases anteriores ao arquivamento
+        db.create_all()
+        
+        months_ahead = args.months_ahead if args.months_ahead is not None else app.config['PARTITION_MONTHS_AHEAD']
+        created = ensure_partitions(db.session.connection(), months_ahead)
+        db.session.commit()
+        if created:
+            print(f"Partições criadas: {', '.join(created)}")
+        
+        if args.skip_archive:
+            return
+        
+        older_than_days = args.older_than_days or app.config['ARCHIVE_AFTER_DAYS']
+        batch_size = args.batch_size or app.config['ARCHIVE_BATCH_SIZE']
+        print(f"Arquivando chamadas encerradas há mais de {older_than_days} dias...")
+        
+        def report(archived):
+            print(f"  {archived} chamadas arquivadas...", end='\r')
+        
+        archived = archive_calls(older_than_days, batch_size, progress=report)
+        print(f"\n{archived} chamadas arquivadas.")
+        
+        # Partições que o arquivamento esvaziou não precisam ser varridas
+        dropped = drop_empty_partitions(db.session.connection(), archive_cutoff(older_than_days))
+        db.session.commit()
+        if dropped:
+            print(f"Partições vazias removidas: {', '.join(dropped)}")
+        print("Manutenção concluída!")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""Benchmark e teste de carga dos endpoints da API
+
+Para cada tamanho de massa (--sizes), popula o banco com generate_data.py e
+exercita todos os blueprints (auth, users, calls, evaluations, dashboard) com
+o test client do Flask e com um driver HTTP concorrente. Reporta latência
+p50/p95/p99, vazão e consultas SQL por requisição, grava o resultado em JSON
+e compara com a baseline: sai com código 1 se algum cenário regredir.
+
+Exemplos:
+    python benchmarks/endpoint_benchmark.py --sizes 1000,10000 --save-baseline
+    python benchmarks/endpoint_benchmark.py --sizes 1000,10000
+    python benchmarks/endpoint_benchmark.py --database-url postgresql://... --sizes 100000
+"""
+import os
+import sys
+import argparse
+import json
+import logging
+import math
+import platform
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Adicionar o diretório do backend ao path
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from werkzeug.serving import make_server
+
+import generate_data
+from config import config, TestingConfig
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# (nome, método, caminho, papel do token, corpo); caminho e corpo usam os IDs da massa
+SCENARIOS = [
+    ('auth.login', 'POST', '/api/auth/login', None,
+     lambda ctx: {'username': 'admin', 'password': generate_data.PASSWORDS['admin']}),
+    ('auth.refresh', 'POST', '/api/auth/refresh', 'refresh', None),
+    ('auth.me', 'GET', '/api/auth/me', 'admin', None),
+    ('users.list', 'GET', '/api/users/', 'admin', None),
+    ('users.detail', 'GET', '/api/users/{operator_id}', 'admin', None),
+    ('calls.list', 'GET', '/api/calls/?per_page=20', 'admin', None),
+    ('calls.list_operator', 'GET', '/api/calls/?per_page=20', 'operator', None),
+    ('calls.list_filtered', 'GET', '/api/calls/?status=open&category=suporte&per_page=20', 'admin', None),
+    ('calls.list_cursor', 'GET', '/api/calls/?cursor=&limit=20', 'admin', None),
+    ('calls.list_fields', 'GET', '/api/calls/?per_page=20&fields=id,protocol,customer_name,subject,operator_name,status,priority,created_at', 'admin', None),
+    ('calls.list_unevaluated', 'GET', '/api/calls/?evaluated=false&per_page=20', 'admin', None),
+    ('calls.list_by_score', 'GET', '/api/calls/?sort=avg_overall_score&per_page=20', 'admin', None),
+    ('calls.search', 'GET', '/api/calls/?q=fatura&per_page=20', 'admin', None),
+    ('calls.detail', 'GET', '/api/calls/{call_id}', 'admin', None),
+    ('calls.create', 'POST', '/api/calls/', 'admin',
+     lambda ctx: {'customer_name': 'Cliente Benchmark', 'subject': 'Internet lenta',
+                  'operator_id': ctx['operator_id'], 'category': 'suporte', 'duration_seconds': 300}),
+    ('evaluations.list', 'GET', '/api/evaluations/?per_page=20', 'supervisor', None),
+    ('evaluations.list_cursor', 'GET', '/api/evaluations/?cursor=&limit=20', 'supervisor', None),
+    ('evaluations.queue', 'GET', '/api/evaluations/queue', 'supervisor', None),
+    ('evaluations.detail', 'GET', '/api/evaluations/{evaluation_id}', 'supervisor', None),
+    ('evaluations.create', 'POST', '/api/evaluations/', 'supervisor',
+     lambda ctx: {'call_id': ctx['call_id'], 'greeting_score': 4, 'communication_score': 4,
+                  'problem_solving_score': 3, 'empathy_score': 5, 'procedure_score': 4, 'closing_score': 4}),
+    ('dashboard.stats', 'GET', '/api/dashboard/stats?days=30', 'admin', None),
+    ('dashboard.stats_operator', 'GET', '/api/dashboard/stats?days=30', 'operator', None),
+    ('dashboard.operator_performance', 'GET', '/api/dashboard/operator-performance?days=30', 'admin', None),
+    ('dashboard.distributions', 'GET', '/api/dashboard/distributions?days=30', 'admin', None),
+    ('dashboard.distributions_operator', 'GET', '/api/dashboard/distributions?days=30&group_by=operator', 'admin', None),
+    ('dashboard.recent_activity', 'GET', '/api/dashboard/recent-activity?limit=10', 'admin', None)
+]
+
+class QueryCounter:
+    """Conta as consultas SQL executadas pelo processo (todas as threads)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self.lock:
+            self.count += 1
+
+query_counter = QueryCounter()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help='Volumes de chamadas, separados por vírgula')
+    parser.add_argument('--database-url', help='Banco do benchmark (é recriado); padrão: SQLite temporário')
+    parser.add_argument('--requests', type=int, default=50, help='Requisições medidas por cenário e modo')
+    parser.add_argument('--warmup', type=int, default=3, help='Requisições de aquecimento por cenário')
+    parser.add_argument('--concurrency', type=int, default=8, help='Clientes simultâneos no modo HTTP')
+    parser.add_argument('--mode', choices=['client', 'http', 'both'], default='both')
+    parser.add_argument('--scenarios', help='Prefixos de cenários a executar (ex.: calls,dashboard.stats)')
+    parser.add_argument('--with-cache', action='store_true', help='Manter o cache do dashboard ativo')
+    parser.add_argument('--reuse-data', action='store_true', help='Reaproveitar massas já populadas')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Arquivo JSON do resultado (padrão: benchmarks/results/)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline usada na comparação')
+    parser.add_argument('--save-baseline', action='store_true', help='Gravar o resultado como nova baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Aumento relativo de p95 tolerado antes de acusar regressão')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='Diferença absoluta mínima de p95 para acusar regressão')
+    return parser.parse_args()
+
+def percentile(sorted_values, p):
+    """Percentil pelo método nearest-rank"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(timings, statuses, elapsed, queries):
+    timings = sorted(timings)
+    return {
+        'requests': len(timings),
+        'errors': sum(1 for status in statuses if status >= 400),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        'queries_per_request': round(queries / len(timings), 2)
+    }
+
+def create_benchmark_app(database_url, with_cache):
+    """Aplicação de teste apontando para o banco do benchmark"""
+    from app import create_app
+    
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'DASHBOARD_CACHE_ENABLED': with_cache,
+        # O limite de consultas interromperia o benchmark; aqui as consultas são medidas
+        'QUERY_BUDGET': None
+    })
+    return create_app('benchmark')
+
+def prepare_dataset(app, size, args):
+    """Popula a massa do tamanho pedido e retorna os IDs usados pelos cenários"""
+    from app import db
+    from app.models import User, Call, Evaluation
+    
+    with app.app_context():
+        if not args.reuse_data:
+            db.drop_all()
+        
+        generate_data.populate(generate_data.parse_args([
+            '--calls', str(size),
+            '--operators', str(max(5, min(200, size // 500))),
+            '--seed', str(args.seed),
+            '--workers', '1'
+        ]))
+        
+        # Operador com mais chamadas: o pior caso da visão de operador
+        operator_id = db.session.query(Call.operator_id)\
+                                .group_by(Call.operator_id)\
+                                .order_by(func.count(Call.id).desc())\
+                                .limit(1).scalar()
+        middle_call = db.session.query(func.max(Call.id)).scalar() // 2
+        return {
+            'operator_id': operator_id,
+            'operator_username': db.session.get(User, operator_id).username,
+            'supervisor_username': User.query.filter_by(role='supervisor').order_by(User.id).first().username,
+            'call_id': Call.query.filter(Call.id >= middle_call).order_by(Call.id).first().id,
+            'evaluation_id': Evaluation.query.order_by(Evaluation.id).first().id
+        }
+
+def authenticate(client, ctx):
+    """Tokens por papel (o login não entra na medição dos demais cenários)"""
+    credentials = {
+        'admin': ('admin', generate_data.PASSWORDS['admin']),
+        'supervisor': (ctx['supervisor_username'], generate_data.PASSWORDS['supervisor']),
+        'operator': (ctx['operator_username'], generate_data.PASSWORDS['operator'])
+    }
+    tokens = {}
+    for role, (username, password) in credentials.items():
+        data = client.post('/api/auth/login', json={'username': username, 'password': password}).get_json()
+        tokens[role] = data['access_token']
+        if role == 'admin':
+            tokens['refresh'] = data['refresh_token']
+    return tokens
+
+def build_request(scenario, ctx, tokens):
+    name, method, path, role, body = scenario
+    headers = {'Authorization': f'Bearer {tokens[role]}'} if role else {}
+    return method, path.format(**ctx), headers, body(ctx) if body else None
+
+def run_client(client, request, count):
+    """Requisições sequenciais pelo test client do Flask"""
+    method, path, headers, body = request
+    timings = []
+    statuses = []
+    
+    start_queries = query_counter.count
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, json=body)
+        response.get_data()
+        timings.append((time.perf_counter() - request_started) * 1000)
+        statuses.append(response.status_code)
+    
+    return summarize(timings, statuses, time.perf_counter() - started, query_counter.count - start_queries)
+
+def _http_request(base_url, request):
+    method, path, headers, body = request
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    http_request = urllib.request.Request(
+        base_url + path, data=data, method=method,
+        headers=dict(headers, **({'Content-Type': 'application/json'} if data else {}))
+    )
+    
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(http_request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return (time.perf_counter() - started) * 1000, status
+
+def run_http(base_url, request, count, concurrency):
+    """Requisições concorrentes contra o servidor WSGI em threads"""
+    start_queries = query_counter.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: _http_request(base_url, request), range(count)))
+    elapsed = time.perf_counter() - started
+    
+    timings = [timing for timing, _ in results]
+    statuses = [status for _, status in results]
+    return summarize(timings, statuses, elapsed, query_counter.count - start_queries)
+
+def start_server(app):
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.port}'
+
+def benchmark_size(size, args, scenarios):
+    database_url = args.database_url or 'sqlite:///' + os.path.join(
+        tempfile.gettempdir(), f'monitoria_benchmark_{size}.sqlite3'
+    )
+    app = create_benchmark_app(database_url, args.with_cache)
+    
+    print(f"\n=== {size} chamadas ({database_url.split('@')[-1]}) ===")
+    ctx = prepare_dataset(app, size, args)
+    client = app.test_client()
+    tokens = authenticate(client, ctx)
+    modes = ['client', 'http'] if args.mode == 'both' else [args.mode]
+    
+    server = base_url = None
+    if 'http' in modes:
+        server, base_url = start_server(app)
+    
+    results = {}
+    try:
+        for scenario in scenarios:
+            request = build_request(scenario, ctx, tokens)
+            results[scenario[0]] = {}
+            
+            for _ in range(args.warmup):
+                client.open(request[1], method=request[0], headers=request[2], json=request[3]).get_data()
+            
+            if 'client' in modes:
+                results[scenario[0]]['client'] = run_client(client, request, args.requests)
+            if 'http' in modes:
+                results[scenario[0]]['http'] = run_http(base_url, request, args.requests, args.concurrency)
+            
+            print_row(scenario[0], results[scenario[0]])
+    finally:
+        if server is not None:
+            server.shutdown()
+    
+    return results
+
+def print_header():
+    print(f"{'cenário':<34} {'modo':<7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'sql/req':>8} {'erros':>6}")
+
+def print_row(name, modes):
+    for mode, stats in modes.items():
+        print(f"{name:<34} {mode:<7} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+              f"{stats['throughput_rps']:>8.1f} {stats['queries_per_request']:>8.2f} {stats['errors']:>6}")
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Lista os cenários que pioraram em relação à baseline"""
+    regressions = []
+    for size, scenarios in current['results'].items():
+        for name, modes in scenarios.items():
+            for mode, stats in modes.items():
+                base = baseline.get('results', {}).get(size, {}).get(name, {}).get(mode)
+                if not base:
+                    continue
+                
+                limit = base['p95_ms'] * (1 + tolerance)
+                if stats['p95_ms'] > limit and stats['p95_ms'] - base['p95_ms'] > min_delta_ms:
+                    regressions.append(
+                        f"{size} {name} [{mode}]: p95 {base['p95_ms']:.1f}ms -> {stats['p95_ms']:.1f}ms"
+                    )
+                if stats['queries_per_request'] > base['queries_per_request'] + 0.5:
+                    regressions.append(
+                        f"{size} {name} [{mode}]: consultas/req {base['queries_per_request']} -> "
+                        f"{stats['queries_per_request']}"
+                    )
+                if stats['errors'] > base['errors']:
+                    regressions.append(f"{size} {name} [{mode}]: erros {base['errors']} -> {stats['errors']}")
+    return regressions
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    scenarios = SCENARIOS
+    if args.scenarios:
+        prefixes = tuple(args.scenarios.split(','))
+        scenarios = [scenario for scenario in SCENARIOS if scenario[0].startswith(prefixes)]
+    
+    # Sem o log de acesso do servidor de desenvolvimento durante a carga
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    event.listen(Engine, 'before_cursor_execute', query_counter)
+    
+    report = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'database': 'sqlite (temporário)' if not args.database_url else args.database_url.split('@')[-1],
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'with_cache': args.with_cache,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'results': {}
+    }
+    
+    for size in sizes:
+        print_header()
+        report['results'][str(size)] = benchmark_size(size, args, scenarios)
+    
+    output = args.output or os.path.join(RESULTS_DIR, f"endpoints-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultado gravado em {output}")
+    
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Baseline gravada em {args.baseline}")
+        return
+    
+    if not os.path.exists(args.baseline):
+        print("Nenhuma baseline encontrada; use --save-baseline para criar uma.")
+        return
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    
+    regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\nREGRESSÕES em relação à baseline ({len(regressions)}):")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\nNenhuma regressão em relação à baseline.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark de login sob rajada concorrente
+
+Dispara logins simultâneos contra o servidor WSGI em threads e, ao mesmo
+tempo, mede a latência de um endpoint barato (/api/auth/me) para mostrar o
+impacto do hash de senhas nas demais requisições. Compara o hash no próprio
+processo (--hash-workers 0) com o pool de processos.
+
+Exemplos:
+    python benchmarks/login_benchmark.py
+    python benchmarks/login_benchmark.py --hash-workers 0,2,4 --logins 200 --concurrency 16
+"""
+import os
+import sys
+import argparse
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Adicionar o diretório do backend ao path
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+import generate_data
+from endpoint_benchmark import create_benchmark_app, start_server, summarize, _http_request
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hash-workers', default='0,2', help='Processos do pool de hash a comparar (0 = inline)')
+    parser.add_argument('--logins', type=int, default=100, help='Logins por rodada')
+    parser.add_argument('--concurrency', type=int, default=8, help='Logins simultâneos')
+    parser.add_argument('--probe-interval', type=float, default=0.02, help='Intervalo entre as sondas de /me (s)')
+    parser.add_argument('--database-url', help='Banco do benchmark (é recriado); padrão: SQLite temporário')
+    return parser.parse_args()
+
+def prepare(app):
+    """Massa pequena: o custo medido é o do hash, não o das consultas"""
+    from app import db
+    from app.models import User
+    
+    with app.app_context():
+        db.drop_all()
+        generate_data.populate(generate_data.parse_args(['--calls', '100', '--operators', '50', '--workers', '1']))
+        return [user.username for user in User.query.filter_by(role='operator').order_by(User.id)]
+
+def login_request(username):
+    return 'POST', '/api/auth/login', {}, {'username': username, 'password': generate_data.PASSWORDS['operator']}
+
+def probe(base_url, token, interval, stop):
+    """Chama /api/auth/me em intervalos até a rajada terminar"""
+    request = ('GET', '/api/auth/me', {'Authorization': f'Bearer {token}'}, None)
+    timings = []
+    statuses = []
+    while not stop.is_set():
+        timing, status = _http_request(base_url, request)
+        timings.append(timing)
+        statuses.append(status)
+        time.sleep(interval)
+    return timings, statuses
+
+def run_round(app, base_url, usernames, workers, args):
+    from app.services.passwords import password_hasher, login_throttle
+    
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    
+    # Aquecimento: sobe o pool e calcula o prefixo do método corrente
+    _http_request(base_url, login_request(usernames[0]))
+    token = app.test_client().post(
+        '/api/auth/login', json={'username': 'admin', 'password': generate_data.PASSWORDS['admin']}
+    ).get_json()['access_token']
+    
+    idle_timings, idle_statuses = [], []
+    for _ in range(20):
+        timing, status = _http_request(base_url, ('GET', '/api/auth/me', {'Authorization': f'Bearer {token}'}, None))
+        idle_timings.append(timing)
+        idle_statuses.append(status)
+    
+    stop = threading.Event()
+    prober = ThreadPoolExecutor(max_workers=1)
+    probe_future = prober.submit(probe, base_url, token, args.probe_interval, stop)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda i: _http_request(base_url, login_request(usernames[i % len(usernames)])),
+            range(args.logins)
+        ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    probe_timings, probe_statuses = probe_future.result()
+    prober.shutdown()
+    
+    logins = summarize([t for t, _ in results], [s for _, s in results], elapsed, 0)
+    logins['busy'] = sum(1 for _, status in results if status == 503)
+    return {
+        'logins': logins,
+        'me_idle': summarize(idle_timings, idle_statuses, 1, 0),
+        'me_during_burst': summarize(probe_timings, probe_statuses, elapsed, 0)
+    }
+
+def main():
+    args = parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    database_url = args.database_url or 'sqlite:///' + os.path.join(
+        tempfile.gettempdir(), 'monitoria_login_benchmark.sqlite3'
+    )
+    app = create_benchmark_app(database_url, False)
+    app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = 30.0
+    usernames = prepare(app)
+    server, base_url = start_server(app)
+    
+    print(f'CPUs: {os.cpu_count()}  logins: {args.logins}  concorrência: {args.concurrency}')
+    print(f"{'hash workers':<14}{'logins/s':>10}{'login p95':>11}{'503':>6}{'me p50 idle':>13}{'me p95 idle':>13}"
+          f"{'me p50 burst':>14}{'me p95 burst':>14}")
+    try:
+        for workers in [int(value) for value in args.hash_workers.split(',')]:
+            result = run_round(app, base_url, usernames, workers, args)
+            print(f"{workers:<14}{result['logins']['throughput_rps']:>10}{result['logins']['p95_ms']:>11}"
+                  f"{result['logins']['busy']:>6}{result['me_idle']['p50_ms']:>13}{result['me_idle']['p95_ms']:>13}"
+                  f"{result['me_during_burst']['p50_ms']:>14}{result['me_during_burst']['p95_ms']:>14}")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark da busca textual de chamadas (parâmetro q= de /api/calls)
+
+Popula o banco até o volume pedido e mede a consulta da primeira página
+ranqueada (20 resultados) e o COUNT do total para termos raros, médios e
+comuns. Sai com código 1 se o p95 da página ultrapassar o limite.
+
+Exemplo:
+    python benchmarks/search_benchmark.py --calls 1000000
+"""
+import os
+import sys
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+# Adicionar o diretório do backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SUBJECTS = [
+    'Cobrança indevida', 'Segunda via de boleto', 'Cancelamento de plano',
+    'Portabilidade de número', 'Troca de aparelho', 'Internet lenta', 'Sem sinal',
+    'Dúvida sobre fatura', 'Reembolso', 'Mudança de endereço', 'Upgrade de plano',
+    'Reclamação de atendimento', 'Instalação agendada', 'Visita técnica',
+    'Bloqueio de linha', 'Desbloqueio de chip', 'Contestação de valor',
+    'Atualização cadastral', 'Pagamento não identificado', 'Roaming internacional'
+]
+FIRST_NAMES = [
+    'Ana', 'João', 'Maria', 'José', 'Antônio', 'Francisca', 'Carlos', 'Paulo', 'Lucas',
+    'Juliana', 'Márcia', 'Pedro', 'Fernanda', 'Rafael', 'Patrícia', 'Bruno', 'Camila',
+    'Gustavo', 'Letícia', 'Thiago', 'Aline', 'Rodrigo', 'Beatriz', 'Diego', 'Larissa'
+]
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+    'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes',
+    'Soares', 'Fernandes', 'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade'
+]
+PHRASES = [
+    'cliente informou que', 'após contato anterior', 'solicitou retorno urgente',
+    'problema persiste desde a última fatura', 'foi orientado a reiniciar o modem',
+    'pediu protocolo por email', 'aguardando análise do setor financeiro',
+    'relatou instabilidade no período noturno', 'encaminhado para o suporte técnico'
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=1000000, help='Volume de chamadas no banco')
+    parser.add_argument('--database-url', default='sqlite:////tmp/monitoria_search_benchmark.sqlite3',
+                        help='Banco usado no benchmark (SQLite ou Postgres)')
+    parser.add_argument('--repeat', type=int, default=20, help='Execuções por termo')
+    parser.add_argument('--threshold-ms', type=float, default=100.0, help='Limite de p95 da página')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+def generate_rows(count, start, operator_id, rng):
+    """Gera linhas sintéticas com texto em português"""
+    now = datetime.utcnow()
+    rows = []
+    for i in range(start, start + count):
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        rows.append({
+            'protocol': f'BENCH-{i:09d}',
+            'operator_id': operator_id,
+            'customer_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'customer_phone': None,
+            'customer_email': None,
+            'subject': rng.choice(SUBJECTS),
+            'description': ' '.join(rng.sample(PHRASES, 2)) + f' pedido PED{rng.randint(0, 999999):06d}',
+            'category': rng.choice(['suporte', 'vendas', 'reclamacao', 'duvida', 'cancelamento']),
+            'priority': rng.choice(['low', 'medium', 'high', 'urgent']),
+            'status': rng.choice(['open', 'in_progress', 'resolved', 'closed']),
+            'duration_seconds': rng.randint(30, 1800),
+            'recording_url': None,
+            'notes': None,
+            'created_at': created_at,
+            'updated_at': created_at
+        })
+    return rows
+
+def seed(target, rng):
+    """Completa a tabela calls até o volume pedido"""
+    from app import db
+    from app.models import User, Call
+    from app.services.ingestion import insert_batch
+    
+    operator = User.query.filter_by(username='benchmark.operator').first()
+    if operator is None:
+        operator = User(username='benchmark.operator', email='benchmark.operator@monitoria.com',
+                        full_name='Operador Benchmark', role='operator')
+        operator.set_password('benchmark')
+        db.session.add(operator)
+        db.session.commit()
+    
+    existing = Call.query.count()
+    started = time.perf_counter()
+    while existing < target:
+        batch = min(20000, target - existing)
+        insert_batch(generate_rows(batch, existing, operator.id, rng))
+        existing += batch
+        print(f'  {existing} chamadas...', end='\r')
+    
+    if time.perf_counter() - started > 1:
+        print(f'\nCarga concluída em {time.perf_counter() - started:.1f}s')
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max': timings[-1]
+    }
+
+def main():
+    args = parse_args()
+    
+    # A configuração lê DATABASE_URL na importação
+    os.environ['DATABASE_URL'] = args.database_url
+    from sqlalchemy.orm import joinedload
+    from app import create_app, db
+    from app.models import Call
+    from app.services.search import search_calls
+    
+    app = create_app('production')
+    rng = random.Random(args.seed)
+    
+    with app.app_context():
+        db.create_all()
+        print(f'Populando até {args.calls} chamadas em {args.database_url}...')
+        seed(args.calls, rng)
+        
+        terms = {
+            'raro': [f'PED{rng.randint(0, 999999):06d}' for _ in range(5)],
+            'médio': [f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}' for _ in range(5)],
+            'comum': ['fatura', 'cobranca', 'suporte tecnico']
+        }
+        
+        failed = False
+        print(f'\n{"classe":<8} {"termo":<22} {"página p50":>11} {"p95":>8} {"count p50":>10} {"total":>8}')
+        for kind, samples in terms.items():
+            for term in samples:
+                def page():
+                    query = search_calls(Call.query.options(joinedload(Call.operator)), term)
+                    return [call.to_dict() for call in query.order_by(Call.created_at.desc()).limit(20)]
+                
+                def count():
+                    return search_calls(Call.query, term).order_by(None).count()
+                
+                page_timing = measure(page, args.repeat)
+                count_timing = measure(count, max(1, args.repeat // 4))
+                total = count()
+                print(f'{kind:<8} {term:<22} {page_timing["p50"]:>9.1f}ms {page_timing["p95"]:>6.1f}ms '
+                      f'{count_timing["p50"]:>8.1f}ms {total:>8}')
+                if kind != 'comum' and page_timing['p95'] > args.threshold_ms:
+                    failed = True
+        
+        print('\nTermos comuns casam com grande parte da tabela; use-os com filtros de período.')
+        if failed:
+            print(f'FALHA: p95 acima de {args.threshold_ms}ms para termos seletivos')
+            sys.exit(1)
+        print(f'OK: p95 abaixo de {args.threshold_ms}ms para termos seletivos')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Microbenchmark da serialização das listagens (to_dict + json x projeção + orjson)
+
+Para cada modelo (chamadas, avaliações, usuários) e tamanho de página
+(--rows), mede separadamente a leitura + montagem dos dicionários e a
+codificação JSON dos dois caminhos:
+
+    orm:    consulta do ORM com joinedload + Model.to_dict() + json do Flask
+    rows:   consulta por colunas (ModelProjection) + serializador compilado + orjson
+
+Antes de medir, confere que os dois caminhos geram exatamente os mesmos
+campos e valores; sai com código 1 se algum registro divergir.
+
+Exemplos:
+    python benchmarks/serialization_benchmark.py --calls 20000
+    python benchmarks/serialization_benchmark.py --rows 20,100,1000 --repeat 50
+"""
+import os
+import sys
+import argparse
+import json
+import statistics
+import time
+
+# Adicionar o diretório do backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000, help='Volume de chamadas na massa')
+    parser.add_argument('--database-url', default='sqlite:////tmp/monitoria_serialization_benchmark.sqlite3',
+                        help='Banco usado no benchmark (SQLite ou Postgres)')
+    parser.add_argument('--rows', default='20,100,1000', help='Tamanhos de página medidos')
+    parser.add_argument('--repeat', type=int, default=20, help='Execuções por medição')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+def measure(fn, repeat):
+    """Mediana em ms de repeat execuções"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    args = parse_args()
+    
+    # A configuração lê DATABASE_URL na importação
+    os.environ['DATABASE_URL'] = args.database_url
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy.orm import joinedload
+    import generate_data
+    from app import create_app, db
+    from app.models import User, Call, Evaluation
+    from app.services.serialization import (
+        OrjsonProvider, call_projection, evaluation_projection, user_projection
+    )
+    
+    app = create_app('production')
+    default_json = DefaultJSONProvider(app)
+    fast_json = OrjsonProvider(app) if OrjsonProvider is not None else default_json
+    if OrjsonProvider is None:
+        print('orjson não instalado: o caminho rows usa o json padrão do Flask')
+    
+    # (nome, modelo, relacionamento carregado por JOIN, projeção)
+    scenarios = [
+        ('calls', Call, Call.operator, call_projection),
+        ('evaluations', Evaluation, Evaluation.evaluator, evaluation_projection),
+        ('users', User, None, user_projection)
+    ]
+    sizes = [int(size) for size in args.rows.split(',')]
+    
+    with app.app_context():
+        generate_data.populate(generate_data.parse_args([
+            '--calls', str(args.calls), '--seed', str(args.seed), '--workers', '1'
+        ]))
+        
+        failed = False
+        print(f'\n{"modelo":<12} {"linhas":>7} {"orm dict":>10} {"rows dict":>10} {"json":>9} '
+              f'{"orjson":>9} {"orm total":>10} {"rows total":>10} {"ganho":>7}')
+        for name, model, relationship, projection in scenarios:
+            for size in sizes:
+                def orm_dicts():
+                    query = model.query
+                    if relationship is not None:
+                        query = query.options(joinedload(relationship))
+                    items = query.order_by(model.id.desc()).limit(size).all()
+                    result = [item.to_dict() for item in items]
+                    # Instâncias fora do identity map, como em uma requisição nova
+                    db.session.expunge_all()
+                    return result
+                
+                def row_dicts():
+                    return projection.many(projection.query().order_by(model.id.desc()).limit(size))
+                
+                expected = orm_dicts()
+                actual = row_dicts()
+                if expected != actual or any(list(a) != list(b) for a, b in zip(expected, actual)):
+                    print(f'FALHA: {name} com {size} linhas diverge de to_dict()')
+                    failed = True
+                    continue
+                
+                payload = {name: expected}
+                orm_ms = measure(orm_dicts, args.repeat)
+                rows_ms = measure(row_dicts, args.repeat)
+                json_ms = measure(lambda: default_json.dumps(payload), args.repeat)
+                fast_ms = measure(lambda: fast_json.dumps(payload), args.repeat)
+                
+                if json.loads(default_json.dumps(payload)) != json.loads(fast_json.dumps(payload)):
+                    print(f'FALHA: {name} com {size} linhas codifica valores diferentes')
+                    failed = True
+                
+                orm_total = orm_ms + json_ms
+                rows_total = rows_ms + fast_ms
+                print(f'{name:<12} {len(expected):>7} {orm_ms:>8.2f}ms {rows_ms:>8.2f}ms {json_ms:>7.2f}ms '
+                      f'{fast_ms:>7.2f}ms {orm_total:>8.2f}ms {rows_total:>8.2f}ms {orm_total / rows_total:>6.1f}x')
+        
+        if failed:
+            sys.exit(1)
+        print('\nOK: os dois caminhos geram os mesmos campos e valores')
+
+if __name__ == '__main__':
+    main()
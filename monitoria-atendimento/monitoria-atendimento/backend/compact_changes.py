@@ -0,0 +1,37 @@
+"""Compactação periódica do log de alterações (/api/changes)"""
+import os
+import sys
+import argparse
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app, db
+from app.services.changes import compact_change_log
+
+def main():
+    """Remove entradas substituídas e lápides antigas do log (indicado para o cron)"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tombstone-days', type=int,
+                        help='Dias que as exclusões ficam no log (padrão: CHANGE_LOG_TOMBSTONE_DAYS)')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        # Cria as tabelas do log em bases anteriores ao feed
+        db.create_all()
+        
+        tombstone_days = args.tombstone_days or app.config['CHANGE_LOG_TOMBSTONE_DAYS']
+        print(f"Compactando o log de alterações (lápides com mais de {tombstone_days} dias)...")
+        compaction = compact_change_log(tombstone_days)
+        print(f"{compaction.superseded_removed} entradas substituídas e "
+              f"{compaction.tombstones_removed} lápides removidas.")
+        if compaction.horizon:
+            print(f"Cursores anteriores à entrada {compaction.horizon} precisarão de carga completa.")
+        print("Compactação concluída!")
+
+if __name__ == '__main__':
+    main()
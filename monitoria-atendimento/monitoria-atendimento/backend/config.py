@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -11,6 +12,8 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     JWT_IDENTITY_CLAIM = 'sub'
+    # Só o stream ao vivo aceita token na query string (ticket de curta duração)
+    JWT_QUERY_STRING_NAME = 'ticket'
     
     # Configuração do banco de dados
     SQLALCHEMY_DATABASE_URI = os.getenv(
@@ -19,23 +22,178 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Pool de conexões de cada engine (primário e réplicas) e timeout por comando em ms
+    # (Postgres; 0 desativa). No primário o padrão é sem limite, pois os scripts de
+    # manutenção (rollups, particionamento, arquivamento) rodam comandos longos
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+    DB_REPLICA_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_REPLICA_STATEMENT_TIMEOUT_MS', '30000'))
+    
+    # Réplicas de leitura ("url1,url2"): GETs do dashboard, das listagens e das
+    # exportações leem delas, com volta ao primário se estiverem fora. Quem gravou
+    # lê do primário por REPLICA_STICKY_SECONDS. Para testar localmente, aponte
+    # DATABASE_URL e DATABASE_REPLICA_URLS para dois arquivos SQLite (a réplica
+    # sendo uma cópia do primário) ou para duas instâncias do Postgres
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+    REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+    REPLICA_STATE_PATH = os.getenv(
+        'REPLICA_STATE_PATH',
+        os.path.join(tempfile.gettempdir(), 'monitoria_replica_state.sqlite3')
+    )
+    
     # CORS
     CORS_HEADERS = 'Content-Type'
+    
+    # Cache do dashboard (arquivo SQLite compartilhado entre os workers)
+    DASHBOARD_CACHE_ENABLED = os.getenv('DASHBOARD_CACHE_ENABLED', 'true').lower() == 'true'
+    DASHBOARD_CACHE_PATH = os.getenv(
+        'DASHBOARD_CACHE_PATH',
+        os.path.join(tempfile.gettempdir(), 'monitoria_dashboard_cache.sqlite3')
+    )
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))
+    DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv('DASHBOARD_CACHE_MAX_ENTRIES', '1000'))
+    # Acertos não gravam no arquivo: contadores por worker gravados a cada N segundos
+    # e last_access (LRU) atualizado no máximo uma vez por intervalo
+    DASHBOARD_CACHE_FLUSH_INTERVAL = float(os.getenv('DASHBOARD_CACHE_FLUSH_INTERVAL', '5'))
+    
+    # Versão do estado de autorização (compartilhada entre os workers) e
+    # cache de papel/situação dos usuários em cada worker
+    AUTH_STATE_PATH = os.getenv(
+        'AUTH_STATE_PATH',
+        os.path.join(tempfile.gettempdir(), 'monitoria_auth_state.sqlite3')
+    )
+    AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+    
+    # Versão das rubricas de avaliação (compartilhada entre os workers)
+    RUBRIC_STATE_PATH = os.getenv(
+        'RUBRIC_STATE_PATH',
+        os.path.join(tempfile.gettempdir(), 'monitoria_rubric_state.sqlite3')
+    )
+    
+    # Hash de senhas em pool de processos: workers por processo do gunicorn
+    # (0 = no próprio worker), cálculos simultâneos e espera máxima por vaga
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', '0')) or None
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '2.0'))
+    
+    # Limite de falhas de login (janela em segundos)
+    LOGIN_THROTTLE_WINDOW = int(os.getenv('LOGIN_THROTTLE_WINDOW', '900'))
+    LOGIN_MAX_FAILURES_PER_USER = int(os.getenv('LOGIN_MAX_FAILURES_PER_USER', '5'))
+    LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '20'))
+    
+    # Amostragem de chamadas para avaliação: reservatório por período x operador x
+    # categoria x prioridade, com cota padrão e cotas por prioridade ("urgent=4,high=3")
+    EVALUATION_SAMPLING_ENABLED = os.getenv('EVALUATION_SAMPLING_ENABLED', 'true').lower() == 'true'
+    EVALUATION_SAMPLING_PERIOD = os.getenv('EVALUATION_SAMPLING_PERIOD', 'week')  # day, week, month
+    EVALUATION_SAMPLE_QUOTA = int(os.getenv('EVALUATION_SAMPLE_QUOTA', '2'))
+    EVALUATION_SAMPLE_QUOTA_BY_PRIORITY = {
+        priority: int(quota)
+        for priority, quota in (
+            item.split('=') for item in os.getenv('EVALUATION_SAMPLE_QUOTA_BY_PRIORITY', 'urgent=4,high=3').split(',')
+            if item
+        )
+    }
+    
+    # Reserva de uma chamada da fila para um avaliador (segundos)
+    EVALUATION_QUEUE_LEASE_SECONDS = int(os.getenv('EVALUATION_QUEUE_LEASE_SECONDS', '1800'))
+    
+    # Tamanho do lote na ingestão em massa de chamadas
+    BULK_INGEST_BATCH_SIZE = int(os.getenv('BULK_INGEST_BATCH_SIZE', '5000'))
+    
+    # Métricas de desempenho em /api/metrics (formato Prometheus), agregadas
+    # entre os workers em um arquivo SQLite; cada worker grava seus totais a
+    # cada METRICS_FLUSH_INTERVAL segundos. Com METRICS_TOKEN definido, o
+    # coletor precisa enviar "Authorization: Bearer <token>"; com
+    # METRICS_REQUIRE_TOKEN (padrão em produção), sem token o endpoint responde 403.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_STATE_PATH = os.getenv(
+        'METRICS_STATE_PATH',
+        os.path.join(tempfile.gettempdir(), 'monitoria_metrics.sqlite3')
+    )
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    METRICS_REQUIRE_TOKEN = os.getenv('METRICS_REQUIRE_TOKEN', 'false').lower() == 'true'
+    
+    # Cabeçalho Server-Timing (app, db, pool, serialize) para depuração no navegador
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'false').lower() == 'true'
+    
+    # Consultas acima do limite vão para o log 'app.slow_queries' (vazio ou 0 desativa);
+    # com SLOW_QUERY_EXPLAIN, SELECTs lentos no Postgres são repetidos com EXPLAIN ANALYZE
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500') or 0)
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+    
+    # Profiler sob demanda: admins enviam "X-Profile: 1" (grava em PROFILE_DIR,
+    # consultável em /api/admin/profiles) ou "X-Profile: inline" (devolve as estatísticas)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'monitoria_profiles'))
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+    
+    # Particionamento mensal de calls e evaluations (Postgres): tabelas novas já nascem
+    # particionadas; bases existentes migram com partition_tables.py. O archive_calls.py
+    # (cron) cria as partições dos próximos meses e move para archived_calls as chamadas
+    # encerradas há mais de ARCHIVE_AFTER_DAYS dias
+    PARTITIONING_ENABLED = os.getenv('PARTITIONING_ENABLED', 'true').lower() == 'true'
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '365'))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+    
+    # Feed de alterações (/api/changes): o compact_changes.py (cron) remove as entradas
+    # substituídas e as exclusões com mais de CHANGE_LOG_TOMBSTONE_DAYS dias
+    CHANGE_LOG_TOMBSTONE_DAYS = int(os.getenv('CHANGE_LOG_TOMBSTONE_DAYS', '30'))
+    
+    # Stream ao vivo do dashboard (/api/dashboard/stream, SSE): uma thread por worker lê
+    # o log de alterações (acordada pelo NOTIFY no Postgres ou a cada LIVE_POLL_SECONDS).
+    # As conexões abrem com um ticket válido por LIVE_TICKET_SECONDS e duram até
+    # LIVE_MAX_STREAM_SECONDS ou a expiração do token de sessão que emitiu o ticket
+    LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '2'))
+    LIVE_HEARTBEAT_SECONDS = int(os.getenv('LIVE_HEARTBEAT_SECONDS', '15'))
+    LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '100'))
+    LIVE_MAX_SUBSCRIBERS = int(os.getenv('LIVE_MAX_SUBSCRIBERS', '5000'))
+    LIVE_MAX_STREAM_SECONDS = int(os.getenv('LIVE_MAX_STREAM_SECONDS', '3600'))
+    LIVE_TICKET_SECONDS = int(os.getenv('LIVE_TICKET_SECONDS', '60'))
+    
+    # Serialização das respostas: 'orjson' (quando instalado) ou 'default' (json do Flask)
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    
+    # Limite de consultas SQL por requisição (desativado fora dos testes)
+    QUERY_BUDGET = None
 
 class DevelopmentConfig(Config):
     """Configuração de desenvolvimento"""
     DEBUG = True
     TESTING = False
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'true').lower() == 'true'
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
 
 class ProductionConfig(Config):
     """Configuração de produção"""
     DEBUG = False
     TESTING = False
+    METRICS_REQUIRE_TOKEN = os.getenv('METRICS_REQUIRE_TOKEN', 'true').lower() == 'true'
 
 class TestingConfig(Config):
     """Configuração de testes"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    DASHBOARD_CACHE_PATH = ':memory:'
+    AUTH_STATE_PATH = ':memory:'
+    RUBRIC_STATE_PATH = ':memory:'
+    METRICS_STATE_PATH = ':memory:'
+    REPLICA_STATE_PATH = ':memory:'
+    PASSWORD_HASH_WORKERS = 0
+    LIVE_POLL_SECONDS = 0.1
+    
+    # Hash barato nos testes (a segurança do KDF não importa aqui)
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    
+    # Falha se o número de leituras (SELECTs) de um endpoint crescer com a página (N+1)
+    QUERY_BUDGET = 6
 
 config = {
     'development': DevelopmentConfig,
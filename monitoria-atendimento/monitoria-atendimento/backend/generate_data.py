@@ -0,0 +1,418 @@
+"""Script para gerar massas de dados sintéticos (carga e benchmarks)
+
+Gera usuários, chamadas e avaliações com distribuição realista de categorias,
+prioridades, status, durações e horários. As linhas são geradas em paralelo
+(multiprocessing) e gravadas em lote: COPY no Postgres (cada processo grava
+seus blocos) e executemany no SQLite. O resultado é determinístico para a
+mesma combinação de --seed, --end-date e volumes.
+
+Exemplo:
+    python generate_data.py --calls 2000000 --operators 200 --reset
+"""
+import os
+import sys
+import argparse
+import csv
+import io
+import math
+import multiprocessing
+import random
+import time
+from datetime import date, datetime, timedelta
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.pool import NullPool
+from werkzeug.security import generate_password_hash
+
+CALL_COLUMNS = [
+    'id', 'protocol', 'operator_id', 'customer_name', 'customer_phone', 'customer_email',
+    'subject', 'description', 'category', 'priority', 'status', 'duration_seconds',
+    'recording_url', 'notes', 'created_at', 'updated_at', 'closed_at',
+    'evaluation_count', 'avg_overall_score', 'last_evaluated_at', 'requires_coaching'
+]
+EVALUATION_COLUMNS = [
+    'id', 'call_id', 'evaluator_id', 'greeting_score', 'communication_score',
+    'problem_solving_score', 'empathy_score', 'procedure_score', 'closing_score',
+    'overall_score', 'positive_points', 'improvement_points', 'general_comments',
+    'requires_coaching', 'is_exemplary', 'created_at', 'updated_at'
+]
+
+# Distribuições (valor, peso) observadas na operação
+CATEGORIES = [('suporte', 40), ('duvida', 25), ('reclamacao', 15), ('vendas', 12), ('cancelamento', 8)]
+PRIORITIES = [('medium', 45), ('low', 30), ('high', 18), ('urgent', 7)]
+STATUSES = [('closed', 50), ('resolved', 25), ('open', 13), ('in_progress', 12)]
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 10, 30, 45, 50, 48, 35, 40, 48, 46, 42, 35, 25, 15, 8, 5, 3, 2]
+
+SUBJECTS = {
+    'suporte': ['Internet lenta', 'Sem sinal', 'Troca de aparelho', 'Visita técnica', 'Desbloqueio de chip'],
+    'duvida': ['Dúvida sobre fatura', 'Segunda via de boleto', 'Roaming internacional', 'Atualização cadastral'],
+    'reclamacao': ['Cobrança indevida', 'Reclamação de atendimento', 'Contestação de valor', 'Pagamento não identificado'],
+    'vendas': ['Upgrade de plano', 'Contratação de pacote adicional', 'Portabilidade de número'],
+    'cancelamento': ['Cancelamento de plano', 'Bloqueio de linha', 'Mudança de endereço']
+}
+FIRST_NAMES = [
+    'Ana', 'João', 'Maria', 'José', 'Antônio', 'Francisca', 'Carlos', 'Paulo', 'Lucas',
+    'Juliana', 'Márcia', 'Pedro', 'Fernanda', 'Rafael', 'Patrícia', 'Bruno', 'Camila',
+    'Gustavo', 'Letícia', 'Thiago', 'Aline', 'Rodrigo', 'Beatriz', 'Diego', 'Larissa'
+]
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+    'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes',
+    'Soares', 'Fernandes', 'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade'
+]
+DESCRIPTIONS = [
+    'Cliente informou que o problema começou após a última fatura.',
+    'Após contato anterior, o cliente solicitou retorno urgente.',
+    'Relatou instabilidade no período noturno.',
+    'Foi orientado a reiniciar o equipamento e aguardar.',
+    'Pediu protocolo por email para acompanhamento.',
+    'Aguardando análise do setor financeiro.'
+]
+NOTES = [None, None, 'Encaminhado para o suporte técnico', 'Cliente satisfeito com a solução',
+         'Retornar em 48 horas', 'Cliente exaltado no início da ligação']
+DDDS = ['11', '21', '31', '41', '51', '61', '71', '81', '85', '92']
+
+POSITIVE_POINTS = ['Atendimento cordial e profissional', 'Boa escuta ativa', 'Resolveu no primeiro contato']
+IMPROVEMENT_POINTS = ['Pode melhorar na agilidade', 'Confirmar os dados do cliente', 'Evitar termos técnicos']
+GENERAL_COMMENTS = ['Bom atendimento no geral', 'Atendimento dentro do padrão', 'Revisar o script de encerramento']
+
+# Senhas padrão (iguais às do init_db.py); o hash é calculado uma vez por senha
+PASSWORDS = {'admin': 'admin123', 'supervisor': 'supervisor123', 'operator': 'operator123'}
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+def _split(weighted):
+    values, weights = zip(*weighted)
+    return list(values), list(weights)
+
+def build_users(operators, supervisors, rng):
+    """Usuários do conjunto de dados; o hash de cada senha é reutilizado"""
+    hashes = {role: generate_password_hash(password) for role, password in PASSWORDS.items()}
+    users = [('admin', 'Administrador do Sistema', 'admin')]
+    
+    for i in range(1, supervisors + 1):
+        users.append((f'supervisor.{i:03d}', f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', 'supervisor'))
+    for i in range(1, operators + 1):
+        users.append((f'operador.{i:05d}', f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', 'operator'))
+    
+    return [{
+        'username': username,
+        'email': f'{username}@monitoria.com',
+        'password_hash': hashes[role],
+        'full_name': full_name,
+        'role': role,
+        'is_active': True
+    } for username, full_name, role in users]
+
+def build_plan(args, operator_ids, supervisor_ids, end):
+    """Parâmetros compartilhados pelos processos geradores"""
+    rng = random.Random(f'{args.seed}-plan')
+    
+    # Poucos operadores concentram boa parte do volume (cauda tipo Zipf)
+    operator_weights = [1 / (rank ** 0.6) for rank in range(1, len(operator_ids) + 1)]
+    rng.shuffle(operator_weights)
+    
+    return {
+        'seed': args.seed,
+        'end': end,
+        'days': args.days,
+        'evaluation_rate': args.evaluation_rate,
+        'operator_ids': operator_ids,
+        'operator_weights': operator_weights,
+        # Qualidade média de cada operador, usada nas notas das avaliações
+        'operator_quality': {
+            operator_id: min(4.7, max(2.5, rng.gauss(3.8, 0.4))) for operator_id in operator_ids
+        },
+        'supervisor_ids': supervisor_ids,
+        'database_url': args.database_url,
+        'load_in_worker': False
+    }
+
+def _random_created_at(rng, plan):
+    """Dias recentes e horário comercial em dias úteis são mais frequentes"""
+    while True:
+        day = plan['end'] - timedelta(days=int(plan['days'] * rng.random() ** 1.3) + 1)
+        if day.weekday() < 5 or rng.random() < 0.4:
+            break
+    hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+def generate_chunk(plan, chunk_index, first_call_id, count, first_evaluation_id):
+    """Gera as linhas de um bloco de chamadas (e de suas avaliações)"""
+    rng = random.Random(f'{plan["seed"]}-chunk-{chunk_index}')
+    categories, category_weights = _split(CATEGORIES)
+    priorities, priority_weights = _split(PRIORITIES)
+    statuses, status_weights = _split(STATUSES)
+    operator_ids = plan['operator_ids']
+    
+    operators = rng.choices(operator_ids, weights=plan['operator_weights'], k=count)
+    calls = []
+    evaluations = []
+    
+    for offset in range(count):
+        call_id = first_call_id + offset
+        operator_id = operators[offset]
+        created_at = _random_created_at(rng, plan)
+        category = rng.choices(categories, weights=category_weights)[0]
+        status = rng.choices(statuses, weights=status_weights)[0]
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        
+        # Duração log-normal: mediana em torno de 4-5 minutos, cauda longa
+        duration = min(7200, max(15, int(rng.lognormvariate(5.6, 0.6))))
+        closed_at = None
+        if status == 'closed':
+            closed_at = created_at + timedelta(seconds=duration, hours=int(rng.expovariate(1 / 12)))
+        
+        call = (
+            call_id,
+            f'CALL-{created_at:%Y%m%d}-{call_id:09d}',
+            operator_id,
+            f'{first_name} {last_name} {rng.choice(LAST_NAMES)}',
+            f'({rng.choice(DDDS)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}',
+            f'{first_name.lower()}.{last_name.lower()}{call_id}@email.com',
+            rng.choice(SUBJECTS[category]),
+            rng.choice(DESCRIPTIONS),
+            category,
+            rng.choices(priorities, weights=priority_weights)[0],
+            status,
+            duration,
+            f'https://gravacoes.monitoria.com/{call_id}.mp3' if rng.random() < 0.7 else None,
+            rng.choice(NOTES),
+            created_at.strftime(DATETIME_FORMAT),
+            (closed_at or created_at).strftime(DATETIME_FORMAT),
+            closed_at.strftime(DATETIME_FORMAT) if closed_at else None
+        )
+        
+        if rng.random() >= plan['evaluation_rate']:
+            calls.append(call + (0, None, None, 0))
+            continue
+        
+        quality = plan['operator_quality'][operator_id]
+        scores = [min(5, max(1, round(rng.gauss(quality, 0.8)))) for _ in range(6)]
+        overall_score = sum(scores) / len(scores)
+        evaluated_at = min(created_at + timedelta(hours=rng.randint(1, 72)), plan['end'])
+        
+        evaluations.append((
+            first_evaluation_id + len(evaluations),
+            call_id,
+            rng.choice(plan['supervisor_ids']),
+            *scores,
+            overall_score,
+            rng.choice(POSITIVE_POINTS),
+            rng.choice(IMPROVEMENT_POINTS),
+            rng.choice(GENERAL_COMMENTS),
+            1 if overall_score < 3 or (overall_score < 3.5 and rng.random() < 0.3) else 0,
+            1 if overall_score >= 4.5 and rng.random() < 0.5 else 0,
+            evaluated_at.strftime(DATETIME_FORMAT),
+            evaluated_at.strftime(DATETIME_FORMAT)
+        ))
+        
+        # No máximo uma avaliação por chamada: o resumo sai direto da linha gerada
+        requires_coaching = evaluations[-1][EVALUATION_COLUMNS.index('requires_coaching')]
+        calls.append(call + (1, overall_score, evaluated_at.strftime(DATETIME_FORMAT), requires_coaching))
+    
+    return calls, evaluations
+
+def _copy(connection, table, columns, rows):
+    """COPY ... FROM STDIN (Postgres + psycopg2)"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+    finally:
+        cursor.close()
+
+def load_rows(connection, table, columns, rows):
+    """Grava as linhas com COPY (Postgres) ou executemany (demais bancos)"""
+    if not rows:
+        return
+    
+    dialect = connection.dialect
+    if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+        _copy(connection, table, columns, rows)
+        return
+    
+    placeholder = '?' if dialect.paramstyle == 'qmark' else '%s'
+    connection.exec_driver_sql(
+        f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join([placeholder] * len(columns))})',
+        rows
+    )
+
+_worker_plan = None
+_worker_engine = None
+
+def _init_worker(plan):
+    global _worker_plan, _worker_engine
+    _worker_plan = plan
+    if plan['load_in_worker']:
+        _worker_engine = create_engine(plan['database_url'], poolclass=NullPool)
+
+def _run_chunk(spec):
+    """Gera um bloco; no Postgres o próprio processo grava com COPY"""
+    calls, evaluations = generate_chunk(_worker_plan, *spec)
+    if _worker_engine is None:
+        return calls, evaluations
+    
+    with _worker_engine.begin() as connection:
+        load_rows(connection, 'calls', CALL_COLUMNS, calls)
+        load_rows(connection, 'evaluations', EVALUATION_COLUMNS, evaluations)
+    return len(calls), len(evaluations)
+
+def chunk_specs(calls, chunk_size, first_call_id, first_evaluation_id):
+    """Blocos com faixas de IDs fixas: o resultado não depende da ordem de gravação"""
+    for chunk_index in range(math.ceil(calls / chunk_size)):
+        start = chunk_index * chunk_size
+        yield (
+            chunk_index,
+            first_call_id + start,
+            min(chunk_size, calls - start),
+            first_evaluation_id + start
+        )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operators', type=int, default=50, help='Quantidade de operadores')
+    parser.add_argument('--supervisors', type=int, default=5, help='Quantidade de supervisores')
+    parser.add_argument('--calls', type=int, default=100000, help='Quantidade de chamadas')
+    parser.add_argument('--evaluation-rate', type=float, default=0.3,
+                        help='Fração das chamadas que recebem avaliação (0 a 1)')
+    parser.add_argument('--days', type=int, default=365, help='Janela de datas das chamadas')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='Último dia da janela (YYYY-MM-DD); fixe para reproduzir uma massa')
+    parser.add_argument('--seed', type=int, default=42, help='Semente do gerador')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos geradores')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Chamadas por bloco')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'),
+                        help='Banco de destino (padrão: DATABASE_URL da configuração)')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production)')
+    parser.add_argument('--reset', action='store_true', help='Apagar e recriar as tabelas antes de gerar')
+    return parser.parse_args(argv)
+
+def populate(args):
+    """Gera a massa no banco da aplicação corrente; retorna (chamadas, avaliações) ou None se já houver dados"""
+    from app import db
+    from app.models import User, Call
+    from app.services.rollups import rebuild_rollups
+    from app.services.search import rebuild_search_index
+    from app.services.sampling import rebuild_evaluation_queue
+    from app.services.protocols import backfill_protocols
+    
+    db.create_all()
+    
+    if User.query.first() or Call.query.first():
+        print("Banco de dados já contém dados. Use --reset para recriar. Abortando...")
+        return None
+    
+    if not args.database_url:
+        args.database_url = db.engine.url.render_as_string(hide_password=False)
+    
+    started = time.perf_counter()
+    rng = random.Random(f'{args.seed}-users')
+    users = build_users(args.operators, args.supervisors, rng)
+    db.session.execute(insert(User.__table__), users)
+    db.session.commit()
+    
+    ids = dict(db.session.query(User.username, User.id))
+    operator_ids = [ids[user['username']] for user in users if user['role'] == 'operator']
+    supervisor_ids = [ids[user['username']] for user in users if user['role'] == 'supervisor']
+    print(f"Criados {len(users)} usuários")
+    
+    end = datetime.combine(args.end_date, datetime.min.time())
+    plan = build_plan(args, operator_ids, supervisor_ids, end)
+    dialect = db.engine.dialect
+    plan['load_in_worker'] = dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+    specs = list(chunk_specs(args.calls, args.chunk_size, 1, 1))
+    
+    # SQLite: indexar tudo de uma vez no final é mais barato que o trigger por linha
+    if dialect.name == 'sqlite':
+        db.session.execute(text('DROP TRIGGER IF EXISTS calls_fts_insert'))
+        db.session.commit()
+    
+    # Conexões herdadas não podem ser compartilhadas com os processos filhos
+    db.session.remove()
+    db.engine.dispose()
+    
+    print(f"Gerando {args.calls} chamadas em {len(specs)} blocos com {args.workers} processos...")
+    total_calls = total_evaluations = 0
+    
+    if args.workers > 1:
+        pool = multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(plan,))
+        results = pool.imap_unordered(_run_chunk, specs)
+    else:
+        pool = None
+        _init_worker(plan)
+        results = map(_run_chunk, specs)
+    
+    try:
+        for result in results:
+            calls, evaluations = result
+            if not plan['load_in_worker']:
+                # SQLite aceita um único escritor: grava no processo principal
+                connection = db.session.connection()
+                load_rows(connection, 'calls', CALL_COLUMNS, calls)
+                load_rows(connection, 'evaluations', EVALUATION_COLUMNS, evaluations)
+                db.session.commit()
+                calls, evaluations = len(calls), len(evaluations)
+            
+            total_calls += calls
+            total_evaluations += evaluations
+            elapsed = time.perf_counter() - started
+            print(f"  {total_calls} chamadas, {total_evaluations} avaliações "
+                  f"({total_calls / elapsed:.0f} chamadas/s)", end='\r')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print()
+    
+    # IDs explícitos não avançam as sequences do Postgres
+    if dialect.name == 'postgresql':
+        for table in ('calls', 'evaluations'):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+            ))
+        db.session.commit()
+    
+    # COPY/executemany não passam pelo ORM: reserva os protocolos gerados
+    backfill_protocols(db.session.connection())
+    db.session.commit()
+    
+    print("Reconstruindo rollups, índice de busca e fila de avaliação...")
+    rebuild_rollups()
+    rebuild_search_index()
+    rebuild_evaluation_queue(end)
+    
+    print(f"Criadas {total_calls} chamadas e {total_evaluations} avaliações "
+          f"em {time.perf_counter() - started:.1f}s")
+    
+    return total_calls, total_evaluations
+
+def main():
+    args = parse_args()
+    
+    # A configuração lê DATABASE_URL na importação
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app, db
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        if args.reset:
+            print("Recriando tabelas...")
+            db.drop_all()
+        
+        if populate(args):
+            print(f"Senhas: {', '.join(f'{role}: {password}' for role, password in PASSWORDS.items())}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Configuração do Gunicorn (gunicorn -c gunicorn.conf.py app:app)"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+
+# gthread: as requisições da API rodam em threads, junto com o pool de processos
+# do hash de senhas e o profiler. O stream ao vivo do dashboard
+# (/api/dashboard/stream) é servido por outra instância (serviço "stream" do
+# docker-compose) com GUNICORN_WORKER_CLASS=gevent: cada conexão, quase sempre
+# ociosa, é um greenlet e não prende uma thread
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '2000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+accesslog = '-'
+# Caminho sem a query string (%(U)s em vez de %(r)s): o ticket do stream não vai para o log
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = '-'
+
+def post_fork(server, worker):
+    """Com gevent, o psycopg2 passa a ceder o loop enquanto espera o banco"""
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+def worker_exit(server, worker):
+    """Grava as métricas e os contadores do cache ainda não enviados pelo worker que está saindo"""
+    from app.services.cache import dashboard_cache
+    from app.services.metrics import metrics_registry
+    if metrics_registry.path is not None:
+        metrics_registry.flush()
+    if dashboard_cache.enabled:
+        dashboard_cache.flush()
+
+def child_exit(server, worker):
+    """No master: consolida as métricas do worker encerrado (uma linha por série, não por pid)"""
+    from config import config
+    from app.services.metrics import retire_worker_metrics
+    settings = config[os.getenv('FLASK_ENV', 'development')]
+    if settings.METRICS_ENABLED and settings.METRICS_STATE_PATH != ':memory:':
+        retire_worker_metrics(settings.METRICS_STATE_PATH, worker.pid)
@@ -0,0 +1,49 @@
+"""Migração: particiona calls e evaluations por mês (RANGE em created_at) no Postgres"""
+import os
+import sys
+import argparse
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app, db
+from app.services.partitioning import partition_tables, list_partitions
+from app.services.protocols import backfill_protocols
+
+def main():
+    """Converte as tabelas existentes (com os dados) em tabelas particionadas"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--months-ahead', type=int,
+                        help='Partições futuras criadas além do mês corrente (padrão: PARTITION_MONTHS_AHEAD)')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        connection = db.session.connection()
+        if connection.dialect.name != 'postgresql':
+            print("O particionamento só se aplica ao Postgres. Nada a fazer.")
+            return
+        
+        months_ahead = args.months_ahead
+        if months_ahead is None:
+            months_ahead = app.config['PARTITION_MONTHS_AHEAD']
+        
+        # Tudo em uma transação: em caso de erro, as tabelas ficam como estavam
+        print("Particionando calls e evaluations (as tabelas ficam bloqueadas durante a cópia)...")
+        converted = partition_tables(connection, months_ahead)
+        # O índice único de calls.protocol passa a incluir created_at: a unicidade
+        # fica em call_protocols, preenchida com os protocolos já existentes
+        backfill_protocols(connection)
+        db.session.commit()
+        
+        if not converted:
+            print("As tabelas já estão particionadas.")
+        for table in converted:
+            print(f"  {table}: {len(list_partitions(db.session.connection(), table))} partições mensais")
+        print("Particionamento concluído!")
+
+if __name__ == '__main__':
+    main()
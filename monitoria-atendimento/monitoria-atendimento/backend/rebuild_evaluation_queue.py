@@ -0,0 +1,30 @@
+"""Script para reconstruir a fila de avaliação (amostragem estratificada das chamadas)"""
+import os
+import sys
+import argparse
+from datetime import date
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.services.sampling import rebuild_evaluation_queue
+
+def main():
+    """Refaz os reservatórios dos estratos reprocessando as chamadas"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--since', type=date.fromisoformat,
+                        help='Reconstruir a partir do período desta data (YYYY-MM-DD); padrão: período corrente')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        print("Reconstruindo a fila de avaliação...")
+        rebuild_evaluation_queue(args.since)
+        print("Fila de avaliação reconstruída com sucesso!")
+
+if __name__ == '__main__':
+    main()
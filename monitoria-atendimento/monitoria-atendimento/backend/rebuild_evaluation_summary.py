@@ -0,0 +1,27 @@
+"""Script para reconstruir o resumo das avaliações gravado nas chamadas"""
+import os
+import sys
+import argparse
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.services.evaluation_summary import rebuild_evaluation_summaries
+
+def main():
+    """Recalcula evaluation_count, avg_overall_score, last_evaluated_at e requires_coaching das chamadas"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        print("Reconstruindo o resumo das avaliações das chamadas...")
+        rebuild_evaluation_summaries()
+        print("Resumo das avaliações reconstruído com sucesso!")
+
+if __name__ == '__main__':
+    main()
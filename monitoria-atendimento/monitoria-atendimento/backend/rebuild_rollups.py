@@ -0,0 +1,34 @@
+"""Script para reconstruir os rollups diários de chamadas e avaliações"""
+import os
+import sys
+import argparse
+from datetime import date
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.services.rollups import rebuild_rollups
+
+def main():
+    """Recalcula os rollups a partir das tabelas calls e evaluations"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--since', type=date.fromisoformat,
+                        help='Reconstruir apenas a partir desta data (YYYY-MM-DD)')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        if args.since:
+            print(f"Reconstruindo rollups a partir de {args.since.isoformat()}...")
+        else:
+            print("Reconstruindo rollups de todo o histórico...")
+        
+        rebuild_rollups(args.since)
+        print("Rollups reconstruídos com sucesso!")
+
+if __name__ == '__main__':
+    main()
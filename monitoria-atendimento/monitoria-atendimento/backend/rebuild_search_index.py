@@ -0,0 +1,27 @@
+"""Script para criar e reconstruir o índice de busca textual das chamadas"""
+import os
+import sys
+import argparse
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.services.search import rebuild_search_index
+
+def main():
+    """Cria a estrutura de busca (tsvector/FTS5) e reindexa as chamadas existentes"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    
+    with app.app_context():
+        print("Reconstruindo índice de busca textual...")
+        rebuild_search_index()
+        print("Índice de busca reconstruído com sucesso!")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Script para recalcular a pontuação geral das avaliações com as rubricas vigentes"""
+import os
+import sys
+import time
+import argparse
+
+# Adicionar o diretório atual ao path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.services.scoring import RECOMPUTE_BATCH_SIZE, recompute_scores
+
+def main():
+    """Recalcula overall_score e rubric_id das avaliações, atualiza os rollups e reconstrói o resumo"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-size', type=int, default=RECOMPUTE_BATCH_SIZE,
+                        help='Faixa de ids de avaliação por UPDATE/commit')
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help='Configuração da aplicação (development, production, testing)')
+    args = parser.parse_args()
+    
+    app = create_app(args.env)
+    start = time.perf_counter()
+    
+    def progress(done, total, updated):
+        elapsed = time.perf_counter() - start
+        print(f"  {done}/{total} ids percorridos, {updated} avaliações atualizadas "
+              f"({done / max(elapsed, 1e-9):.0f} ids/s)", end='\r')
+    
+    with app.app_context():
+        print("Recalculando pontuações com as rubricas vigentes...")
+        updated = recompute_scores(args.batch_size, progress)
+        print()
+        if updated:
+            print(f"{updated} avaliações recalculadas; rollups atualizados e resumo das chamadas reconstruído.")
+        else:
+            print("Nenhuma pontuação mudou.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Fixtures dos testes: aplicação de teste (SQLite em memória) com usuários e dados"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Adicionar o diretório do backend ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from werkzeug.security import generate_password_hash
+from app import create_app, db
+from app.models import User, Call, Evaluation
+
+PASSWORD = 'senha123'
+
+@pytest.fixture
+def app():
+    """Aplicação de teste com o banco criado e um contexto ativo"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def users(app):
+    """admin, supervisor e dois operadores, por nome de usuário"""
+    password_hash = generate_password_hash(PASSWORD, app.config['PASSWORD_HASH_METHOD'])
+    created = {}
+    for username, role in [('admin', 'admin'), ('supervisor', 'supervisor'),
+                           ('operador1', 'operator'), ('operador2', 'operator')]:
+        user = User(username=username, email=f'{username}@teste.com', full_name=username.title(),
+                    role=role, password_hash=password_hash)
+        db.session.add(user)
+        created[username] = user
+    db.session.commit()
+    return created
+
+def login(client, username):
+    """Cabeçalhos de autorização do usuário"""
+    response = client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+def make_call(operator, **fields):
+    """Cria uma chamada do operador (campos padrão sobrescritos por fields)"""
+    make_call.sequence += 1
+    values = {
+        'protocol': f'TESTE-{make_call.sequence:06d}',
+        'operator_id': operator.id,
+        'customer_name': 'Cliente',
+        'subject': 'Assunto',
+        'category': 'suporte',
+        'priority': 'medium',
+        'status': 'open',
+        'duration_seconds': 300,
+        'created_at': datetime.utcnow() - timedelta(hours=1)
+    }
+    values.update(fields)
+    call = Call(**values)
+    db.session.add(call)
+    db.session.commit()
+    return call
+
+make_call.sequence = 0
+
+def make_evaluation(call, evaluator, **fields):
+    """Cria uma avaliação da chamada com nota geral calculada"""
+    values = {'greeting_score': 4, 'empathy_score': 5, 'created_at': call.created_at + timedelta(minutes=30)}
+    values.update(fields)
+    evaluation = Evaluation(call_id=call.id, evaluator_id=evaluator.id, **values)
+    evaluation.calculate_overall_score()
+    db.session.add(evaluation)
+    db.session.commit()
+    return evaluation
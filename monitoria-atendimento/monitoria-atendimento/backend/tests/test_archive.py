@@ -0,0 +1,78 @@
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ArchivedCall, Call, ChangeLogEntry
+from app.services.archive import archive_calls
+from app.services.ingestion import INSERT_COLUMNS, insert_batch
+from app.services.partitioning import (
+    PARTITION_NAME_PATTERN, add_months, ensure_partitions, month_start, partition_name
+)
+from conftest import login, make_call, make_evaluation
+
+def _old_call(operator, **fields):
+    return make_call(operator, status='closed', created_at=datetime.utcnow() - timedelta(days=400), **fields)
+
+def _row(operator, protocol):
+    now = datetime.utcnow()
+    row = dict.fromkeys(INSERT_COLUMNS)
+    row.update(protocol=protocol, operator_id=operator.id, customer_name='Cliente', subject='Assunto',
+               category='suporte', priority='medium', status='open', created_at=now, updated_at=now)
+    return row
+
+def test_archive_moves_only_old_closed_calls(app, client, users):
+    archived = _old_call(users['operador1'])
+    evaluation = make_evaluation(archived, users['supervisor'])
+    still_open = make_call(users['operador1'], created_at=datetime.utcnow() - timedelta(days=400))
+    recent = make_call(users['operador1'], status='closed')
+    archived_id, evaluation_id = archived.id, evaluation.id
+    
+    assert archive_calls(365) == 1
+    assert db.session.get(ArchivedCall, archived_id) is not None
+    assert {call.id for call in Call.query} == {still_open.id, recent.id}
+    
+    # O documento arquivado continua em /api/calls/<id>, com as avaliações
+    response = client.get(f'/api/calls/{archived_id}', headers=login(client, 'supervisor'))
+    assert response.status_code == 200
+    document = response.get_json()
+    assert document['archived'] is True
+    assert [item['id'] for item in document['evaluations']] == [evaluation_id]
+    
+    # Para o feed, chamada e avaliação saem das tabelas quentes
+    deletes = {(entry.entity, entry.entity_id) for entry in ChangeLogEntry.query.filter_by(operation='delete')}
+    assert deletes == {('call', archived_id), ('evaluation', evaluation_id)}
+
+def test_protocols_stay_unique_outside_the_calls_table(app, users):
+    _old_call(users['operador1'], protocol='TESTE-ARQUIVADA')
+    make_call(users['operador1'], protocol='TESTE-QUENTE')
+    assert archive_calls(365) == 1
+    
+    # Protocolo de chamada arquivada não volta a ser usado
+    with pytest.raises(IntegrityError):
+        make_call(users['operador2'], protocol='TESTE-ARQUIVADA')
+    db.session.rollback()
+    
+    # Lote com protocolo repetido falha inteiro, sem chamadas nem entradas no log
+    log_size = ChangeLogEntry.query.count()
+    with pytest.raises(IntegrityError):
+        insert_batch([_row(users['operador2'], 'TESTE-NOVA'), _row(users['operador2'], 'TESTE-QUENTE')])
+    db.session.rollback()
+    assert Call.query.filter_by(protocol='TESTE-NOVA').count() == 0
+    assert ChangeLogEntry.query.count() == log_size
+    
+    insert_batch([_row(users['operador2'], 'TESTE-NOVA')])
+    assert Call.query.filter_by(protocol='TESTE-NOVA').count() == 1
+
+def test_partition_months_and_names():
+    assert month_start(datetime(2024, 3, 17, 10, 30)) == date(2024, 3, 1)
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    
+    name = partition_name('calls', date(2024, 2, 1))
+    assert name == 'calls_p202402'
+    match = PARTITION_NAME_PATTERN.match(name)
+    assert (match.group('table'), match.group('year'), match.group('month')) == ('calls', '2024', '02')
+    assert PARTITION_NAME_PATTERN.match('calls_default') is None
+
+def test_partitions_are_postgres_only(app):
+    assert ensure_partitions(db.session.connection()) == []
@@ -0,0 +1,32 @@
+from app.services.authz import user_cache
+from conftest import login
+
+def test_role_change_revokes_issued_claims(client, users):
+    supervisor = login(client, 'supervisor')
+    admin = login(client, 'admin')
+    assert client.get('/api/evaluations/queue', headers=supervisor).status_code == 200
+    
+    version = user_cache.version()
+    response = client.put(f"/api/users/{users['supervisor'].id}", headers=admin, json={'role': 'operator'})
+    assert response.status_code == 200
+    assert user_cache.version() == version + 1
+    
+    # O token ainda diz supervisor, mas é revalidado pelo papel atual
+    assert client.get('/api/evaluations/queue', headers=supervisor).status_code == 403
+    assert client.get('/api/evaluations/queue', headers=admin).status_code == 200
+
+def test_deactivation_blocks_issued_tokens(client, users):
+    operator = login(client, 'operador1')
+    assert client.get('/api/calls/', headers=operator).status_code == 200
+    
+    response = client.put(f"/api/users/{users['operador1'].id}", headers=login(client, 'admin'),
+                          json={'is_active': False})
+    assert response.status_code == 200
+    assert client.get('/api/calls/', headers=operator).status_code == 403
+
+def test_other_user_changes_keep_claims_valid(client, users):
+    version = user_cache.version()
+    response = client.put(f"/api/users/{users['operador1'].id}", headers=login(client, 'admin'),
+                          json={'full_name': 'Operador Um'})
+    assert response.status_code == 200
+    assert user_cache.version() == version
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models.change_log import ChangeLogEntry
+from app.services.changes import compact_change_log
+from conftest import login, make_call, make_evaluation
+
+def _feed(client, headers, since='', **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    response = client.get(f'/api/changes/?since={since}&{query}', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def _keys(feed):
+    return [(change['entity'], change['id'], change['op']) for change in feed['changes']]
+
+def test_entries_are_written_at_commit(app, users):
+    call = make_call(users['operador1'])
+    before = db.session.query(ChangeLogEntry).count()
+    
+    call.notes = 'sem commit'
+    db.session.flush()
+    assert db.session.query(ChangeLogEntry).count() == before
+    
+    db.session.commit()
+    assert db.session.query(ChangeLogEntry).count() == before + 1
+
+def test_feed_follows_commit_order_with_latest_change_per_record(app, client, users):
+    headers = login(client, 'admin')
+    cursor = client.get('/api/changes/cursor', headers=headers).get_json()['cursor']
+    
+    first = make_call(users['operador1'])
+    second = make_call(users['operador2'])
+    assert client.put(f'/api/calls/{first.id}', headers=headers, json={'status': 'closed'}).status_code == 200
+    
+    # Cada registro aparece uma vez, na posição da última alteração
+    feed = _feed(client, headers, cursor, entities='call')
+    assert _keys(feed) == [('call', second.id, 'insert'), ('call', first.id, 'update')]
+    assert feed['changes'][1]['data']['status'] == 'closed'
+    
+    # Página seguinte a partir do cursor: só o que veio depois, sem repetições
+    assert client.delete(f'/api/calls/{second.id}', headers=headers).status_code == 200
+    feed = _feed(client, headers, feed['next_cursor'], entities='call')
+    assert _keys(feed) == [('call', second.id, 'delete')]
+    assert 'data' not in feed['changes'][0]
+    assert _feed(client, headers, feed['next_cursor'])['changes'] == []
+
+def test_feed_pages_with_limit(app, client, users):
+    headers = login(client, 'admin')
+    cursor = client.get('/api/changes/cursor', headers=headers).get_json()['cursor']
+    calls = [make_call(users['operador1']) for _ in range(5)]
+    
+    seen = []
+    while True:
+        feed = _feed(client, headers, cursor, limit=2)
+        seen += [change['id'] for change in feed['changes']]
+        cursor = feed['next_cursor']
+        if not feed['has_more']:
+            break
+    assert seen == [call.id for call in calls]
+
+def test_operators_only_see_their_own_calls_and_evaluations(app, client, users):
+    own = make_call(users['operador1'])
+    other = make_call(users['operador2'])
+    own_evaluation = make_evaluation(own, users['supervisor'])
+    make_evaluation(other, users['supervisor'])
+    
+    feed = _feed(client, login(client, 'operador1'), entities='call,evaluation')
+    assert {(change['entity'], change['id']) for change in feed['changes']} == {
+        ('call', own.id), ('evaluation', own_evaluation.id)
+    }
+    
+    # Exclusões também levam o operador dono (lápide visível só para ele)
+    assert client.delete(f'/api/calls/{other.id}', headers=login(client, 'admin')).status_code == 200
+    feed = _feed(client, login(client, 'operador2'), entities='call')
+    assert ('call', other.id, 'delete') in _keys(feed)
+    feed = _feed(client, login(client, 'operador1'), entities='call')
+    assert ('call', other.id, 'delete') not in _keys(feed)
+
+def test_invalid_and_compacted_cursors(app, client, users):
+    headers = login(client, 'admin')
+    call = make_call(users['operador1'])
+    cursor = client.get('/api/changes/cursor', headers=headers).get_json()['cursor']
+    assert client.get('/api/changes/?since=!!!', headers=headers).status_code == 400
+    assert client.get('/api/changes/?entities=rubric', headers=headers).status_code == 400
+    
+    assert client.delete(f'/api/calls/{call.id}', headers=headers).status_code == 200
+    compact_change_log(tombstone_days=0, now=datetime.utcnow() + timedelta(seconds=1))
+    
+    # A lápide foi descartada: o cliente precisa recarregar tudo a partir do novo cursor
+    response = client.get(f'/api/changes/?since={cursor}', headers=headers)
+    assert response.status_code == 410
+    assert _feed(client, headers, response.get_json()['cursor'])['changes'] == []
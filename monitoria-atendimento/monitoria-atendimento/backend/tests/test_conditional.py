@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import User
+from conftest import login, make_call, make_evaluation
+
+def _get(client, url, headers, **conditions):
+    return client.get(url, headers={**headers, **conditions})
+
+def test_revalidation_returns_304_without_body(client, users):
+    call = make_call(users['operador1'])
+    make_evaluation(call, users['supervisor'])
+    headers = login(client, 'supervisor')
+    
+    response = _get(client, f'/api/calls/{call.id}', headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert response.cache_control.private and response.cache_control.no_cache
+    assert 'Authorization' in response.vary
+    
+    revalidated = _get(client, f'/api/calls/{call.id}', headers, **{'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+
+def test_etag_changes_after_write(client, users):
+    call = make_call(users['operador1'])
+    evaluation = make_evaluation(call, users['supervisor'])
+    headers = login(client, 'supervisor')
+    
+    call_etag = _get(client, f'/api/calls/{call.id}', headers).headers['ETag']
+    stats_etag = _get(client, '/api/dashboard/stats', headers).headers['ETag']
+    
+    # Só o comentário da avaliação muda: a chamada embute as avaliações
+    response = client.put(f'/api/evaluations/{evaluation.id}', headers=headers, json={'general_comments': 'Revisada'})
+    assert response.status_code == 200
+    assert _get(client, f'/api/calls/{call.id}', headers, **{'If-None-Match': call_etag}).status_code == 200
+    
+    assert client.post('/api/calls/', headers=headers, json={
+        'customer_name': 'Cliente', 'subject': 'Assunto', 'category': 'suporte',
+        'priority': 'low', 'operator_id': users['operador1'].id
+    }).status_code == 201
+    assert _get(client, '/api/dashboard/stats', headers, **{'If-None-Match': stats_etag}).status_code == 200
+
+def test_etag_depends_on_query_string(client, users):
+    headers = login(client, 'admin')
+    
+    everyone = _get(client, '/api/users/', headers).headers['ETag']
+    operators = _get(client, '/api/users/?role=operator', headers)
+    assert operators.headers['ETag'] != everyone
+    assert _get(client, '/api/users/?role=operator', headers, **{'If-None-Match': everyone}).status_code == 200
+
+def test_validator_applies_operator_visibility(client, users):
+    call = make_call(users['operador1'])
+    evaluation = make_evaluation(call, users['supervisor'])
+    
+    own = login(client, 'operador1')
+    call_etag = _get(client, f'/api/calls/{call.id}', own).headers['ETag']
+    evaluation_etag = _get(client, f'/api/evaluations/{evaluation.id}', own).headers['ETag']
+    
+    # Outro operador não recebe 304 com a ETag de um recurso que não pode ver: a view responde 403
+    other = login(client, 'operador2')
+    assert _get(client, f'/api/calls/{call.id}', other, **{'If-None-Match': call_etag}).status_code == 403
+    assert _get(client, f'/api/evaluations/{evaluation.id}', other,
+                **{'If-None-Match': evaluation_etag}).status_code == 403
+    assert _get(client, '/api/calls/99999', own, **{'If-None-Match': call_etag}).status_code == 404
+    
+    own_stats = _get(client, '/api/dashboard/stats', own).headers['ETag']
+    assert _get(client, '/api/dashboard/stats', other, **{'If-None-Match': own_stats}).status_code == 200
+
+def test_last_modified_only_for_settled_changes(client, users):
+    headers = login(client, 'admin')
+    user_id = users['operador1'].id
+    
+    # Alteração recente: o segundo ainda pode receber outra alteração
+    assert 'Last-Modified' not in _get(client, f'/api/users/{user_id}', headers).headers
+    
+    User.query.filter_by(id=user_id).update({'updated_at': datetime.utcnow() - timedelta(minutes=5)})
+    db.session.commit()
+    response = _get(client, f'/api/users/{user_id}', headers)
+    last_modified = response.headers['Last-Modified']
+    assert _get(client, f'/api/users/{user_id}', headers, **{'If-Modified-Since': last_modified}).status_code == 304
+    
+    # If-None-Match tem precedência sobre If-Modified-Since
+    assert _get(client, f'/api/users/{user_id}', headers, **{
+        'If-Modified-Since': last_modified, 'If-None-Match': 'W/"outra"'
+    }).status_code == 200
+    
+    assert client.put(f'/api/users/{user_id}', headers=headers, json={'full_name': 'Operador Um'}).status_code == 200
+    assert _get(client, f'/api/users/{user_id}', headers, **{'If-Modified-Since': last_modified}).status_code == 200
@@ -0,0 +1,46 @@
+from app import db
+from app.services.cache import DashboardCache, dashboard_cache
+
+def _cache(tmp_path, flush_interval=60):
+    cache = DashboardCache()
+    cache.enabled = True
+    cache.flush_interval = flush_interval
+    cache._configure(str(tmp_path / 'cache.sqlite3'))
+    return cache
+
+def test_hits_only_read_the_shared_file(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get_or_compute('stats', lambda: {'total': 1}) == {'total': 1}
+    
+    statements = []
+    cache._connect().connection.set_trace_callback(statements.append)
+    for _ in range(5):
+        assert cache.get_or_compute('stats', lambda: {'total': 2}) == {'total': 1}
+    cache._connect().connection.set_trace_callback(None)
+    
+    assert statements and all(statement.lstrip().upper().startswith('SELECT') for statement in statements)
+
+def test_counters_are_flushed_from_the_worker(tmp_path):
+    cache = _cache(tmp_path)
+    cache.get_or_compute('stats', lambda: 1)
+    cache.get_or_compute('stats', lambda: 1)
+    cache.get_or_compute('stats', lambda: 1)
+    
+    # Outro worker lendo o mesmo arquivo só vê os contadores depois do flush
+    other = _cache(tmp_path)
+    assert other.stats()['hits'] == 0
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert other.stats()['hits'] == 2
+
+def test_password_rehash_keeps_the_cache(app, users):
+    generation = dashboard_cache.generation()
+    
+    users['operador1'].password_hash = 'scrypt:novo-hash'
+    db.session.commit()
+    assert dashboard_cache.generation() == generation
+    
+    # Nome exibido nos painéis: invalida
+    users['operador1'].full_name = 'Operador Um'
+    db.session.commit()
+    assert dashboard_cache.generation() == generation + 1
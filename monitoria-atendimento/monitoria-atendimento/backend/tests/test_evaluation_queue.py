@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models.evaluation_queue import EvaluationQueueEntry
+from app.services.archive import archive_calls
+from conftest import login, make_call, make_evaluation
+
+def _entries(**filters):
+    return EvaluationQueueEntry.query.filter_by(**filters).order_by(EvaluationQueueEntry.id).all()
+
+def _claim(client, headers, **body):
+    response = client.post('/api/evaluations/queue/claim', headers=headers, json=body)
+    assert response.status_code == 200, response.get_json()
+    return [entry['call_id'] for entry in response.get_json()['claims']]
+
+def _expire_leases():
+    db.session.query(EvaluationQueueEntry).filter_by(status='claimed')\
+              .update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+def test_new_calls_fill_the_stratum_quota(app, users):
+    for _ in range(5):
+        make_call(users['operador1'])
+    make_call(users['operador1'], priority='urgent')
+    
+    # Cota padrão 2 por estrato; urgent tem cota própria
+    assert len(_entries(priority='medium')) == 2
+    assert len(_entries(priority='urgent')) == 1
+    assert all(entry.status == 'pending' for entry in _entries())
+
+def test_claim_hands_out_each_entry_once(app, client, users):
+    calls = [make_call(users['operador1']), make_call(users['operador1'])]
+    supervisor = login(client, 'supervisor')
+    admin = login(client, 'admin')
+    
+    first = _claim(client, supervisor)
+    second = _claim(client, admin, limit=5)
+    assert len(first) == 1
+    assert sorted(first + second) == sorted(call.id for call in calls)
+    assert _claim(client, admin, limit=5) == []
+    
+    # Outro avaliador não pode avaliar a chamada reservada
+    response = client.post('/api/evaluations/', headers=admin, json={'call_id': first[0], 'greeting_score': 4})
+    assert response.status_code == 409
+
+def test_expired_leases_can_be_claimed_again(app, client, users):
+    call = make_call(users['operador1'])
+    supervisor = login(client, 'supervisor')
+    admin = login(client, 'admin')
+    
+    assert _claim(client, supervisor) == [call.id]
+    assert _claim(client, admin) == []
+    
+    _expire_leases()
+    assert _claim(client, admin) == [call.id]
+    entry = _entries(call_id=call.id)[0]
+    assert entry.claimed_by == users['admin'].id
+    assert entry.lease_expires_at > datetime.utcnow()
+
+def test_operator_filter_applies_to_expired_leases(app, client, users):
+    call = make_call(users['operador1'])
+    make_call(users['operador2'])
+    supervisor = login(client, 'supervisor')
+    admin = login(client, 'admin')
+    
+    assert _claim(client, supervisor, operator_id=users['operador2'].id) != [call.id]
+    _expire_leases()
+    
+    # A reserva vencida de outro operador não escapa do filtro (OR agrupado)
+    claimed = _claim(client, admin, limit=5, operator_id=users['operador1'].id)
+    assert claimed == [call.id]
+
+def test_claim_rejects_invalid_limits(app, client, users):
+    make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    
+    for body in ({'limit': True}, {'limit': 0}, {'limit': 21}, {'limit': '2'}, {'operator_id': True}):
+        response = client.post('/api/evaluations/queue/claim', headers=headers, json=body)
+        assert response.status_code == 400, body
+    assert _entries(status='claimed') == []
+
+def test_evaluation_closes_and_reopens_the_entry(app, client, users):
+    call = make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    
+    evaluation = make_evaluation(call, users['supervisor'])
+    assert _entries(call_id=call.id)[0].status == 'done'
+    
+    assert client.delete(f'/api/evaluations/{evaluation.id}', headers=login(client, 'admin')).status_code == 200
+    assert _entries(call_id=call.id)[0].status == 'pending'
+    assert _claim(client, headers) == [call.id]
+
+def test_removed_calls_leave_no_queue_entries(app, client, users):
+    deleted = make_call(users['operador1'])
+    archived = make_call(users['operador2'], status='closed', created_at=datetime.utcnow() - timedelta(days=400)).id
+    assert len(_entries()) == 2
+    
+    assert client.delete(f'/api/calls/{deleted.id}', headers=login(client, 'admin')).status_code == 200
+    assert _entries(call_id=deleted.id) == []
+    
+    assert archive_calls(365) == 1
+    assert _entries(call_id=archived) == []
+
+def test_claim_serves_the_current_period_first(app, client, users):
+    old = make_call(users['operador1'], created_at=datetime.utcnow() - timedelta(days=60))
+    current = make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    
+    # A pendência antiga foi sorteada antes, mas a amostra corrente sai primeiro
+    assert _entries(call_id=old.id)[0].sampled_at <= _entries(call_id=current.id)[0].sampled_at
+    assert _claim(client, headers) == [current.id]
+    assert _claim(client, headers) == [old.id]
+
+def test_deleted_call_slot_is_refilled_from_the_stratum(app, client, users):
+    call_ids = {make_call(users['operador1']).id for _ in range(4)}
+    make_call(users['operador1'], category='vendas')
+    queued = [entry.call_id for entry in _entries(priority='medium', category='suporte')]
+    assert len(queued) == 2
+    slot = _entries(call_id=queued[0])[0].slot
+    
+    assert client.delete(f'/api/calls/{queued[0]}', headers=login(client, 'admin')).status_code == 200
+    db.session.remove()
+    
+    refilled = _entries(category='suporte')
+    assert len(refilled) == 2
+    replacement = next(entry for entry in refilled if entry.call_id != queued[1])
+    assert replacement.call_id in call_ids - set(queued)
+    assert (replacement.slot, replacement.status) == (slot, 'pending')
+    assert len(_entries(category='vendas')) == 1
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app.services.archive import archive_calls
+from app.services.scoring import recompute_scores
+from conftest import login, make_call, make_evaluation
+
+INVALID_CRITERIA_SCORES = [
+    [4],
+    {'cordialidade': 'alta'},
+    {'cordialidade': True},
+    {'cordialidade': 0},
+    {'cordialidade': 5.5},
+    {'cordialidade': {'nota': 4}},
+    {'cordialidade alta': 4}
+]
+
+@pytest.fixture
+def rubric(client, users):
+    """Rubrica padrão com um critério adicional (cordialidade)"""
+    response = client.post('/api/rubrics/', headers=login(client, 'admin'), json={
+        'weights': {'greeting_score': 1, 'empathy_score': 1, 'cordialidade': 2}
+    })
+    assert response.status_code == 201
+    return response.get_json()['rubric']
+
+def test_criteria_scores_enter_the_weighted_score(app, client, users, rubric):
+    call = make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    
+    response = client.post('/api/evaluations/', headers=headers, json={
+        'call_id': call.id, 'greeting_score': 4, 'empathy_score': 2, 'criteria_scores': {'cordialidade': 4.5}
+    })
+    assert response.status_code == 201
+    evaluation = response.get_json()['evaluation']
+    assert evaluation['rubric_id'] == rubric['id']
+    assert evaluation['overall_score'] == pytest.approx((4 + 2 + 2 * 4.5) / 4)
+    
+    # Nota nula remove o critério da média
+    response = client.put(f"/api/evaluations/{evaluation['id']}", headers=headers, json={
+        'criteria_scores': {'cordialidade': None}
+    })
+    assert response.status_code == 200
+    assert response.get_json()['evaluation']['overall_score'] == pytest.approx(3.0)
+
+def test_text_edits_keep_the_score_and_rubric(app, client, users, rubric):
+    call = make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    evaluation = client.post('/api/evaluations/', headers=headers, json={
+        'call_id': call.id, 'greeting_score': 4, 'empathy_score': 2, 'criteria_scores': {'cordialidade': 5}
+    }).get_json()['evaluation']
+    
+    # Nova rubrica vigente: só uma alteração de nota passa a usá-la
+    new_rubric = client.post('/api/rubrics/', headers=login(client, 'admin'), json={
+        'weights': {'greeting_score': 1}
+    }).get_json()['rubric']
+    
+    response = client.put(f"/api/evaluations/{evaluation['id']}", headers=headers, json={
+        'general_comments': 'Revisada', 'greeting_score': 4, 'requires_coaching': True
+    })
+    assert response.status_code == 200
+    edited = response.get_json()['evaluation']
+    assert (edited['overall_score'], edited['rubric_id']) == (evaluation['overall_score'], rubric['id'])
+    
+    response = client.put(f"/api/evaluations/{evaluation['id']}", headers=headers, json={'greeting_score': 3})
+    rescored = response.get_json()['evaluation']
+    assert (rescored['overall_score'], rescored['rubric_id']) == (3.0, new_rubric['id'])
+
+@pytest.mark.parametrize('criteria_scores', INVALID_CRITERIA_SCORES)
+def test_create_rejects_invalid_criteria_scores(app, client, users, rubric, criteria_scores):
+    call = make_call(users['operador1'])
+    response = client.post('/api/evaluations/', headers=login(client, 'supervisor'), json={
+        'call_id': call.id, 'greeting_score': 4, 'criteria_scores': criteria_scores
+    })
+    assert response.status_code == 400
+    assert call.evaluation_count == 0
+
+@pytest.mark.parametrize('criteria_scores', INVALID_CRITERIA_SCORES)
+def test_update_rejects_invalid_criteria_scores(app, client, users, rubric, criteria_scores):
+    evaluation = make_evaluation(make_call(users['operador1']), users['supervisor'], criteria_scores={'cordialidade': 3})
+    response = client.put(f'/api/evaluations/{evaluation.id}', headers=login(client, 'supervisor'), json={
+        'criteria_scores': criteria_scores
+    })
+    assert response.status_code == 400
+    assert evaluation.criteria_scores == {'cordialidade': 3}
+
+def test_rescoring_keeps_archived_history_in_the_dashboard(app, client, users):
+    old_call = make_call(users['operador1'], status='closed', created_at=datetime.utcnow() - timedelta(days=400))
+    make_evaluation(old_call, users['supervisor'], greeting_score=2, empathy_score=2)
+    make_evaluation(make_call(users['operador1']), users['supervisor'], greeting_score=4, empathy_score=2)
+    assert archive_calls(365) == 1
+    headers = login(client, 'admin')
+    
+    def stats():
+        response = client.get('/api/dashboard/stats?days=1000', headers=headers)
+        assert response.status_code == 200
+        return response.get_json()
+    
+    before = stats()
+    assert before['calls']['total'] == 2
+    assert before['evaluations']['total'] == 2
+    
+    assert client.post('/api/rubrics/', headers=headers, json={
+        'weights': {'greeting_score': 3, 'empathy_score': 1}
+    }).status_code == 201
+    assert recompute_scores() == 1
+    
+    after = stats()
+    assert after['calls']['total'] == 2
+    assert after['evaluations']['total'] == 2
+    # Arquivada: 2.0 (inalterada); quente: (3 * 4 + 2) / 4 = 3.5
+    assert after['evaluations']['avg_overall_score'] == pytest.approx((2.0 + 3.5) / 2, abs=0.01)
+
+def test_export_includes_rubric_scores(app, client, users, rubric):
+    call = make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    assert client.post('/api/evaluations/', headers=headers, json={
+        'call_id': call.id, 'greeting_score': 4, 'criteria_scores': {'cordialidade': 3}
+    }).status_code == 201
+    
+    line = client.get('/api/evaluations/export?format=ndjson', headers=headers).get_data(as_text=True)
+    exported = json.loads(line)
+    assert (exported['criteria_scores'], exported['rubric_id']) == ({'cordialidade': 3}, rubric['id'])
+    
+    rows = list(csv.DictReader(io.StringIO(client.get('/api/evaluations/export', headers=headers).get_data(as_text=True))))
+    assert json.loads(rows[0]['criteria_scores']) == {'cordialidade': 3}
+    assert rows[0]['rubric_id'] == str(rubric['id'])
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from app.services import export
+from conftest import login, make_call, make_evaluation
+
+def _csv(response):
+    return _rows(response.get_data(as_text=True))
+
+def _rows(content):
+    return list(csv.DictReader(io.StringIO(content)))
+
+def test_csv_export_streams_in_batches(client, users, monkeypatch):
+    monkeypatch.setattr(export, 'EXPORT_BATCH_SIZE', 2)
+    calls = [make_call(users['operador1'], duration_seconds=index) for index in range(5)]
+    
+    response = client.get('/api/calls/export', headers=login(client, 'supervisor'))
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=chamadas.csv'
+    
+    # Cabeçalho e linhas em blocos de EXPORT_BATCH_SIZE
+    chunks = list(response.response)
+    assert len(chunks) == 3
+    
+    rows = _rows(b''.join(chunks).decode())
+    assert [int(row['id']) for row in rows] == sorted((call.id for call in calls), reverse=True)
+    assert rows[0]['operator_name'] == users['operador1'].full_name
+    assert rows[0]['protocol'] == calls[-1].protocol
+
+def test_ndjson_export_serializes_joined_columns(client, users):
+    call = make_call(users['operador1'])
+    make_evaluation(call, users['supervisor'], greeting_score=4)
+    
+    response = client.get('/api/evaluations/export?format=ndjson', headers=login(client, 'admin'))
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 1
+    evaluation = json.loads(lines[0])
+    assert evaluation['call_protocol'] == call.protocol
+    assert evaluation['evaluator_name'] == users['supervisor'].full_name
+    assert evaluation['greeting_score'] == 4
+    assert 'T' in evaluation['created_at']
+
+def test_export_applies_filters_and_operator_visibility(client, users):
+    own = make_call(users['operador1'], priority='high')
+    make_call(users['operador1'], priority='low')
+    make_call(users['operador2'], priority='high')
+    
+    rows = _csv(client.get('/api/calls/export?priority=high', headers=login(client, 'operador1')))
+    assert [int(row['id']) for row in rows] == [own.id]
+    
+    response = client.get('/api/calls/export?format=xml', headers=login(client, 'admin'))
+    assert response.status_code == 400
+
+def test_search_ignores_accents_and_case(client, users):
+    billing = make_call(users['operador1'], subject='Cobrança indevida na fatura')
+    make_call(users['operador1'], subject='Troca de endereço')
+    headers = login(client, 'supervisor')
+    
+    for terms in ('cobranca', 'COBRANÇA', 'cobrança fatura'):
+        rows = _csv(client.get(f'/api/calls/export?q={terms}', headers=headers))
+        assert [int(row['id']) for row in rows] == [billing.id], terms
+    
+    assert _csv(client.get('/api/calls/export?q=cobranca+endereco', headers=headers)) == []
+    listed = client.get('/api/calls/?q=indevída', headers=headers).get_json()
+    assert [call['id'] for call in listed['calls']] == [billing.id]
@@ -0,0 +1,53 @@
+import json
+from app.models import Call
+from conftest import login
+
+def _ndjson(*records):
+    return '\n'.join(record if isinstance(record, str) else json.dumps(record) for record in records)
+
+def test_ndjson_report_has_one_result_per_line(client, users):
+    body = _ndjson(
+        {'customer_name': 'Cliente', 'subject': 'Assunto', 'operator_id': users['operador1'].id},
+        '{invalido',
+        {'subject': 'Sem cliente'},
+        {'customer_name': 'Cliente', 'subject': 'Assunto', 'operator_id': 99999}
+    )
+    response = client.post('/api/calls/bulk', headers=login(client, 'admin'), data=body,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 201
+    report = response.get_json()
+    assert (report['received'], report['created'], report['failed']) == (4, 1, 3)
+    
+    results = report['results']
+    assert [result['line'] for result in results] == [1, 2, 3, 4]
+    assert [result['status'] for result in results] == ['created', 'error', 'error', 'error']
+    assert results[2]['error'] == 'Campo customer_name é obrigatório'
+    assert results[3]['error'] == 'Operador não encontrado'
+    
+    # Só a linha válida foi gravada
+    assert Call.query.filter_by(protocol=results[0]['protocol']).one().operator_id == users['operador1'].id
+    assert Call.query.count() == 1
+
+def test_csv_lines_count_the_header(client, users):
+    body = 'customer_name,subject,duration_seconds,priority\nA,B,10,high\nC,,5,low\nD,E,x,\n'
+    response = client.post('/api/calls/bulk', headers=login(client, 'supervisor'), data=body,
+                           content_type='text/csv')
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert [(result['line'], result['status']) for result in results] == [
+        (2, 'created'), (3, 'error'), (4, 'error')
+    ]
+    assert results[2]['error'] == 'Campo duration_seconds deve ser inteiro'
+    
+    # Sem operator_id, a chamada fica com o usuário que enviou o arquivo
+    call = Call.query.filter_by(protocol=results[0]['protocol']).one()
+    assert (call.operator_id, call.duration_seconds, call.priority) == (users['supervisor'].id, 10, 'high')
+
+def test_upload_without_valid_rows_is_rejected(client, users):
+    headers = login(client, 'admin')
+    response = client.post('/api/calls/bulk', headers=headers, data=_ndjson({'subject': 'x'}),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.get_json()['failed'] == 1
+    
+    assert client.post('/api/calls/bulk', headers=headers, data='x', content_type='text/plain').status_code == 415
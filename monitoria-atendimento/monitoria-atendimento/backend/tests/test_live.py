@@ -0,0 +1,49 @@
+import threading
+from app.services.authz import UserCache
+from conftest import login
+
+def _ticket(client, headers):
+    response = client.post('/api/dashboard/stream/ticket', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['ticket']
+
+def test_stream_opens_with_ticket(client, users):
+    ticket = _ticket(client, login(client, 'supervisor'))
+    
+    response = client.get(f'/api/dashboard/stream?days=7&ticket={ticket}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert next(response.response).startswith(b'retry: 5000\nevent: ready')
+    response.close()
+
+def test_stream_rejects_session_token_in_query_string(client, users):
+    token = login(client, 'supervisor')['Authorization'].split()[1]
+    
+    assert client.get(f'/api/dashboard/stream?ticket={token}').status_code == 401
+    assert client.get(f'/api/dashboard/stream?jwt={token}').status_code == 401
+
+def test_ticket_only_opens_the_stream(client, users):
+    ticket = _ticket(client, login(client, 'supervisor'))
+    headers = {'Authorization': f'Bearer {ticket}'}
+    
+    assert client.get('/api/dashboard/stats', headers=headers).status_code == 401
+    assert client.post('/api/dashboard/stream/ticket', headers=headers).status_code == 401
+
+def test_store_shares_one_connection_between_threads(tmp_path):
+    store = UserCache()
+    store._configure(str(tmp_path / 'auth.sqlite3'))
+    connections = set()
+    
+    def bump():
+        for _ in range(50):
+            connections.add(id(store._connect()))
+            store.bump()
+    
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(connections) == 1
+    assert store.version() == 400
@@ -0,0 +1,45 @@
+import json
+from app import db
+from app.services.metrics import MetricsRegistry, metrics_registry, RETIRED_PID
+
+def _count(metric):
+    return sum(sum(series[:-1]) for (name, _), series in metrics_registry.collect().items() if name == metric)
+
+def test_pool_instrumentation_survives_dispose(app):
+    db.session.execute(db.text('SELECT 1'))
+    db.session.remove()
+    before = _count('db_pool_connect_seconds')
+    
+    # O pool recriado pelo dispose (ex.: após o fork) continua instrumentado
+    db.engine.dispose()
+    db.session.execute(db.text('SELECT 1'))
+    assert _count('db_pool_connect_seconds') == before + 1
+
+def test_retired_workers_fold_into_one_row_per_series(tmp_path):
+    path = str(tmp_path / 'metrics.sqlite3')
+    registry = MetricsRegistry()
+    registry._configure(path)
+    connection = registry._connect()
+    labels = json.dumps([['endpoint', 'calls.get_calls']])
+    for pid, value in ((101, [1, 0, 2.0]), (102, [0, 3, 9.0]), (103, [2, 2, 5.0])):
+        connection.execute('INSERT INTO samples VALUES (?, ?, ?, ?)',
+                           (pid, 'http_request_sql_queries', labels, json.dumps(value)))
+    totals = registry.collect()
+    
+    registry.retire(101)
+    registry.retire(102)
+    
+    pids = [row[0] for row in connection.execute('SELECT pid FROM samples ORDER BY pid')]
+    assert pids == [RETIRED_PID, 103]
+    # Os contadores expostos não diminuem quando um worker é reciclado
+    assert registry.collect() == totals
+
+def test_metrics_endpoint_requires_token_when_configured(app, client):
+    app.config['METRICS_REQUIRE_TOKEN'] = True
+    assert client.get('/api/metrics').status_code == 403
+    
+    app.config['METRICS_TOKEN'] = 's3cret'
+    assert client.get('/api/metrics').status_code == 401
+    response = client.get('/api/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert '# TYPE db_pool_connect_seconds histogram' in response.get_data(as_text=True)
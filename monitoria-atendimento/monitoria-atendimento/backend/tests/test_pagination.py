@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from conftest import login, make_call
+
+def _expected_order(calls):
+    return [call.id for call in sorted(calls, key=lambda call: (call.created_at, call.id), reverse=True)]
+
+def _walk(client, headers, url, cursor_key, cursor=''):
+    """Percorre as páginas seguindo cursor_key; retorna os ids de cada página e a última resposta"""
+    pages = []
+    while True:
+        body = client.get(f'{url}&cursor={cursor}', headers=headers).get_json()
+        pages.append([call['id'] for call in body['calls']])
+        cursor = body[cursor_key]
+        if cursor is None:
+            return pages, body
+
+def test_cursor_pages_cover_every_call_once(app, client, users):
+    base = datetime.utcnow() - timedelta(days=1)
+    # Vários empates em created_at: o id desempata a ordem
+    calls = [make_call(users['operador1'], created_at=base + timedelta(minutes=index // 3)) for index in range(23)]
+    headers = login(client, 'supervisor')
+    
+    pages, last = _walk(client, headers, '/api/calls/?limit=5', 'next_cursor')
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert sum(pages, []) == _expected_order(calls)
+    
+    # Voltando pelo cursor anterior a partir da última página
+    backwards, first = _walk(client, headers, '/api/calls/?limit=5', 'prev_cursor', last['prev_cursor'])
+    assert backwards == pages[-2::-1]
+    assert first['prev_cursor'] is None
+
+def test_cursor_pages_skip_nothing_when_calls_are_added(app, client, users):
+    calls = [make_call(users['operador1']) for _ in range(6)]
+    headers = login(client, 'supervisor')
+    
+    first = client.get('/api/calls/?cursor=&limit=3', headers=headers).get_json()
+    # Chamada nova entra no topo e não desloca a página seguinte (sem OFFSET)
+    make_call(users['operador1'], created_at=datetime.utcnow())
+    second = client.get(f"/api/calls/?cursor={first['next_cursor']}&limit=3", headers=headers).get_json()
+    
+    ids = [call['id'] for call in first['calls'] + second['calls']]
+    assert ids == _expected_order(calls)
+
+def test_cursor_respects_operator_visibility_and_total(app, client, users):
+    for index in range(8):
+        make_call(users['operador1'] if index % 2 else users['operador2'])
+    headers = login(client, 'operador1')
+    
+    body = client.get('/api/calls/?cursor=&limit=3&total=exact', headers=headers).get_json()
+    assert body['total'] == 4
+    assert body['total_is_estimate'] is False
+    
+    pages, _ = _walk(client, headers, '/api/calls/?limit=3', 'next_cursor')
+    assert len(sum(pages, [])) == 4
+
+def test_invalid_cursor_is_rejected(app, client, users):
+    headers = login(client, 'supervisor')
+    for cursor in ('nao-e-um-cursor', 'eyJkIjoieCJ9'):
+        response = client.get(f'/api/calls/?cursor={cursor}', headers=headers)
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Cursor inválido'
@@ -0,0 +1,45 @@
+import time
+from app.services import passwords
+from conftest import PASSWORD
+
+def _login(client, username, password, ip='10.0.0.1'):
+    return client.post('/api/auth/login', json={'username': username, 'password': password},
+                       environ_base={'REMOTE_ADDR': ip})
+
+def test_failures_lock_the_username(client, users):
+    for _ in range(5):
+        assert _login(client, 'operador1', 'errada').status_code == 401
+    
+    # Bloqueado mesmo com a senha correta, antes de verificar o hash
+    response = _login(client, 'operador1', PASSWORD)
+    assert response.status_code == 429
+    assert 0 < int(response.headers['Retry-After']) <= 900
+    
+    # Nome de usuário sem diferenciar maiúsculas; outros usuários seguem liberados
+    assert _login(client, 'OPERADOR1', PASSWORD).status_code == 429
+    assert _login(client, 'operador2', PASSWORD).status_code == 200
+
+def test_successful_login_resets_user_failures(client, users):
+    for _ in range(4):
+        assert _login(client, 'operador1', 'errada').status_code == 401
+    assert _login(client, 'operador1', PASSWORD).status_code == 200
+    
+    for _ in range(4):
+        assert _login(client, 'operador1', 'errada').status_code == 401
+    assert _login(client, 'operador1', PASSWORD).status_code == 200
+
+def test_failures_per_ip_span_usernames(client, users):
+    for attempt in range(20):
+        assert _login(client, f'inexistente{attempt}', 'errada').status_code == 401
+    
+    assert _login(client, 'operador2', PASSWORD).status_code == 429
+    assert _login(client, 'operador2', PASSWORD, ip='10.0.0.2').status_code == 200
+
+def test_lockout_ends_when_failures_leave_the_window(client, users, monkeypatch):
+    for _ in range(5):
+        _login(client, 'operador1', 'errada')
+    assert _login(client, 'operador1', PASSWORD).status_code == 429
+    
+    later = time.monotonic() + passwords.login_throttle.window + 1
+    monkeypatch.setattr(passwords.time, 'monotonic', lambda: later)
+    assert _login(client, 'operador1', PASSWORD).status_code == 200
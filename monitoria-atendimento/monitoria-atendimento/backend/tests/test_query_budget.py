@@ -0,0 +1,60 @@
+import pytest
+from flask import g, jsonify, request
+from app.models import Call
+from app.services.query_guard import QueryBudgetExceeded
+from conftest import login, make_call, make_evaluation
+
+def _capture_reads(app):
+    """Leituras SQL contadas pelo guard em cada requisição (registrar antes da primeira)"""
+    counts = []
+    
+    @app.after_request
+    def capture(response):
+        counts.append(g.get('query_count', 0))
+        return response
+    
+    return counts
+
+def test_calls_listing_reads_do_not_grow_with_page_size(app, client, users):
+    for index in range(120):
+        call = make_call(users['operador1'] if index % 2 else users['operador2'])
+        if index % 3 == 0:
+            make_evaluation(call, users['supervisor'])
+    counts = _capture_reads(app)
+    headers = login(client, 'supervisor')
+    
+    reads = {}
+    for per_page in (5, 100):
+        response = client.get(f'/api/calls/?per_page={per_page}', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['calls']) == per_page
+        reads[per_page] = counts[-1]
+    
+    assert reads[5] == reads[100]
+    assert reads[100] <= app.config['QUERY_BUDGET']
+
+def test_lazy_loading_endpoint_exceeds_budget(app, client, users):
+    for _ in range(20):
+        make_call(users['operador1'])
+    
+    # Uma consulta por chamada (relação dinâmica): o N+1 que o guard deve barrar
+    @app.route('/api/test/lazy-calls')
+    def lazy_calls():
+        calls = Call.query.limit(request.args.get('per_page', type=int)).all()
+        return jsonify([call.evaluations.count() for call in calls])
+    
+    headers = login(client, 'supervisor')
+    assert client.get('/api/test/lazy-calls?per_page=2', headers=headers).status_code == 200
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/api/test/lazy-calls?per_page=20', headers=headers)
+
+def test_writes_do_not_consume_the_read_budget(app, client, users):
+    call = make_call(users['operador1'])
+    counts = _capture_reads(app)
+    headers = login(client, 'supervisor')
+    
+    response = client.post('/api/evaluations/', headers=headers, json={
+        'call_id': call.id, 'greeting_score': 4, 'empathy_score': 5
+    })
+    assert response.status_code == 201
+    assert counts[-1] <= app.config['QUERY_BUDGET']
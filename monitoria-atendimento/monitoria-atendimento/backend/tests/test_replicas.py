@@ -0,0 +1,85 @@
+import shutil
+import pytest
+from app import create_app, db
+from config import TestingConfig
+from conftest import login, make_call
+
+@pytest.fixture
+def app(request, tmp_path, monkeypatch):
+    """Primário e réplica em arquivos SQLite: 'copia' (cópia do primário, ver
+    sync_replica) ou 'inacessivel' (arquivo que não pode ser aberto)"""
+    primary = tmp_path / 'primary.db'
+    replica = tmp_path / 'replica.db' if request.param == 'copia' else tmp_path / 'ausente' / 'replica.db'
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{primary}')
+    monkeypatch.setattr(TestingConfig, 'DATABASE_REPLICA_URLS', [f'sqlite:///{replica}'])
+    app = create_app('testing')
+    with app.app_context():
+        # Só o primário: a réplica recebe as tabelas pela cópia
+        db.create_all(bind_key=None)
+        
+        def sync_replica():
+            db.session.commit()
+            shutil.copy(primary, replica)
+        
+        app.sync_replica = sync_replica
+        yield app
+        db.session.remove()
+    # O metadata do bind fica registrado no db global e quebraria o create_all dos outros testes
+    db.metadatas.pop('replica_0', None)
+
+def _total(client, headers):
+    # As requisições do teste compartilham o contexto (e a sessão) da fixture: uma
+    # sessão nova por leitura, como em produção, sem a marca de escrita anterior
+    db.session.remove()
+    response = client.get('/api/calls/', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['total']
+
+@pytest.mark.parametrize('app', ['copia'], indirect=True)
+def test_read_only_endpoints_read_from_the_replica(app, client, users):
+    make_call(users['operador1'])
+    app.sync_replica()
+    make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    
+    # A listagem vem da réplica (ainda sem a segunda chamada)
+    assert _total(client, headers) == 1
+    
+    # Quem acabou de gravar lê do primário (as próprias escritas)
+    response = client.put('/api/calls/1', headers=headers, json={'notes': 'revisada'})
+    assert response.status_code == 200
+    assert _total(client, headers) == 2
+    
+    # Outro usuário continua na réplica
+    assert _total(client, login(client, 'admin')) == 1
+
+@pytest.mark.parametrize('app', ['copia'], indirect=True)
+def test_dashboard_cache_misses_are_computed_on_the_primary(app, client, users):
+    make_call(users['operador1'])
+    app.sync_replica()
+    headers = login(client, 'supervisor')
+    first = client.get('/api/dashboard/stats', headers=headers)
+    assert first.get_json()['calls']['total'] == 1
+    
+    # A réplica ainda não tem a chamada nova, mas a geração do cache já avançou
+    make_call(users['operador1'])
+    db.session.remove()
+    response = client.get('/api/dashboard/stats', headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['calls']['total'] == 2
+    
+    app.sync_replica()
+    db.session.remove()
+    assert client.get('/api/dashboard/stats', headers=headers).get_json()['calls']['total'] == 2
+
+@pytest.mark.parametrize('app', ['inacessivel'], indirect=True)
+def test_failed_replica_read_is_retried_on_the_primary(app, client, users):
+    make_call(users['operador1'])
+    headers = login(client, 'supervisor')
+    
+    # A primeira leitura na réplica falha e é repetida no primário, na mesma requisição
+    assert _total(client, headers) == 1
+    
+    stats = app.extensions['replica_router'].stats()
+    assert 'replica_0' in stats['down']
+    assert _total(client, headers) == 1
@@ -0,0 +1,82 @@
+from app import db
+from app.models.rollup import (
+    CallDailyRollup, EvaluationDailyRollup, CallDurationHistogram, EvaluationScoreHistogram
+)
+from app.models.evaluation_queue import EvaluationSamplingStratum
+from app.services import rollups, sampling
+from app.services.rollups import rebuild_rollups
+from conftest import login, make_call, make_evaluation
+
+ROLLUP_MODELS = [CallDailyRollup, EvaluationDailyRollup, CallDurationHistogram, EvaluationScoreHistogram]
+
+def _snapshot():
+    """Linhas com algum valor de cada rollup (deltas podem deixar linhas zeradas)"""
+    snapshot = {}
+    for model in ROLLUP_MODELS:
+        columns = model.__table__.columns
+        rows = db.session.execute(db.select(*columns)).all()
+        snapshot[model.__tablename__] = sorted(
+            tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+            for row in rows if any(row._mapping[column] for column in columns if not column.primary_key)
+        )
+    return snapshot
+
+def _call_total(operator_id):
+    return db.session.query(db.func.sum(CallDailyRollup.call_count))\
+                     .filter(CallDailyRollup.operator_id == operator_id).scalar() or 0
+
+def test_updates_and_deletes_apply_deltas(app, client, users):
+    calls = [make_call(users['operador1'], duration_seconds=60 * (index + 1)) for index in range(4)]
+    evaluations = [make_evaluation(call, users['supervisor']) for call in calls[:3]]
+    headers = login(client, 'admin')
+    assert _call_total(users['operador1'].id) == 4
+    
+    assert client.put(f'/api/calls/{calls[0].id}', headers=headers, json={
+        'status': 'closed', 'priority': 'high', 'duration_seconds': 900
+    }).status_code == 200
+    assert client.put(f'/api/evaluations/{evaluations[1].id}', headers=headers, json={
+        'greeting_score': 1, 'requires_coaching': True
+    }).status_code == 200
+    assert client.delete(f'/api/evaluations/{evaluations[2].id}', headers=headers).status_code == 200
+    assert client.delete(f'/api/calls/{calls[3].id}', headers=headers).status_code == 200
+    
+    incremental = _snapshot()
+    assert _call_total(users['operador1'].id) == 3
+    
+    # Os deltas chegam ao mesmo resultado de uma reconstrução completa
+    rebuild_rollups()
+    assert _snapshot() == incremental
+
+def test_changes_to_expired_objects_subtract_previous_values(app, users):
+    call = make_call(users['operador1'], duration_seconds=120)
+    evaluation = make_evaluation(call, users['supervisor'])
+    
+    # Após o commit os objetos estão expirados: o valor anterior não está carregado
+    call.status = 'closed'
+    call.duration_seconds = 4000
+    evaluation.greeting_score = 1
+    db.session.commit()
+    
+    statuses = db.session.query(CallDailyRollup.status, CallDailyRollup.call_count).all()
+    assert ('open', 0) in statuses or 'open' not in dict(statuses)
+    assert ('closed', 1) in statuses
+    
+    incremental = _snapshot()
+    rebuild_rollups()
+    assert _snapshot() == incremental
+
+def test_dialects_without_upsert_use_update_then_insert(app, users, monkeypatch):
+    # Dialeto sem ON CONFLICT: UPDATE por chave e INSERT das chaves novas
+    monkeypatch.setattr(rollups, 'upsert_insert', lambda connection: None)
+    monkeypatch.setattr(sampling, 'upsert_insert', lambda connection: None)
+    
+    calls = [make_call(users['operador1'], duration_seconds=60) for _ in range(3)]
+    make_evaluation(calls[0], users['supervisor'])
+    make_evaluation(calls[1], users['supervisor'], greeting_score=1)
+    
+    assert _call_total(users['operador1'].id) == 3
+    assert db.session.query(db.func.sum(EvaluationSamplingStratum.seen_count)).scalar() == 3
+    
+    incremental = _snapshot()
+    rebuild_rollups()
+    assert _snapshot() == incremental
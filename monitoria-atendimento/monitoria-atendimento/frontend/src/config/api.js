@@ -5,6 +5,9 @@ const API_BASE_URL = 'https://5000-i3ow7szw9eztfqes94sc5-873561a6.manusvm.comput
 
 console.log('API_BASE_URL configurada:', API_BASE_URL);
 
+// Stream ao vivo do dashboard: servido por uma instância própria do backend (gevent)
+export const STREAM_BASE_URL = import.meta.env.VITE_STREAM_URL || API_BASE_URL;
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -1,11 +1,24 @@
 import { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
-import api from '../config/api';
+import api, { STREAM_BASE_URL } from '../config/api';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import { Phone, Star, AlertCircle, TrendingUp, Users, Clock } from 'lucide-react';
 
 const COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6'];
 
+const RECENT_LIMIT = 5;
+
+// Aplica um evento ao vivo (insert, update ou delete) a uma lista de atividades recentes
+const applyChange = (items, change) => {
+  if (change.op === 'delete') {
+    return items.filter((item) => item.id !== change.id);
+  }
+  if (change.op === 'insert') {
+    return [change.data, ...items.filter((item) => item.id !== change.id)].slice(0, RECENT_LIMIT);
+  }
+  return items.map((item) => (item.id === change.id ? { ...item, ...change.data } : item));
+};
+
 const Dashboard = () => {
   const { user } = useAuth();
   const [stats, setStats] = useState(null);
@@ -18,12 +31,61 @@ const Dashboard = () => {
     loadDashboardData();
   }, [period]);
 
-  const loadDashboardData = async () => {
-    setLoading(true);
+  // Atualizações ao vivo (SSE): chamadas, avaliações e contadores sem recarregar a página
+  useEffect(() => {
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    const connect = async () => {
+      if (closed) return;
+      // EventSource não envia cabeçalhos: um ticket de curta duração, que só abre o
+      // stream, vai na query string no lugar do token de sessão
+      let ticket;
+      try {
+        const response = await api.post('/dashboard/stream/ticket');
+        ticket = encodeURIComponent(response.data.ticket);
+      } catch (error) {
+        retryTimer = setTimeout(connect, 5000);
+        return;
+      }
+      if (closed) return;
+      source = new EventSource(`${STREAM_BASE_URL}/dashboard/stream?days=${period}&ticket=${ticket}`);
+
+      source.addEventListener('stats', (event) => setStats(JSON.parse(event.data)));
+      source.addEventListener('call', (event) => {
+        const change = JSON.parse(event.data);
+        setRecentActivity((prev) => ({ ...prev, recent_calls: applyChange(prev.recent_calls, change) }));
+      });
+      source.addEventListener('evaluation', (event) => {
+        const change = JSON.parse(event.data);
+        setRecentActivity((prev) => ({ ...prev, recent_evaluations: applyChange(prev.recent_evaluations, change) }));
+      });
+
+      // Conexão encerrada (ex.: sessão expirada): recarrega o painel, o que também renova
+      // o token pelo interceptor, e reconecta com um novo ticket
+      source.onerror = () => {
+        source.close();
+        retryTimer = setTimeout(() => {
+          loadDashboardData(false).finally(connect);
+        }, 5000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [period]);
+
+  const loadDashboardData = async (showLoading = true) => {
+    if (showLoading) setLoading(true);
     try {
       const [statsRes, activityRes] = await Promise.all([
         api.get(`/dashboard/stats?days=${period}`),
-        api.get('/dashboard/recent-activity?limit=5'),
+        api.get(`/dashboard/recent-activity?limit=${RECENT_LIMIT}`),
       ]);
 
       setStats(statsRes.data);
@@ -213,7 +275,7 @@ const Dashboard = () => {
       <div className="bg-white p-6 rounded-lg shadow">
         <h2 className="text-xl font-semibold text-gray-800 mb-4">Chamadas Recentes</h2>
         <div className="space-y-3">
-          {recentActivity.recent_calls.slice(0, 5).map((call) => (
+          {recentActivity.recent_calls.slice(0, RECENT_LIMIT).map((call) => (
             <div key={call.id} className="flex items-center justify-between p-3 bg-gray-50 rounded">
               <div>
                 <p className="font-medium text-gray-800">{call.protocol}</p>